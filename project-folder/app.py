@@ -1,31 +1,88 @@
-import pandas as pd
-import streamlit as st
-from io import BytesIO
-import re
-from openpyxl.styles import PatternFill
 import os
+from functools import partial
+
+import streamlit as st
+
+from convertor.brands import BlockedBrandStore
+from convertor.cache import (
+    cached_artifact,
+    cached_catalog_diff,
+    cached_combine,
+    cached_ingest,
+    cached_process,
+    cached_shipping_legend,
+    cached_stream_convert,
+    lazy_artifact,
+    reference_key,
+    result_key,
+)
+from convertor.catalog import ListingCatalog, delta_workbook_bytes, reference_version
+from convertor.codes import INVALID_CODES_SHEET
+from convertor.columns import CONSTANT_COLUMNS, with_constant_columns
+from convertor.config import (
+    BLOCKED_BRANDS_DB_PATH,
+    BLOCKED_BRANDS_PATH,
+    CATALOG_PATH,
+    JOB_STORE_PATH,
+    JOBS_DIR,
+    MAX_CONCURRENT_JOBS,
+    PRICING_PROFILES_PATH,
+    PROFILE_DIR,
+    RUN_LOG_PATH,
+    SHIPPING_LEGEND_PATH,
+)
+from convertor.dedup import DEFAULT_KEYS, KEEP_FIRST, KEEP_LOWEST_COST, DedupReport
+from convertor.export import EXPORT_FORMATS, XLSX_MIME, export_bytes, frame_to_xlsx_bytes
+from convertor.ingest import source_labels
+from convertor.instrument import RunInstrument, stage_frame
+from convertor.jobs import DONE, JobRunner, job_frame, read_result
+from convertor.pipeline import PipelineMetrics
+from convertor.preview import PAGE_SIZES, column_stats, get_page, missing_weight_rows, page_count, style_page
+from convertor.profiles import load_profiles, profile_export_bytes, profile_file_name, profiles_workbook_bytes
+from convertor.readers import INPUT_EXTENSIONS
 
 # App title
 st.title("Fuckin' Awesome File Convertor")
 
 # Define the path to the shipping legend
-shipping_legend_path = "project-folder/data/default_shipping_legend.xlsx"
+shipping_legend_path = SHIPPING_LEGEND_PATH
 
-# Path for Blocked Brands file
-blocked_brands_path = "project-folder/data/Blocked_Brands.xlsx"
+# Duplicate detection choices: key columns and which duplicate survives
+DEDUP_KEY_OPTIONS = {"SKU + UPC/ISBN": DEFAULT_KEYS, "All columns (exact rows)": None}
+KEEP_OPTIONS = {"First seen": KEEP_FIRST, "Lowest COST_PRICE": KEEP_LOWEST_COST}
+
+MEASURE_HELP = "While this is on, every run converts the files again instead of reusing a cached result."
+
+# How often the background job list refreshes, and how many jobs it shows
+JOB_REFRESH_SECONDS = 2
+JOB_LIST_LIMIT = 20
+
+# Blocked brands live in an indexed database, seeded from the Blocked Brands file
+@st.cache_resource
+def get_blocked_brand_store():
+    return BlockedBrandStore.open(BLOCKED_BRANDS_DB_PATH, seed_xlsx=BLOCKED_BRANDS_PATH)
+
+
+# Snapshot of the last saved run, for incremental runs and delta workbooks
+@st.cache_resource
+def get_listing_catalog():
+    return ListingCatalog(CATALOG_PATH)
+
+
+# One job runner per server, shared by every session
+@st.cache_resource
+def get_job_runner():
+    return JobRunner(JOB_STORE_PATH, JOBS_DIR, MAX_CONCURRENT_JOBS)
 
-# Ensure the Blocked Brands file exists and contains the correct worksheet
-if not os.path.exists(blocked_brands_path):
-    # Create a new Blocked Brands file with the correct structure if it doesn't exist
-    pd.DataFrame(columns=["Blocked Brands"]).to_excel(blocked_brands_path, index=False, sheet_name="Blocked_Brands")
-else:
-    # Check if the worksheet exists; create it if it doesn't
-    try:
-        excel_data = pd.ExcelFile(blocked_brands_path)
-        if "Blocked_Brands" not in excel_data.sheet_names:
-            pd.DataFrame(columns=["Blocked Brands"]).to_excel(blocked_brands_path, index=False, sheet_name="Blocked_Brands")
-    except Exception as e:
-        st.error(f"Error initializing Blocked Brands file: {e}")
+
+blocked_brand_store = None
+try:
+    blocked_brand_store = get_blocked_brand_store()
+    # Brands added to the Blocked Brands file since the server started
+    if os.path.exists(BLOCKED_BRANDS_PATH):
+        blocked_brand_store.import_seed(BLOCKED_BRANDS_PATH)
+except Exception as e:
+    st.error(f"Error initializing Blocked Brands store: {e}")
 
 # Sidebar form to add a blocked brand
 st.sidebar.header("Manage Blocked Brands")
@@ -33,26 +90,14 @@ with st.sidebar.form("Add Blocked Brands"):
     new_brand = st.text_input("Enter the brand to block")
     submit_button = st.form_submit_button("Add Brand")
 
-    if submit_button:
+    if submit_button and blocked_brand_store is not None:
         try:
-            # Load the existing Blocked Brands list
-            blocked_brands = pd.read_excel(blocked_brands_path, sheet_name="Blocked_Brands")
-            
-            # Check if the brand is already blocked
-            if new_brand and new_brand.strip() not in blocked_brands["Blocked Brands"].values:
-                # Append the new brand
-                new_brand_df = pd.DataFrame([{"Blocked Brands": new_brand.strip()}])
-                blocked_brands = pd.concat([blocked_brands, new_brand_df], ignore_index=True)
-                
-                # Save back to the Excel file
-                with pd.ExcelWriter(blocked_brands_path, engine="openpyxl", mode="w") as writer:
-                    blocked_brands.to_excel(writer, index=False, sheet_name="Blocked_Brands")
-                
+            if not new_brand or not new_brand.strip():
+                st.sidebar.warning("Please enter a valid brand name.")
+            elif blocked_brand_store.add(new_brand):
                 st.sidebar.success(f"Brand '{new_brand}' has been added to the blocked list.")
-            elif new_brand.strip() in blocked_brands["Blocked Brands"].values:
-                st.sidebar.warning(f"The brand '{new_brand}' is already in the blocked list.")
             else:
-                st.sidebar.warning("Please enter a valid brand name.")
+                st.sidebar.warning(f"The brand '{new_brand}' is already in the blocked list.")
         except Exception as e:
             st.sidebar.error(f"Error updating blocked brands: {e}")
 
@@ -60,434 +105,433 @@ with st.sidebar.form("Add Blocked Brands"):
 st.sidebar.subheader("Bulk Upload Blocked Brands")
 bulk_file = st.sidebar.file_uploader("Upload an Excel file with Blocked Brands", type=["xlsx"])
 
-if bulk_file:
+if bulk_file and blocked_brand_store is not None:
     try:
-        bulk_brands = pd.read_excel(bulk_file)
-        if "Blocked Brands" not in bulk_brands.columns:
-            st.sidebar.error("The uploaded file must contain a 'Blocked Brands' column.")
-        else:
-            blocked_brands = pd.read_excel(blocked_brands_path, sheet_name="Blocked_Brands")
-            # Combine the current and new brands, avoiding duplicates
-            updated_brands = pd.concat([blocked_brands, bulk_brands]).drop_duplicates(subset=["Blocked Brands"], ignore_index=True)
-            
-            # Save back to the Blocked Brands file
-            with pd.ExcelWriter(blocked_brands_path, engine="openpyxl", mode="w") as writer:
-                updated_brands.to_excel(writer, index=False, sheet_name="Blocked_Brands")
-            
-            st.sidebar.success("Blocked Brands have been updated successfully.")
+        added = blocked_brand_store.import_xlsx(bulk_file)
+        st.sidebar.success(f"Blocked Brands have been updated successfully. {added} new brands added.")
+    except ValueError as e:
+        st.sidebar.error(str(e))
     except Exception as e:
         st.sidebar.error(f"Error processing bulk upload: {e}")
 
 # Display and Manage Blocked Brands
-try:
-    # Load the Blocked Brands file
-    blocked_brands = pd.read_excel(blocked_brands_path, sheet_name="Blocked_Brands")
-
-    # Ensure proper serial numbers without duplication
-    blocked_brands.reset_index(drop=True, inplace=True)  # Drop existing index
-    blocked_brands.insert(0, "S.No", range(1, len(blocked_brands) + 1))  # Add "S.No" as the first column
-
-    # Display only the S.No and Blocked Brands columns
-    st.sidebar.subheader("Blocked Brands")
-    st.sidebar.write(blocked_brands)
-
-    # Provide a download button for the Blocked Brands list
-    buffer = BytesIO()
-    with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
-        blocked_brands.to_excel(writer, index=False, sheet_name="Blocked_Brands")
-    buffer.seek(0)
-
-    st.sidebar.download_button(
-        label="Download Blocked Brands",
-        data=buffer.getvalue(),
-        file_name="Blocked_Brands.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-    )
-except Exception as e:
-    st.sidebar.error(f"Error loading blocked brands: {e}")
-
-
-    # Provide a download button for the Blocked Brands list
-    buffer = BytesIO()
-    with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
-        blocked_brands[["Blocked Brands"]].to_excel(writer, index=False, sheet_name="Blocked_Brands")
-    buffer.seek(0)
+if blocked_brand_store is not None:
+    try:
+        blocked_brands = blocked_brand_store.to_frame().copy()
 
-    st.sidebar.download_button(
-        label="Download Blocked Brands",
-        data=buffer.getvalue(),
-        file_name="Blocked_Brands.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-    )
-except Exception as e:
-    st.sidebar.error(f"Error loading blocked brands: {e}")
+        # Add "S.No" as the first column
+        blocked_brands.insert(0, "S.No", range(1, len(blocked_brands) + 1))
 
+        # Display only the S.No and Blocked Brands columns
+        st.sidebar.subheader("Blocked Brands")
+        st.sidebar.write(blocked_brands)
 
-    # Provide a download button for the Blocked Brands list
-    buffer = BytesIO()
-    with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
-        blocked_brands[["Blocked Brands"]].to_excel(writer, index=False, sheet_name="Blocked_Brands")
-    buffer.seek(0)
+        # Provide a download button for the Blocked Brands list, serialized only when downloaded
+        st.sidebar.download_button(
+            label="Download Blocked Brands",
+            data=blocked_brand_store.xlsx_bytes,
+            file_name="Blocked_Brands.xlsx",
+            mime=XLSX_MIME,
+        )
+    except Exception as e:
+        st.sidebar.error(f"Error loading blocked brands: {e}")
 
-    st.sidebar.download_button(
-        label="Download Blocked Brands",
-        data=buffer.getvalue(),
-        file_name="Blocked_Brands.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-    )
+# Pricing profiles: one extra export per marketplace, priced from the same run
+st.sidebar.subheader("Pricing Profiles")
+profiles_file = st.sidebar.file_uploader("Upload pricing profiles (JSON, YAML or Excel)", type=["json", "yaml", "yml", "xlsx"])
+pricing_profiles = []
+try:
+    if profiles_file is not None:
+        pricing_profiles = load_profiles(profiles_file)
+    elif os.path.exists(PRICING_PROFILES_PATH):
+        pricing_profiles = load_profiles(PRICING_PROFILES_PATH)
 except Exception as e:
-    st.sidebar.error(f"Error loading blocked brands: {e}")
-
-
-    # Provide a download button for the blocked brands file
-    buffer = BytesIO()
-    with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
-        blocked_brands.to_excel(writer, index=False, sheet_name="Blocked_Brands")
-    buffer.seek(0)
+    st.sidebar.error(f"Error loading pricing profiles: {e}")
+if pricing_profiles:
+    st.sidebar.write(", ".join(profile.name for profile in pricing_profiles))
 
-    st.sidebar.download_button(
-        label="Download Blocked Brands",
-        data=buffer.getvalue(),
-        file_name="Blocked_Brands.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-    )
+# Load the shipping legend used for SHIPPING COST and embedded in the export
+shipping_legend = None
+try:
+    shipping_legend = cached_shipping_legend(shipping_legend_path)
+except FileNotFoundError:
+    st.error(f"The shipping legend file does not exist at the specified path: {shipping_legend_path}")
 except Exception as e:
-    st.sidebar.error(f"Error loading blocked brands: {e}")
-
+    st.error(f"Error reading shipping legend file: {e}")
+if shipping_legend is not None and shipping_legend.overlapping:
+    st.warning("The shipping legend has overlapping weight ranges; each weight gets the first matching row.")
+
+# Step 1: File uploader; the format of each file is detected from its contents
+st.header("Upload Supplier Files")
+uploaded_files = st.file_uploader(
+    "Upload one or more supplier files (Excel, CSV or Parquet)",
+    type=[extension for extensions in INPUT_EXTENSIONS.values() for extension in extensions],
+    accept_multiple_files=True,
+)
+streaming_mode = st.checkbox("Streaming mode for very large files (converts in bounded memory, skips previews)")
+trace_memory = st.checkbox("Record peak memory per stage (slower)", help=MEASURE_HELP)
+profile_run = st.checkbox("Profile this run with cProfile", help=MEASURE_HELP)
+# Measured runs convert again rather than reuse a cached result, which has nothing to measure
+measure_run = trace_memory or profile_run
+use_catalog = st.checkbox("Reuse unchanged rows from the last saved run and build a delta workbook")
+background = st.checkbox("Run as a background job (the page stays responsive and the result survives a reload)")
+dedup_column, keep_column = st.columns(2)
+dedup_keys = DEDUP_KEY_OPTIONS[dedup_column.selectbox("Remove duplicates by", list(DEDUP_KEY_OPTIONS))]
+keep = KEEP_OPTIONS[keep_column.selectbox("Keep", list(KEEP_OPTIONS), help="Which of a set of duplicates stays in the output.")]
+
+
+def show_metrics(metrics, dedup):
+    """
+    Render the Metrics Summary for a finished run, with duplicates per source file.
+
+    Returns a placeholder for the stage breakdown, which is filled in once
+    the run, including any export, has finished.
+    """
+    st.write("### Metrics Summary")
+    st.markdown(f"""
+    - **Total Listings in Input Files:** {metrics.total_input_listings}
+    - **Total Listings in Output File:** {metrics.total_output_listings}
+    - **Total Duplicates Removed:** {metrics.duplicates_removed}
+    - **Total Blocked-Brand Listings Removed:** {metrics.blocked_removed}
+    - **Listings with No Weights (Red Highlighted Rows):** {metrics.listings_no_weights}
+    - **Listings with an Invalid UPC/ISBN:** {metrics.invalid_codes}
+    """)
+    if dedup.by_source:
+        st.write("#### Duplicates by Source File")
+        st.caption(f"{dedup.cross_file} of the duplicates repeat a listing kept from another file.")
+        st.dataframe(dedup.frame(), hide_index=True)
+    return st.empty()
+
+
+def finish_run(instrument, stages, stage_table, metrics, mode, log_run=True):
+    """
+    Show the stage breakdown and profile, and append the run to the run log.
+
+    log_run is False for reruns served from the cache; they are neither
+    logged nor profiled, as they did no conversion work.
+    """
+    instrument.finish()
+    stage_table.dataframe(stage_frame(stages), hide_index=True)
+    if instrument.contended:
+        st.warning("Another run was tracing memory or profiling, so this one ran without.")
+    if log_run and RUN_LOG_PATH:
+        instrument.write_log(RUN_LOG_PATH, metrics, source="app", mode=mode, files=len(uploaded_files))
+
+    profile = instrument.profile_text()
+    if profile and not log_run:
+        st.info("This result came from the cache, so there is no conversion to profile.")
+    elif profile:
+        profile_path = instrument.dump_profile(os.path.join(PROFILE_DIR, f"{instrument.run_id}.prof"))
+        st.write("### Profile")
+        st.caption(f"cProfile stats saved to {profile_path}")
+        st.code(profile)
+
+
+def show_preview(title, df, key, highlight=False, listing=False):
+    """
+    Render one page of df with its row count and optional column statistics.
+
+    Only the visible page is styled and sent to the browser. For listing
+    rows in the compact layout, the constant columns are filled in on that
+    page only.
+    """
+    st.write(f"### {title}")
+    total_rows = len(df)
+    if highlight and st.checkbox("Only rows with missing weights", key=f"{key}_missing"):
+        df = missing_weight_rows(df)
+
+    size_column, page_column = st.columns(2)
+    page_size = size_column.selectbox("Rows per page", PAGE_SIZES, index=1, key=f"{key}_page_size")
+    pages = page_count(len(df), page_size)
+    page = page_column.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, step=1, key=f"{key}_page")
+    page = min(int(page), pages)
+
+    page_df = get_page(df, page, page_size)
+    if listing:
+        page_df = with_constant_columns(page_df)
+    first_row = (page - 1) * page_size
+    st.caption(f"Rows {first_row + 1 if len(page_df) else 0}-{first_row + len(page_df)} of {len(df)} ({total_rows} in total)")
+    st.dataframe(style_page(page_df) if highlight else page_df)
+
+    if st.checkbox("Show column statistics", key=f"{key}_stats"):
+        st.dataframe(column_stats(df))
 
-    
-# Step 1: File uploader
-st.header("Upload Excel Files")
-uploaded_files = st.file_uploader("Upload one or more Excel files", type=["xlsx"], accept_multiple_files=True)
 
 if uploaded_files:
-    all_data = []
+    try:
+        blocked_brands_matcher = blocked_brand_store.matcher()
+        blocked_brands_revision = blocked_brand_store.revision()
+    except Exception as e:
+        st.error(f"Error processing blocked brands: {e}")
+        blocked_brands_matcher, blocked_brands_revision = [], None
+
+if not uploaded_files:
+    st.info("Upload one or more supplier files to get started.")
+elif background:
+    # Queue the conversion; the Background Jobs section below follows it
+    if streaming_mode:
+        job_format = "xlsx"
+    else:
+        job_format = st.selectbox("Export format", list(EXPORT_FORMATS), key="job_format", help="CSV and Parquet contain the values only, without formulas or highlighting.")
+    if st.button("Start Background Conversion"):
+        job_id = get_job_runner().submit(
+            uploaded_files,
+            shipping_legend,
+            blocked_brands_matcher,
+            {
+                "stream": streaming_mode,
+                "export_format": job_format,
+                "dedup_keys": dedup_keys,
+                "keep": keep,
+                "trace_memory": trace_memory,
+            },
+        )
+        st.query_params["job"] = job_id
+        st.success(f"Job {job_id} is queued. You can keep working or reload the page; its result stays available below.")
+elif streaming_mode:
+    # Convert chunk by chunk straight into the output workbook, once per set of uploads and settings
+    instrument = RunInstrument(trace_memory=trace_memory, profile=profile_run)
+    references = (reference_key(shipping_legend_path), blocked_brands_revision)
+    stream_result = cached_stream_convert(
+        uploaded_files,
+        shipping_legend,
+        blocked_brands_matcher,
+        references,
+        instrument=instrument,
+        dedup_keys=dedup_keys,
+        keep=keep,
+        refresh=measure_run,
+    )
+    # A cached result keeps the stage timings of the run that computed it
+    converted_now = bool(instrument.stages)
+    for error in stream_result.errors:
+        st.error(error)
+    metrics = stream_result.metrics
+    stage_table = show_metrics(metrics, stream_result.dedup)
+    finish_run(instrument, stream_result.stages, stage_table, metrics, "stream", log_run=converted_now)
 
-    # Step 2: Process each uploaded file
-    for uploaded_file in uploaded_files:
-        try:
-            excel_file = pd.ExcelFile(uploaded_file)
-            for sheet_name in excel_file.sheet_names:
-                sheet_data = pd.read_excel(uploaded_file, sheet_name=sheet_name, usecols="B,E,G,H,I")
-                all_data.append(sheet_data)
-        except Exception as e:
-            st.error(f"Error reading file {uploaded_file.name}: {e}")
+    st.write("### Download Consolidated File")
+    st.download_button(
+        label="Download Excel File",
+        data=stream_result.output,
+        file_name="Consolidated_Data_with_Embedded_Legend.xlsx",
+        mime=XLSX_MIME,
+    )
+    if metrics.invalid_codes:
+        st.download_button(
+            label="Download Invalid UPC/ISBN Report",
+            data=stream_result.invalid_codes,
+            file_name="Invalid_UPC_ISBN.xlsx",
+            mime=XLSX_MIME,
+        )
+else:
+    instrument = RunInstrument(trace_memory=trace_memory, profile=profile_run)
+
+    # Step 2: Read every sheet of each uploaded file, reusing uploads parsed on earlier reruns
+    with instrument.stage("Read files") as stage:
+        upload_keys, all_data, read_errors = cached_ingest(uploaded_files)
+        stage.rows_out = sum(len(frame) for frame in all_data)
+    for error in read_errors:
+        st.error(error)
 
     if all_data:
         # Step 3: Combine all sheets into one DataFrame
-        combined_df = pd.concat(all_data, ignore_index=True)
-        st.write("### Combined Data Preview (Before Renaming)")
-        st.dataframe(combined_df)
-
-        if uploaded_files:
-            all_data = []
-
-    # Process each uploaded file
-    for uploaded_file in uploaded_files:
-        try:
-            excel_file = pd.ExcelFile(uploaded_file)
-            for sheet_name in excel_file.sheet_names:
-                sheet_data = pd.read_excel(uploaded_file, sheet_name=sheet_name, usecols="B,E,G,H,I")
-                all_data.append(sheet_data)
-        except Exception as e:
-            st.error(f"Error reading file {uploaded_file.name}: {e}")
-
-        # Step 3.1: Add HANDLING COST column
-        st.write("### Adding HANDLING COST Column")
-        combined_df["HANDLING COST"] = 0.75
-        st.success("HANDLING COST column added with default value 0.75.")
-
-        # Step 4: Standardize and Rename Columns
-        st.write("### Renaming Columns")
-        combined_df.columns = combined_df.columns.str.strip()  # Strip column headers of extra spaces
-        column_mapping = {
-            "Product Details": "TITLE",
-            "Brand": "BRAND",
-            "Product ID": "SKU",
-            "UPC Code": "UPC/ISBN",
-            "Price": "COST_PRICE"
-        }
-        combined_df.rename(columns=column_mapping, inplace=True)
-
-        if "COST_PRICE" not in combined_df.columns:
-            st.error("COST_PRICE column is missing. Ensure the input file has a 'Price' column.")
-        else:
-            st.success("Columns renamed successfully.")
-
-        # Step 4.1: Format SKU column to remove commas and ensure it is displayed as a string
-        if "SKU" in combined_df.columns:
-            combined_df["SKU"] = combined_df["SKU"].astype(str).str.replace(",", "").str.strip()
-            st.success("SKU column formatted to remove commas.")
-
-        # Step 5: Clean TITLE column
-        if "TITLE" in combined_df.columns:
-            combined_df["TITLE"] = (
-                combined_df["TITLE"]
-                .str.replace(r"\(W\+\)", "", regex=True)
-                .str.replace(r"\(SP\)", "", regex=True)
-                .str.replace(r"\(P\)", "", regex=True)
-                .str.strip()
-            )
-            st.success("Unwanted patterns removed from TITLE column.")
-
-        # Step 6: Format UPC/ISBN column
-        st.write("### Formatting UPC/ISBN Column")
-        if "UPC/ISBN" in combined_df.columns:
-            combined_df["UPC/ISBN"] = (
-            combined_df["UPC/ISBN"]
-            .apply(lambda x: str(int(float(x))) if pd.notnull(x) else "")  # Convert to integer, then string
-            .str.zfill(12)  # Add leading zeros to ensure 12 digits
+        with instrument.stage("Combine sheets", stage.rows_out):
+            raw_df = cached_combine(upload_keys, all_data)
+        show_preview("Combined Data Preview (Before Renaming)", raw_df, "raw")
+
+        # Steps 3.1-12.1: Convert, deduplicate, filter blocked brands and reorder
+        references = (reference_key(shipping_legend_path), blocked_brands_revision)
+        read_stages = list(instrument.stages)
+        catalog = get_listing_catalog() if use_catalog else None
+        legend_version = reference_version(shipping_legend)
+        result = cached_process(
+            upload_keys,
+            raw_df,
+            shipping_legend,
+            blocked_brands_matcher,
+            references,
+            instrument=instrument,
+            load_known_rows=(lambda: catalog.known_rows(legend_version)) if catalog else None,
+            sources=source_labels(all_data),
+            dedup_keys=dedup_keys,
+            keep=keep,
+            refresh=measure_run,
         )
-        st.success("UPC/ISBN column formatted to have a minimum of 12 digits as a string.")
-
-
-        # Step 7: Format COST_PRICE column
-        st.write("### Formatting COST_PRICE Column")
-        if "COST_PRICE" in combined_df.columns:
-            combined_df["COST_PRICE"] = (
-                combined_df["COST_PRICE"]
-                .astype(str)
-                .str.replace(r"[$,]", "", regex=True)  # Remove currency symbols and commas
-                .astype(float)
-                .round(2)
-            )
-            st.success("COST_PRICE column formatted to numeric with two decimal places.")
-
-        # Step 8: Add QUANTITY and ITEM LOCATION columns
-        combined_df["QUANTITY"] = 1
-        combined_df["ITEM LOCATION"] = "WALMART"
-
-        # Step 9: Add ITEM WEIGHT (pounds) column
-        st.write("### Adding ITEM WEIGHT (pounds) Column")
-
-        # Function to extract weight and handle pack sizes
-        def extract_weight_with_packs(title):
-            """
-            Extract the weight and account for pack size in the TITLE.
-            """
-            try:
-                # Extract the weight (e.g., "8 oz", "10 fl oz", etc.)
-                match_weight = re.search(r"(\d+(\.\d+)?)\s*(?:oz|ounces|ounce|fl. oz.|fluid ounce|fl oz|fluid ounces)", title, re.IGNORECASE)
-                single_unit_weight = float(match_weight.group(1)) if match_weight else None
-
-                # Extract the pack size (e.g., "2 pack", "pack of 3", etc.)
-                match_pack = re.search(r"(?:\b(\d+)\s*pack\b|\bpack of\s*(\d+))", title, re.IGNORECASE)
-                pack_size = int(match_pack.group(1) or match_pack.group(2)) if match_pack else 1  # Default to 1 if no pack
-
-                if single_unit_weight is not None:
-                    # Add 6 oz or 10 oz based on the unit type and calculate the total weight
-                    if match_weight and "fl oz" in match_weight.group(0).lower():
-                        single_unit_weight += 10  # Add 10 oz for "fl oz"
-                    else:
-                        single_unit_weight += 6  # Add 6 oz for "oz" or "ounces"
-
-                    # Calculate total weight for the pack and convert to pounds
-                    total_weight = (single_unit_weight * pack_size) / 16  # Convert oz to pounds
-                    return round(total_weight, 2)
-
-            except Exception as e:
-                # Log the error for debugging
-                st.error(f"Error processing title '{title}': {e}")
-
-            # Return None if no weight or pack size is found
-            return None
-
-        # Apply the function to the TITLE column
-        if "TITLE" in combined_df.columns:
-            combined_df["ITEM WEIGHT (pounds)"] = combined_df["TITLE"].apply(
-                lambda x: extract_weight_with_packs(x) if isinstance(x, str) else None
-            )
-            st.success("ITEM WEIGHT (pounds) column updated to account for pack sizes.")
-
-        # Step 9.1: Highlight rows with missing weights
-        st.write("### Highlighting Rows with Missing ITEM WEIGHT (pounds)")
-
-
-        # Step 10: Add SHIPPING COST column
-        st.write("### Adding SHIPPING COST Column")
-
-        shipping_legend_path = "project-folder/data/default_shipping_legend.xlsx"  # Relative path in the repository
-
-        if not os.path.exists(shipping_legend_path):
-            st.error(f"The shipping legend file does not exist at the specified path: {shipping_legend_path}")
-        else:
-            try:
-                shipping_legend = pd.read_excel(shipping_legend_path, engine="openpyxl")
-                st.success("Shipping legend file loaded successfully.")
-            except Exception as e:
-                st.error(f"Error reading shipping legend file: {e}")
-                shipping_legend = None
-
-        if shipping_legend is not None and {"Weight Range Min (lb)", "Weight Range Max (lb)", "SHIPPING COST"}.issubset(shipping_legend.columns):
-            def calculate_shipping_cost(weight, legend):
-                if pd.isnull(weight):
-                    return None
-                for _, row in legend.iterrows():
-                    if row["Weight Range Min (lb)"] <= weight <= row["Weight Range Max (lb)"]:
-                        return row["SHIPPING COST"]
-                return None
-
-            combined_df["SHIPPING COST"] = combined_df["ITEM WEIGHT (pounds)"].apply(
-                lambda w: calculate_shipping_cost(w, shipping_legend)
-            )
-        else:
-            st.error("Shipping legend file is missing required columns: 'Weight Range Min (lb)', 'Weight Range Max (lb)', 'SHIPPING COST'.")
-
-        # Step 10.1: Add RETAIL PRICE column
-        if all(col in combined_df.columns for col in ["COST_PRICE", "SHIPPING COST", "HANDLING COST"]):
-            combined_df["RETAIL PRICE"] = combined_df.apply(
-                lambda row: round(
-                    (row["COST_PRICE"] + row["SHIPPING COST"] + row["HANDLING COST"]) * 1.35, 2
-                ) if not (pd.isnull(row["COST_PRICE"]) or pd.isnull(row["SHIPPING COST"]) or pd.isnull(row["HANDLING COST"])) else None,
-                axis=1
-            )
-
-        # Step 10.2: Add MIN PRICE and MAX PRICE columns
-        if all(col in combined_df.columns for col in ["SHIPPING COST", "ITEM WEIGHT (pounds)", "RETAIL PRICE"]):
-            combined_df["MIN PRICE"] = combined_df["RETAIL PRICE"]
-            combined_df["MAX PRICE"] = combined_df["RETAIL PRICE"].apply(lambda x: round(x * 1.35, 2) if x is not None else None)
-
-       
-
-        # Step 11: Remove duplicate rows
-        combined_df.drop_duplicates(inplace=True)
-
-    # Step X: Remove rows with blocked brands
-if 'combined_df' in locals() and not combined_df.empty and "BRAND" in combined_df.columns:
-    try:
-        # Load blocked brands from the Blocked_Brands.xlsx file
-        blocked_brands_list = pd.read_excel(blocked_brands_path, sheet_name="Blocked_Brands")["Blocked Brands"].str.strip().tolist()
-
-        # Separate rows with blocked brands
-        removed_rows = combined_df[combined_df["BRAND"].isin(blocked_brands_list)]
-        combined_df = combined_df[~combined_df["BRAND"].isin(blocked_brands_list)]
+        # A cached result keeps the stage timings of the run that computed it
+        converted_now = len(instrument.stages) > len(read_stages)
+        for error in result.errors:
+            st.error(error)
+        combined_df = result.data
+        removed_rows = result.removed_rows
+        # Downloads built from this result are cached under its key and built on first download
+        version = result_key(upload_keys, references, dedup_keys, keep)
 
         # Display the removed rows
         if not removed_rows.empty:
-            st.write("### Rows Removed Due to Blocked Brands")
-            st.dataframe(removed_rows)
+            show_preview("Rows Removed Due to Blocked Brands", removed_rows, "removed", listing=True)
 
             # Provide a download button for the removed rows
-            buffer_removed = BytesIO()
-            with pd.ExcelWriter(buffer_removed, engine="openpyxl") as writer:
-                removed_rows.to_excel(writer, index=False, sheet_name="Removed_Blocked_Brands")
-            buffer_removed.seek(0)
-
             st.download_button(
                 label="Download Removed Rows",
-                data=buffer_removed.getvalue(),
+                data=lazy_artifact(
+                    ("removed_rows", version), partial(frame_to_xlsx_bytes, removed_rows, "Removed_Blocked_Brands", CONSTANT_COLUMNS)
+                ),
                 file_name="Removed_Blocked_Brands.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                mime=XLSX_MIME,
             )
-
         st.success(f"Blocked brands have been filtered out. {len(removed_rows)} rows removed.")
-    except Exception as e:
-        st.error(f"Error processing blocked brands: {e}")
-else:
-    st.warning("The 'BRAND' column is missing from the uploaded data or no files have been uploaded yet.")
-
-
-    # Step 11.1: Calculate and Display Metrics
-    st.write("### Metrics Summary")
-
-    # Total number of listings in the input files
-    total_input_listings = len(pd.concat(all_data, ignore_index=True))
 
-    # Total number of listings in the output file
-    total_output_listings = len(combined_df)
+        # Step 11.1: Display Metrics
+        stage_table = show_metrics(result.metrics, result.dedup)
 
-    # Total duplicates removed
-    total_duplicates_removed = total_input_listings - total_output_listings
+        # Step 12.2: Display one page at a time, highlighting rows with missing weights
+        show_preview("Updated Final Data Preview with Highlights and Formatting", combined_df, "final", highlight=True, listing=True)
 
-    # Total listings with no weights
-    listings_no_weights = combined_df["ITEM WEIGHT (pounds)"].isnull().sum()    
-        
-    # Step X.1: Update metrics
-    removed_blocked_count = len(removed_rows) if "removed_rows" in locals() else 0
+        # Step 12.3: Codes that fail the GTIN check digit, kept in the output but listed for fixing
+        if not result.invalid_codes.empty:
+            show_preview("Listings with an Invalid UPC/ISBN", result.invalid_codes, "invalid")
+            st.download_button(
+                label="Download Invalid UPC/ISBN Report",
+                data=lazy_artifact(("invalid_codes", version), partial(frame_to_xlsx_bytes, result.invalid_codes, INVALID_CODES_SHEET)),
+                file_name="Invalid_UPC_ISBN.xlsx",
+                mime=XLSX_MIME,
+            )
 
-    # Display the metrics
-    st.markdown(f"""
-    - **Total Listings in Input Files:** {total_input_listings}
-    - **Total Listings in Output File:** {total_output_listings}
-    - **Total Duplicates Removed:** {total_duplicates_removed}
-    - **Listings with No Weights (Red Highlighted Rows):** {listings_no_weights}
-    """)
+        # Step 12: Export final DataFrame with Conditional Formatting
+        st.write("### Download Consolidated File")
+        export_format = st.selectbox("Export format", list(EXPORT_FORMATS), help="CSV and Parquet contain the values only, without formulas or highlighting.")
+        exported = st.button("Export")
+        if exported:
+            try:
+                with instrument.stage("Export", len(combined_df)):
+                    export_data = cached_artifact(
+                        ("export", version, export_format),
+                        partial(export_bytes, combined_df, export_format, shipping_legend.frame if shipping_legend else None),
+                    )
+            except ImportError as e:
+                st.error(f"Parquet export needs pyarrow or fastparquet installed: {e}")
+            else:
+                st.download_button(
+                    label=f"Download {export_format.upper()} File",
+                    data=export_data,
+                    file_name="Consolidated_Data_with_Embedded_Legend.xlsx" if export_format == "xlsx" else f"Consolidated_Data.{export_format}",
+                    mime=EXPORT_FORMATS[export_format],
+                )
+                if combined_df.empty:
+                    st.info("Upload one or more supplier files to get started.")
+                else:
+                    st.success("The output file is ready for download.")
+
+        # Step 12.4: One export per pricing profile
+        if pricing_profiles:
+            st.write("### Pricing Profiles")
+            st.caption("Each profile reprices this run with its own handling cost, markups and weight padding.")
+            for profile in pricing_profiles:
+                st.download_button(
+                    label=f"Download {profile.name} {export_format.upper()} File",
+                    data=lazy_artifact(
+                        ("profile", version, repr(profile), export_format),
+                        partial(profile_export_bytes, combined_df, profile, shipping_legend, export_format),
+                    ),
+                    file_name=profile_file_name("Consolidated_Data", profile.name, export_format),
+                    mime=EXPORT_FORMATS[export_format],
+                    key=f"profile_{profile.name}",
+                )
+            st.download_button(
+                label="Download All Profiles (one sheet each)",
+                data=lazy_artifact(
+                    ("profiles", version, repr(pricing_profiles)),
+                    partial(profiles_workbook_bytes, combined_df, pricing_profiles, shipping_legend),
+                ),
+                file_name="Consolidated_Data_Profiles.xlsx",
+                mime=XLSX_MIME,
+            )
 
+        # Step 13: Compare with the last saved run
+        if catalog is not None:
+            st.write("### Changes Since the Last Saved Run")
+            saved_at = catalog.saved_at()
+            if saved_at is None:
+                st.info("No run has been saved yet, so every listing counts as added.")
+            else:
+                st.caption(f"Compared with the run saved {saved_at}, by SKU and UPC/ISBN.")
+            delta = cached_catalog_diff(catalog, combined_df, version)
+            counts = delta.counts()
+            st.markdown(f"""
+            - **Added Listings:** {counts["added"]}
+            - **Changed Listings:** {counts["changed"]}
+            - **Removed Listings:** {counts["removed"]}
+            """)
+            st.download_button(
+                label="Download Delta Workbook",
+                data=lazy_artifact(("delta", version, catalog.revision()), partial(delta_workbook_bytes, delta)),
+                file_name="Consolidated_Data_Delta.xlsx",
+                mime=XLSX_MIME,
+            )
+            if st.button("Save this run as the new baseline"):
+                catalog.save(combined_df, legend_version)
+                st.success("Saved. The next run is compared with this one.")
 
-    # Step 12: Export final DataFrame with Conditional Formatting
-    st.write("### Download Consolidated File")
+        # Log only runs that did work rather than reruns served from the cache
+        stages = instrument.stages if converted_now else read_stages + result.stages + instrument.stages[len(read_stages):]
+        finish_run(instrument, stages, stage_table, result.metrics, "batch", log_run=converted_now or exported)
+    else:
+        instrument.finish()
+
+
+@st.fragment(run_every=JOB_REFRESH_SECONDS)
+def show_jobs():
+    """
+    List recent background jobs with the progress, metrics and downloads of one of them.
+
+    Refreshes on its own without rerunning the rest of the page.
+    """
+    runner = get_job_runner()
+    jobs = runner.store.list(JOB_LIST_LIMIT)
+    if not jobs:
+        return
+    st.write("### Background Jobs")
+    st.dataframe(job_frame(jobs), hide_index=True)
+
+    job_ids = [job.id for job in jobs]
+    selected = st.query_params.get("job")
+    job_id = st.selectbox("Job", job_ids, index=job_ids.index(selected) if selected in job_ids else 0, key="job_select")
+    st.query_params["job"] = job_id
+    job = runner.store.get(job_id)
+    if job is None:
+        return
+
+    st.caption(f"{job.status.capitalize()}{f', on {job.stage}' if job.stage else ''}. Files: {', '.join(job.files)}")
+    for error in job.errors:
+        st.error(error)
+    if job.metrics is not None:
+        show_metrics(PipelineMetrics(**job.metrics), DedupReport(**job.dedup))
+    if job.stages:
+        st.dataframe(stage_frame(job.stages), hide_index=True)
+
+    if job.status == DONE and job.result_path:
+        st.download_button(
+            label="Download Result",
+            data=partial(read_result, job.result_path),
+            file_name=os.path.basename(job.result_path),
+            mime=EXPORT_FORMATS[job.options["export_format"]],
+            key=f"job_result_{job.id}",
+        )
+    if job.status == DONE and job.removed_path:
+        st.download_button(
+            label="Download Removed Rows",
+            data=partial(read_result, job.removed_path),
+            file_name=os.path.basename(job.removed_path),
+            mime=XLSX_MIME,
+            key=f"job_removed_{job.id}",
+        )
+    if not job.finished:
+        if st.button("Cancel Job", key=f"job_cancel_{job.id}"):
+            runner.cancel(job.id)
+    elif st.button("Delete Job", key=f"job_delete_{job.id}"):
+        runner.remove(job.id)
+        st.rerun()
 
-    # Step 12.1: Move rows with missing weights to the end
-    st.write("### Reordering Rows with Missing Weights")
-    combined_df['Missing Weight'] = combined_df['ITEM WEIGHT (pounds)'].isnull()
-    combined_df = combined_df.sort_values(by='Missing Weight', ascending=True).drop(columns=['Missing Weight'])
-    st.success("Rows with missing weights have been moved to the bottom.")
-
-    # Step 12.2: Define a styling function for highlighting rows
-    def highlight_missing_weights(row):
-        if pd.isnull(row["ITEM WEIGHT (pounds)"]):
-            return ["background-color: #FFCCCC"] * len(row)
-        return [""] * len(row)
-
-    # Step 12.4: Format numeric columns to 2 decimal places
-    numeric_columns = [
-        "COST_PRICE",
-        "HANDLING COST",
-        "ITEM WEIGHT (pounds)",
-        "SHIPPING COST",
-        "RETAIL PRICE",
-        "MIN PRICE",
-        "MAX PRICE",
-    ]
-
-    # Apply formatting for numeric columns
-    styled_df = (
-        combined_df.style.apply(highlight_missing_weights, axis=1)
-        .format({col: "{:.2f}" for col in numeric_columns})
-    )
 
-    # Display the styled DataFrame with formatting
-    st.write("### Updated Final Data Preview with Highlights and Formatting")
-    st.dataframe(styled_df)
-
-if st.button("Export to Excel"):
-    buffer = BytesIO()
-    with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
-        # Write the main DataFrame to the first sheet
-        combined_df.to_excel(writer, index=False, sheet_name="Consolidated Data")
-
-        # Embed the shipping legend as a separate sheet
-        if shipping_legend is not None:
-            shipping_legend.to_excel(writer, index=False, sheet_name="ShippingLegend")
-
-        # Access the "Consolidated Data" worksheet
-        worksheet = writer.sheets["Consolidated Data"]
-
-        # Define a red fill style for missing weights
-        red_fill = PatternFill(start_color="FFCCCC", end_color="FFCCCC", fill_type="solid")
-
-        # Iterate over rows and add formulas for missing weights
-        for row_index, weight in enumerate(combined_df["ITEM WEIGHT (pounds)"], start=2):  # Start from row 2 (Excel row 2)
-            if pd.isnull(weight):
-                # Highlight the row in red
-                for col_index in range(1, len(combined_df.columns) + 1):
-                    worksheet.cell(row=row_index, column=col_index).fill = red_fill
-
-                # Add formulas to the relevant columns
-                worksheet.cell(row=row_index, column=10).value = f"=IF(I{row_index}<>\"\", ROUND(VLOOKUP(I{row_index}, ShippingLegend!A:C, 3, TRUE), 2), \"\")" # SHIPPING COST formula
-                worksheet.cell(row=row_index, column=11).value = (f"=IF(AND(E{row_index}<>\"\", F{row_index}<>\"\", J{row_index}<>\"\"), "f"ROUND((E{row_index}+F{row_index}+J{row_index})*1.35, 2), \"\")")  # RETAIL PRICE formula                
-                worksheet.cell(row=row_index, column=12).value = f"=K{row_index}"  # MIN PRICE formula
-                worksheet.cell(row=row_index, column=13).value = f"=IF(L{row_index}<>\"\", ROUND(L{row_index}*1.35, 2),\"\")"  # MAX PRICE formula
-
-    # Save the updated Excel file
-    buffer.seek(0)
-    st.download_button(
-        label="Download Excel File",
-        data=buffer.getvalue(),
-        file_name="Consolidated_Data_with_Embedded_Legend.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-    )
-    if combined_df.empty:
-        st.info("Upload one or more Excel files to get started.")
-    else:
-        st.success("The output file is ready for download.")
+show_jobs()
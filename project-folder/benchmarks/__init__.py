@@ -0,0 +1,7 @@
+"""
+Performance benchmarks for the conversion pipeline.
+
+Run from project-folder:
+
+    python -m benchmarks --rows 1000 10000
+"""
@@ -0,0 +1,191 @@
+"""
+Benchmark of the reader backends for supplier files.
+
+The synthetic vendor workbooks of benchmarks.synthetic are also written as
+one CSV and one Parquet file per sheet, then every available backend reads
+the same rows: pandas with calamine and with openpyxl, the streaming
+openpyxl read-only reader, CSV and Parquet. Each backend is timed (best of
+--repeat runs) and its rows are converted with process() to confirm they
+give the same table as the openpyxl reader; a backend that differs is
+reported with the first column and row that differ.
+
+    python -m benchmarks.readers --rows 10000 100000
+"""
+import argparse
+import os
+import platform
+import time
+
+import pandas as pd
+from openpyxl import load_workbook
+
+from benchmarks.run import RESULTS_DIR, WORK_DIR, _write_json
+from benchmarks.synthetic import BLOCKED_BRANDS, generate_vendor_files
+from convertor.brands import BlockedBrandMatcher
+from convertor.config import SHIPPING_LEGEND_PATH
+from convertor.pipeline import process
+from convertor.readers import CALAMINE, HAS_CALAMINE, OPENPYXL, SHEET_CODE_COLUMNS, read_frames
+from convertor.shipping import ShippingLegend
+from convertor.streaming import iter_sheet_chunks
+
+DEFAULT_SIZES = [10_000, 100_000]
+
+
+def write_flat_copies(paths):
+    """
+    Write each sheet of the workbooks as CSV and Parquet next to them, once.
+
+    Returns the CSV paths and the Parquet paths, in sheet order.
+    """
+    csv_paths, parquet_paths = [], []
+    for path in paths:
+        stem = os.path.splitext(path)[0]
+        workbook = load_workbook(path, read_only=True)
+        sheet_names = workbook.sheetnames
+        workbook.close()
+        for sheet in sheet_names:
+            csv_path, parquet_path = f"{stem}_{sheet}.csv", f"{stem}_{sheet}.parquet"
+            if not (os.path.exists(csv_path) and os.path.exists(parquet_path)):
+                df = pd.read_excel(path, sheet_name=sheet, dtype=SHEET_CODE_COLUMNS)
+                df.to_csv(csv_path, index=False)
+                # Parquet columns have one type, so columns mixing numbers and text are stored as text
+                text = {col: str for col in df.columns if df[col].dtype == object}
+                df.astype(text).to_parquet(parquet_path, index=False)
+            csv_paths.append(csv_path)
+            parquet_paths.append(parquet_path)
+    return csv_paths, parquet_paths
+
+
+def _read_all(paths, engine=None):
+    return [frame for path in paths for frame in read_frames(path, engine=engine)]
+
+
+def _read_streaming(paths):
+    return [chunk for path in paths for chunk in iter_sheet_chunks(path)]
+
+
+def backends(xlsx_paths, csv_paths, parquet_paths):
+    """
+    Name and read function of every backend available here.
+    """
+    available = [("xlsx openpyxl", lambda: _read_all(xlsx_paths, OPENPYXL))]
+    if HAS_CALAMINE:
+        available.append(("xlsx calamine", lambda: _read_all(xlsx_paths, CALAMINE)))
+    available += [
+        ("xlsx read-only stream", lambda: _read_streaming(xlsx_paths)),
+        ("csv", lambda: _read_all(csv_paths)),
+        ("parquet", lambda: _read_all(parquet_paths)),
+    ]
+    return available
+
+
+def first_difference(data, expected):
+    """
+    Where data first differs from expected, or None if the frames are equal.
+    """
+    data, expected = data.reset_index(drop=True), expected.reset_index(drop=True)
+    if list(data.columns) != list(expected.columns):
+        return f"columns {list(data.columns)} != {list(expected.columns)}"
+    if len(data) != len(expected):
+        return f"{len(data)} rows != {len(expected)}"
+    for col in data.columns:
+        if data[col].equals(expected[col]):
+            continue
+        values, expected_values = data[col].astype(object), expected[col].astype(object)
+        differs = (values != expected_values) & ~(values.isna() & expected_values.isna())
+        if differs.any():
+            row = int(differs.to_numpy().argmax())
+            return f"{col}, row {row}: {values[row]!r} != {expected_values[row]!r}"
+        return f"{col}: dtype {data[col].dtype} != {expected[col].dtype}"
+    return None
+
+
+def benchmark(readers, legend, blocked, repeat=3):
+    """
+    Time each backend (best of repeat runs) and check its rows convert like the first backend's.
+    """
+    results, expected = {}, None
+    for name, read in readers:
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            frames = read()
+            wall = time.perf_counter() - start
+            best = wall if best is None else min(best, wall)
+
+        data = process(pd.concat(frames, ignore_index=True), legend, blocked).data
+        if expected is None:
+            expected = data
+        difference = first_difference(data, expected)
+        results[name] = {
+            "wall_s": best,
+            "rows": sum(len(frame) for frame in frames),
+            "parity": difference is None,
+            "difference": difference,
+        }
+    return results
+
+
+def format_table(results):
+    fastest = min(m["wall_s"] for m in results.values())
+    lines = [f"{'backend':<24}{'wall s':>10}{'rows/s':>12}{'vs best':>9}{'parity':>8}"]
+    for name, m in results.items():
+        rate = m["rows"] / m["wall_s"] if m["wall_s"] else 0
+        lines.append(f"{name:<24}{m['wall_s']:>10.3f}{rate:>12,.0f}{m['wall_s'] / fastest:>8.1f}x{'ok' if m['parity'] else 'DIFF':>8}")
+    for name, m in results.items():
+        if not m["parity"]:
+            lines.append(f"DIFF {name}: {m['difference']}")
+    return "\n".join(lines)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.readers",
+        description="Compare the reader backends on the same synthetic supplier rows.",
+    )
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_SIZES, help="Total rows per run")
+    parser.add_argument("--files", type=int, default=2, help="Vendor workbooks per run")
+    parser.add_argument("--sheets", type=int, default=2, help="Sheets per workbook")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the generated data")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed reads per backend; the fastest counts")
+    parser.add_argument("--results-dir", default=RESULTS_DIR, help="Directory for the JSON results of this run")
+    parser.add_argument("--work-dir", default=WORK_DIR, help="Where generated files are kept between runs")
+    parser.add_argument("--shipping-legend", default=SHIPPING_LEGEND_PATH, help="Shipping legend workbook")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    legend = ShippingLegend.from_excel(args.shipping_legend)
+    blocked = BlockedBrandMatcher.from_names(BLOCKED_BRANDS)
+
+    failed = False
+    for rows in args.rows:
+        print(f"Generating {rows} rows in {args.files} file(s) x {args.sheets} sheet(s)...")
+        xlsx_paths = generate_vendor_files(args.work_dir, rows, args.files, args.sheets, args.seed)
+        csv_paths, parquet_paths = write_flat_copies(xlsx_paths)
+
+        results = benchmark(backends(xlsx_paths, csv_paths, parquet_paths), legend, blocked, args.repeat)
+        print(format_table(results))
+        _write_json(
+            os.path.join(args.results_dir, f"readers_{rows}.json"),
+            {
+                "rows": rows,
+                "files": args.files,
+                "sheets": args.sheets,
+                "seed": args.seed,
+                "python": platform.python_version(),
+                "pandas": pd.__version__,
+                "machine": platform.machine(),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "backends": results,
+            },
+        )
+        failed = failed or not all(m["parity"] for m in results.values())
+        print()
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,311 @@
+"""
+Stage-by-stage benchmark of the conversion pipeline.
+
+Each pipeline stage runs on synthetic vendor workbooks and is timed (wall and
+CPU time, best of --repeat runs). A separate pass under tracemalloc records
+each stage's peak memory, so the tracing overhead does not distort the
+timings. Results are written as JSON; with a stored baseline for the same
+row count, any stage that got slower or hungrier than the threshold allows
+fails the run. A baseline generated with other data parameters (files,
+sheets, duplicate and invalid UPC shares, seed) is not compared against.
+With --require-baseline, a row count without a matching baseline fails too.
+
+Baselines for the default sizes are kept in benchmarks/baselines. Timings
+only compare on the same machine; re-record them with --save-baseline after
+moving to a different one.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from io import BytesIO
+
+import pandas as pd
+
+from benchmarks.synthetic import BLOCKED_BRANDS, INVALID_UPC_RATIO, generate_vendor_files
+from convertor.brands import BlockedBrandMatcher
+from convertor.codes import invalid_codes
+from convertor.columns import compact_dtypes
+from convertor.config import SHIPPING_LEGEND_PATH
+from convertor.dedup import deduplicate
+from convertor.export import write_export
+from convertor.ingest import ingest
+from convertor.pipeline import (
+    add_prices,
+    add_shipping_cost,
+    add_weights,
+    clean_sku,
+    clean_title,
+    filter_blocked_brands,
+    format_cost_price,
+    format_upc,
+    move_missing_weights_last,
+    process,
+    rename_columns,
+)
+from convertor.shipping import ShippingLegend
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_DIR = os.path.join(BENCHMARK_DIR, "baselines")
+RESULTS_DIR = os.path.join(BENCHMARK_DIR, "results")
+WORK_DIR = os.path.join(tempfile.gettempdir(), "convertor-benchmarks")
+
+DEFAULT_SIZES = [1_000, 10_000]
+
+# Allowed slowdown or memory growth over the baseline, as a fraction
+DEFAULT_THRESHOLD = 0.25
+
+# Differences below these are measurement noise, never regressions
+MIN_SECONDS = 0.05
+MIN_PEAK_MB = 5.0
+
+# Settings of the generated data; timings only compare when they all match
+RUN_PARAMETERS = ["rows", "files", "sheets", "duplicates", "invalid_upcs", "seed"]
+
+
+def _prepare(state):
+    df = rename_columns(state["df"].copy())
+    df = clean_sku(df)
+    state["df"] = format_cost_price(df)
+
+
+def _ingest(state):
+    all_data, errors = ingest(state["sources"], max_workers=1)
+    if errors:
+        raise RuntimeError("; ".join(errors))
+    state["df"] = pd.concat(all_data, ignore_index=True)
+
+
+def _shipping_lookup(state):
+    state["df"] = add_shipping_cost(state["df"], state["legend"])
+
+
+def _dedup(state):
+    state["df"], _ = deduplicate(state["df"])
+
+
+def _blocked_filter(state):
+    state["df"], state["removed"] = filter_blocked_brands(state["df"], state["blocked"])
+    state["df"] = move_missing_weights_last(state["df"])
+
+
+def _validate_codes(state):
+    state["invalid"] = invalid_codes(state["df"])
+
+
+def _export(state):
+    buffer = BytesIO()
+    write_export(state["df"], buffer, "xlsx", state["legend"].frame)
+    state["export_bytes"] = len(buffer.getvalue())
+
+
+def _step(function):
+    def run(state):
+        state["df"] = function(state["df"])
+    return run
+
+
+# Stages in pipeline order; together they do what process() does, plus ingest and export
+STAGES = [
+    ("ingest", _ingest),
+    ("prepare", _prepare),
+    ("title cleanup", _step(clean_title)),
+    ("upc formatting", _step(format_upc)),
+    ("weight extraction", _step(add_weights)),
+    ("shipping lookup", _shipping_lookup),
+    ("pricing", _step(add_prices)),
+    ("compact dtypes", _step(compact_dtypes)),
+    ("dedup", _dedup),
+    ("blocked-brand filter", _blocked_filter),
+    ("upc validation", _validate_codes),
+    ("export", _export),
+]
+
+
+def _run_stages(state, trace_memory=False):
+    """
+    Run every stage once, returning per-stage measurements.
+    """
+    measurements = {}
+    for name, stage in STAGES:
+        rows_in = len(state["df"]) if "df" in state else 0
+        if trace_memory:
+            tracemalloc.start()
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        stage(state)
+        wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+        measurement = {"wall_s": wall, "cpu_s": cpu, "rows_in": rows_in, "rows_out": len(state["df"])}
+        if trace_memory:
+            measurement["peak_mb"] = tracemalloc.get_traced_memory()[1] / 2**20
+            tracemalloc.stop()
+        measurements[name] = measurement
+    return measurements
+
+
+def benchmark(sources, legend, blocked, repeat=3, memory=True):
+    """
+    Time each stage over sources (best of repeat runs) and, with memory, record its peak allocation.
+
+    Returns the stage measurements and the final state of the last run.
+    """
+    stages = None
+    for _ in range(repeat):
+        state = {"sources": sources, "legend": legend, "blocked": blocked}
+        run = _run_stages(state)
+        if stages is None:
+            stages = run
+        else:
+            for name, measurement in run.items():
+                if measurement["wall_s"] < stages[name]["wall_s"]:
+                    stages[name].update(wall_s=measurement["wall_s"], cpu_s=measurement["cpu_s"])
+
+    if memory:
+        traced = _run_stages({"sources": sources, "legend": legend, "blocked": blocked}, trace_memory=True)
+        for name, measurement in traced.items():
+            stages[name]["peak_mb"] = measurement["peak_mb"]
+    return stages, state
+
+
+def check_parity(state, legend, blocked):
+    """
+    Confirm the staged run produced the same table as process().
+    """
+    all_data, _ = ingest(state["sources"], max_workers=1)
+    expected = process(pd.concat(all_data, ignore_index=True), legend, blocked)
+    pd.testing.assert_frame_equal(state["df"], expected.data)
+    pd.testing.assert_frame_equal(state["removed"], expected.removed_rows)
+
+
+def mismatched_parameters(result, baseline):
+    """
+    List the RUN_PARAMETERS whose value in baseline differs from result.
+    """
+    return [
+        f"{name}: baseline {baseline.get(name)!r}, this run {result.get(name)!r}"
+        for name in RUN_PARAMETERS
+        if baseline.get(name) != result.get(name)
+    ]
+
+
+def compare(result, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    List the stages whose time or peak memory regressed past threshold.
+    """
+    regressions = []
+    for name, current in result["stages"].items():
+        previous = baseline["stages"].get(name)
+        if previous is None:
+            continue
+        for metric, floor in (("wall_s", MIN_SECONDS), ("peak_mb", MIN_PEAK_MB)):
+            if metric not in current or metric not in previous:
+                continue
+            limit = max(previous[metric] * (1 + threshold), previous[metric] + floor)
+            if current[metric] > limit:
+                regressions.append(f"{name}: {metric} {current[metric]:.3f} > {limit:.3f} (baseline {previous[metric]:.3f})")
+    return regressions
+
+
+def format_table(result):
+    lines = [f"{'stage':<22}{'wall s':>10}{'cpu s':>10}{'peak MB':>10}{'rows in':>10}{'rows out':>10}"]
+    for name, m in result["stages"].items():
+        peak = f"{m['peak_mb']:.1f}" if "peak_mb" in m else "-"
+        lines.append(f"{name:<22}{m['wall_s']:>10.3f}{m['cpu_s']:>10.3f}{peak:>10}{m['rows_in']:>10}{m['rows_out']:>10}")
+    total = sum(m["wall_s"] for m in result["stages"].values())
+    lines.append(f"{'total':<22}{total:>10.3f}")
+    return "\n".join(lines)
+
+
+def baseline_path(baseline_dir, rows):
+    return os.path.join(baseline_dir, f"{rows}.json")
+
+
+def _write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+        f.write("\n")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Benchmark each pipeline stage on synthetic vendor workbooks.",
+    )
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_SIZES, help="Total rows per run (1k to 1M)")
+    parser.add_argument("--files", type=int, default=2, help="Vendor workbooks per run")
+    parser.add_argument("--sheets", type=int, default=2, help="Sheets per workbook")
+    parser.add_argument("--duplicates", type=float, default=0.1, help="Share of rows that repeat earlier rows")
+    parser.add_argument("--invalid-upcs", type=float, default=INVALID_UPC_RATIO, help="Share of UPCs with a wrong check digit")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the generated data")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per size; the fastest counts")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc pass")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Allowed regression over the baseline")
+    parser.add_argument("--baseline-dir", default=BASELINE_DIR, help="Directory of JSON baselines")
+    parser.add_argument("--results-dir", default=RESULTS_DIR, help="Directory for the JSON results of this run")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--require-baseline", action="store_true", help="Fail when a row count has no baseline")
+    parser.add_argument("--work-dir", default=WORK_DIR, help="Where generated workbooks are kept between runs")
+    parser.add_argument("--shipping-legend", default=SHIPPING_LEGEND_PATH, help="Shipping legend workbook")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    legend = ShippingLegend.from_excel(args.shipping_legend)
+    blocked = BlockedBrandMatcher.from_names(BLOCKED_BRANDS)
+
+    failed = False
+    for rows in args.rows:
+        print(f"Generating {rows} rows in {args.files} file(s) x {args.sheets} sheet(s)...")
+        sources = generate_vendor_files(
+            args.work_dir, rows, args.files, args.sheets, args.seed, args.duplicates, args.invalid_upcs
+        )
+
+        stages, state = benchmark(sources, legend, blocked, repeat=args.repeat, memory=not args.no_memory)
+        check_parity(state, legend, blocked)
+        result = {
+            "rows": rows,
+            "files": args.files,
+            "sheets": args.sheets,
+            "duplicates": args.duplicates,
+            "invalid_upcs": args.invalid_upcs,
+            "seed": args.seed,
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "stages": stages,
+        }
+        print(format_table(result))
+        _write_json(os.path.join(args.results_dir, f"{rows}.json"), result)
+
+        path = baseline_path(args.baseline_dir, rows)
+        if args.save_baseline:
+            _write_json(path, result)
+            print(f"Saved baseline {path}")
+        elif os.path.exists(path):
+            with open(path) as f:
+                baseline = json.load(f)
+            mismatches = mismatched_parameters(result, baseline)
+            if mismatches:
+                print(f"BASELINE MISMATCH {path} was generated with other parameters; not compared.", file=sys.stderr)
+                for mismatch in mismatches:
+                    print(f"  {mismatch}", file=sys.stderr)
+                failed = failed or args.require_baseline
+            else:
+                regressions = compare(result, baseline, args.threshold)
+                for regression in regressions:
+                    print(f"REGRESSION {regression}", file=sys.stderr)
+                failed = failed or bool(regressions)
+        elif args.require_baseline:
+            print(f"MISSING BASELINE {path}; run with --save-baseline to create one.", file=sys.stderr)
+            failed = True
+        else:
+            print(f"No baseline for {rows} rows; run with --save-baseline to create one.")
+        print()
+
+    return 1 if failed else 0
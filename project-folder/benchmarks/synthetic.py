@@ -0,0 +1,142 @@
+"""
+Synthetic supplier workbooks in the layout the app expects.
+
+Columns B,E,G,H,I hold "Product Details", "Brand", "Product ID", "UPC Code"
+and "Price"; the other columns are filler the converter ignores. Titles mix
+oz, fl oz and pack-count spellings (and some without a usable weight), prices
+and SKUs mix numbers with formatted text, and a share of rows are exact
+duplicates of earlier rows. UPCs carry a correct check digit except for a
+controlled share (INVALID_UPC_RATIO), so validation rejects about as many
+rows as it would in a real catalog. Workbooks are written through openpyxl's
+write-only mode so even a million rows don't have to fit in a DataFrame.
+"""
+import os
+
+import numpy as np
+from openpyxl import Workbook
+
+HEADER = ["Row", "Product Details", "Category", "Seller", "Brand", "Color", "Product ID", "UPC Code", "Price"]
+
+BRANDS = [
+    "Great Value", "Neutrogena", "Lipton", "Dove", "Olay", "Kraft", "Stanley",
+    "Equate", "Tide", "Mainstays", "Hefty", "Folgers", "Quaker", "Colgate",
+]
+
+PRODUCTS = [
+    "Body Wash", "Green Tea", "Peanut Butter", "Shampoo", "Laundry Detergent",
+    "Olive Oil", "Coffee", "Hand Soap", "Oatmeal", "Toothpaste", "Lotion", "Syrup",
+]
+
+# Weight spellings the title parser understands, plus a few it doesn't
+UNITS = ["oz", "fl oz", "Ounces", "FL. OZ.", "ounce", "Fluid Ounces", "lb", ""]
+PACKS = ["", "", "", " 2 Pack", " Pack of 3", " 6pack", " 12-Pack"]
+MARKERS = ["", "", " (W+)", " (SP)", " (P)"]
+
+# Blocked in the benchmark runs; two of the generated brands
+BLOCKED_BRANDS = ["Stanley", "hefty", "Not A Real Brand"]
+
+# Share of generated UPCs given a wrong check digit
+INVALID_UPC_RATIO = 0.05
+
+# GTIN weights of the 11 data digits of a UPC-A code
+UPC_WEIGHTS = np.array([3, 1] * 5 + [3])
+
+
+def _titles(rng, n):
+    sizes = np.where(rng.random(n) < 0.5, rng.integers(1, 65, n).astype(str), np.round(rng.uniform(0.5, 40, n), 1).astype(str))
+    products = np.array(PRODUCTS)[rng.integers(0, len(PRODUCTS), n)]
+    units = np.array(UNITS)[rng.integers(0, len(UNITS), n)]
+    packs = np.array(PACKS)[rng.integers(0, len(PACKS), n)]
+    markers = np.array(MARKERS)[rng.integers(0, len(MARKERS), n)]
+    return [
+        f"{product} {size} {unit}{pack}{marker}"
+        for product, size, unit, pack, marker in zip(products, sizes, units, packs, markers)
+    ]
+
+
+def _upcs(rng, n, invalid_ratio):
+    """
+    n 12-digit UPC-A codes as integers; about invalid_ratio of them have a wrong check digit.
+    """
+    data = rng.integers(0, 10, (n, len(UPC_WEIGHTS)))
+    check = (10 - data @ UPC_WEIGHTS % 10) % 10
+    invalid = rng.random(n) < invalid_ratio
+    check[invalid] = (check[invalid] + rng.integers(1, 10, invalid.sum())) % 10
+    digits = np.column_stack([data, check])
+    return digits @ 10 ** np.arange(digits.shape[1] - 1, -1, -1, dtype="int64")
+
+
+def _mixed(numbers, text, use_text):
+    return [t if flag else n for n, t, flag in zip(numbers.tolist(), text, use_text)]
+
+
+def generate_rows(n_rows, seed=0, duplicate_ratio=0.1, invalid_upc_ratio=INVALID_UPC_RATIO):
+    """
+    n_rows supplier rows as lists of cell values; about duplicate_ratio of them repeat earlier rows.
+
+    About invalid_upc_ratio of the UPCs fail check-digit validation.
+    """
+    rng = np.random.default_rng(seed)
+    n_unique = max(1, int(n_rows * (1 - duplicate_ratio)))
+
+    skus = rng.integers(1000, 10**8, n_unique)
+    sku_cells = _mixed(skus, [f"{sku:,}" for sku in skus.tolist()], rng.random(n_unique) < 0.3)
+
+    upcs = _upcs(rng, n_unique, invalid_upc_ratio)
+    upc_cells = _mixed(upcs, [str(upc) for upc in upcs.tolist()], rng.random(n_unique) < 0.2)
+    for i in np.flatnonzero(rng.random(n_unique) < 0.02):
+        upc_cells[i] = None
+
+    prices = np.round(rng.uniform(1, 300, n_unique), 2)
+    price_cells = _mixed(prices, [f"${price:,.2f}" for price in prices.tolist()], rng.random(n_unique) < 0.25)
+
+    brands = np.array(BRANDS)[rng.integers(0, len(BRANDS), n_unique)].tolist()
+    titles = _titles(rng, n_unique)
+
+    rows = [
+        [i + 1, title, "Grocery", "Vendor", brand, "", sku, upc, price]
+        for i, (title, brand, sku, upc, price) in enumerate(zip(titles, brands, sku_cells, upc_cells, price_cells))
+    ]
+    if n_rows > n_unique:
+        duplicates = rng.integers(0, n_unique, n_rows - n_unique)
+        rows.extend(rows[i] for i in duplicates.tolist())
+        order = rng.permutation(n_rows)
+        rows = [rows[i] for i in order.tolist()]
+    return rows
+
+
+def write_workbook(path, rows, sheets=2):
+    """
+    Write rows to path, split evenly over the given number of sheets.
+    """
+    workbook = Workbook(write_only=True)
+    per_sheet = -(-len(rows) // sheets)
+    for sheet in range(sheets):
+        worksheet = workbook.create_sheet(f"Sheet{sheet + 1}")
+        worksheet.append(HEADER)
+        for row in rows[sheet * per_sheet:(sheet + 1) * per_sheet]:
+            worksheet.append(row)
+    workbook.save(path)
+
+
+def generate_vendor_files(
+    directory, n_rows, files=2, sheets=2, seed=0, duplicate_ratio=0.1, invalid_upc_ratio=INVALID_UPC_RATIO
+):
+    """
+    Write n_rows split over several vendor workbooks in directory and return their paths.
+
+    Files that already exist for the same parameters are reused.
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    per_file = -(-n_rows // files)
+    for f in range(files):
+        rows_in_file = min(per_file, n_rows - f * per_file)
+        name = f"vendor_{n_rows}_{seed}_d{duplicate_ratio}_i{invalid_upc_ratio}_{f + 1}of{files}_{sheets}sheets.xlsx"
+        path = os.path.join(directory, name)
+        if not os.path.exists(path):
+            rows = generate_rows(rows_in_file, seed * 1000 + f, duplicate_ratio, invalid_upc_ratio)
+            write_workbook(path + ".tmp", rows, sheets)
+            os.replace(path + ".tmp", path)
+        paths.append(path)
+    return paths
@@ -0,0 +1,3 @@
+"""
+Conversion engine behind the Streamlit file convertor.
+"""
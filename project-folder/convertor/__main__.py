@@ -0,0 +1,5 @@
+import sys
+
+from convertor.cli import main
+
+sys.exit(main())
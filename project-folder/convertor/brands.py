@@ -0,0 +1,245 @@
+"""
+Blocked brand list.
+
+Brands live in an SQLite database with a unique index on the normalized name
+(trimmed, inner whitespace collapsed, case-folded), so adding a brand is a
+single indexed insert and near-duplicate spellings collapse into one entry.
+The list imports from and exports to the Blocked_Brands.xlsx layout.
+
+The database is the blocked list; Blocked_Brands.xlsx only seeds it. When
+the workbook changes, the brands added to it are imported the next time the
+store is opened with it as seed_xlsx, but brands deleted from it stay
+blocked.
+"""
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from convertor.export import frame_to_xlsx_bytes
+
+BLOCKED_BRANDS_SHEET = "Blocked_Brands"
+BLOCKED_BRANDS_COLUMN = "Blocked Brands"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blocked_brands (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    brand TEXT NOT NULL,
+    normalized TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS store_meta (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO store_meta (name, value) VALUES ('revision', 0);
+"""
+
+
+def normalize_brand(name):
+    """
+    Matching key for a brand: trimmed, single-spaced and case-folded.
+    """
+    return " ".join(name.split()).casefold()
+
+
+def normalize_brands(names):
+    """
+    Vectorized normalize_brand for a Series; non-string entries become NaN.
+    """
+    names = pd.Series(names, dtype=object)
+    names = names.where(names.map(type) == str)
+    return names.str.split().str.join(" ").str.casefold()
+
+
+def read_blocked_brands_xlsx(source):
+    """
+    Brand names from a workbook with a 'Blocked Brands' column on its first sheet.
+    """
+    brands = pd.read_excel(source)
+    if BLOCKED_BRANDS_COLUMN not in brands.columns:
+        raise ValueError(f"The uploaded file must contain a '{BLOCKED_BRANDS_COLUMN}' column.")
+    return brands[BLOCKED_BRANDS_COLUMN].tolist()
+
+
+class BlockedBrandMatcher:
+    """
+    Precomputed set of normalized blocked brands.
+    """
+
+    def __init__(self, normalized):
+        self.normalized = frozenset(normalized)
+
+    @classmethod
+    def from_names(cls, names):
+        return cls(normalize_brands(list(names)).dropna())
+
+    def __len__(self):
+        return len(self.normalized)
+
+    def matches(self, brands):
+        """
+        Boolean mask of the rows whose BRAND is blocked.
+
+        Each distinct brand is normalized once.
+        """
+        brands = pd.Series(brands)
+        codes, uniques = pd.factorize(brands)
+        blocked = normalize_brands(uniques).isin(self.normalized).to_numpy()
+        mask = np.zeros(len(brands), dtype=bool)
+        found = codes >= 0
+        mask[found] = blocked[codes[found]]
+        return pd.Series(mask, index=brands.index)
+
+
+def brand_matcher(blocked_brands):
+    """
+    Return blocked_brands as a BlockedBrandMatcher, building one from names if needed.
+    """
+    if isinstance(blocked_brands, BlockedBrandMatcher):
+        return blocked_brands
+    return BlockedBrandMatcher.from_names(blocked_brands)
+
+
+class BlockedBrandStore:
+    """
+    Blocked brands persisted in an indexed SQLite database.
+
+    Every change bumps a revision number; the matcher, the display frame and
+    the xlsx download are rebuilt only when it changes.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._cached_revision = None
+        self._matcher = None
+        self._frame = None
+        self._xlsx = None
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @classmethod
+    def open(cls, path, seed_xlsx=None):
+        """
+        Open the store, importing the brands of seed_xlsx if the workbook changed since its last import.
+        """
+        store = cls(path)
+        if seed_xlsx and os.path.exists(seed_xlsx):
+            store.import_seed(seed_xlsx)
+        return store
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def revision(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT value FROM store_meta WHERE name = 'revision'").fetchone()[0]
+
+    def __len__(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM blocked_brands").fetchone()[0]
+
+    def upsert_many(self, brands):
+        """
+        Add every brand not already blocked. Returns how many were added.
+        """
+        rows = {}
+        for brand in brands:
+            if isinstance(brand, str) and brand.strip():
+                rows.setdefault(normalize_brand(brand), brand.strip())
+        if not rows:
+            return 0
+
+        with self._connect() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO blocked_brands (brand, normalized) VALUES (?, ?)",
+                [(brand, normalized) for normalized, brand in rows.items()],
+            )
+            added = conn.total_changes - before
+            if added:
+                conn.execute("UPDATE store_meta SET value = value + 1 WHERE name = 'revision'")
+        return added
+
+    def add(self, brand):
+        """
+        Block one brand. Returns False if it (or a spelling variant) is already blocked.
+        """
+        return self.upsert_many([brand]) == 1
+
+    def import_xlsx(self, source):
+        """
+        Bulk-add the brands of a Blocked Brands workbook. Returns how many were added.
+        """
+        return self.upsert_many(read_blocked_brands_xlsx(source))
+
+    def import_seed(self, path):
+        """
+        Import a seed workbook unless this version of it was imported before. Returns how many brands were added.
+
+        Only additions are imported; the store keeps brands the workbook no longer lists.
+        """
+        mtime = os.stat(path).st_mtime_ns
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM store_meta WHERE name = 'seed_mtime_ns'").fetchone()
+        if row is not None and row[0] == mtime:
+            return 0
+        added = self.import_xlsx(path)
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO store_meta (name, value) VALUES ('seed_mtime_ns', ?)", (mtime,))
+        return added
+
+    def _refresh(self):
+        revision = self.revision()
+        with self._lock:
+            if revision != self._cached_revision:
+                with self._connect() as conn:
+                    rows = conn.execute("SELECT brand, normalized FROM blocked_brands ORDER BY id").fetchall()
+                self._frame = pd.DataFrame([brand for brand, _ in rows], columns=[BLOCKED_BRANDS_COLUMN])
+                self._matcher = BlockedBrandMatcher(normalized for _, normalized in rows)
+                self._cached_revision = revision
+            return self._frame, self._matcher
+
+    def to_frame(self):
+        """
+        Blocked brands in insertion order, as a single 'Blocked Brands' column.
+        """
+        return self._refresh()[0]
+
+    def matcher(self):
+        """
+        Matcher over the current list, rebuilt only after changes.
+        """
+        return self._refresh()[1]
+
+    def xlsx_bytes(self):
+        """
+        The list in the Blocked_Brands.xlsx layout, serialized once per revision.
+        """
+        frame = self.to_frame()
+        with self._lock:
+            # A new frame is built for every revision, so it identifies the version
+            if self._xlsx is None or self._xlsx[0] is not frame:
+                self._xlsx = (frame, frame_to_xlsx_bytes(frame, BLOCKED_BRANDS_SHEET))
+            return self._xlsx[1]
+
+
+def open_blocked_brands(path, seed_xlsx=None):
+    """
+    Matcher for a Blocked Brands source: an .xlsx workbook or a store database.
+
+    A database is opened with BlockedBrandStore.open, so a new one is seeded
+    from seed_xlsx.
+    """
+    if path.lower().endswith(".xlsx"):
+        return BlockedBrandMatcher.from_names(read_blocked_brands_xlsx(path))
+    return BlockedBrandStore.open(path, seed_xlsx).matcher()
@@ -0,0 +1,319 @@
+"""
+Memoization of parsed uploads, reference data and conversion results.
+
+Streamlit re-executes the app on every interaction. Entries here are keyed by
+the content hash of each upload and the modification fingerprint of the
+reference files, so a rerun with the same inputs reuses earlier work instead
+of re-reading workbooks and recomputing the pipeline. The cache lives for the
+lifetime of the server process and evicts least recently used entries once
+its memory budget is exceeded.
+
+Generated downloads are cached the same way, under a version key naming
+the data they were built from, and built only when first downloaded.
+
+Cached objects are shared between reruns and sessions; treat them as
+read-only.
+"""
+import hashlib
+import os
+import sys
+import threading
+from collections import OrderedDict
+from functools import partial
+
+import pandas as pd
+
+from convertor.catalog import ListingDelta
+from convertor.config import CACHE_MAX_BYTES
+from convertor.dedup import DEFAULT_KEYS, KEEP_FIRST
+from convertor.ingest import label_frames, read_payloads, source_name, source_payload
+from convertor.pipeline import PipelineResult, process
+from convertor.shipping import ShippingLegend
+from convertor.streaming import StreamResult, stream_convert_bytes
+
+
+# Bytes of an upload hashed at a time, so hashing never copies a whole upload
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def content_hash(data):
+    """
+    Hex digest identifying the bytes of an upload.
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+def stream_hash(stream):
+    """
+    content_hash of a file-like object's contents, read in chunks from the start.
+
+    The stream's position is left unchanged.
+    """
+    position = stream.tell()
+    stream.seek(0)
+    digest = hashlib.sha256()
+    for block in iter(partial(stream.read, HASH_CHUNK_SIZE), b""):
+        digest.update(block)
+    stream.seek(position)
+    return digest.hexdigest()
+
+
+def file_fingerprint(path):
+    """
+    Key that changes whenever a reference file is rewritten.
+    """
+    stat = os.stat(path)
+    return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+
+def estimate_size(value):
+    """
+    Approximate memory footprint of a cached value in bytes.
+    """
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_size(item) for item in value) + sys.getsizeof(value)
+    if isinstance(value, PipelineResult):
+        return estimate_size(value.data) + estimate_size(value.removed_rows) + estimate_size(value.invalid_codes)
+    if isinstance(value, StreamResult):
+        return len(value.output) + len(value.invalid_codes)
+    if isinstance(value, ListingDelta):
+        return sum(estimate_size(frame) for frame in (value.added, value.changed, value.removed, value.previous))
+    if isinstance(value, ShippingLegend):
+        return estimate_size(value.frame)
+    return sys.getsizeof(value)
+
+
+class MemoryLRUCache:
+    """
+    Thread-safe LRU cache bounded by the estimated size of its entries.
+    """
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._entries:
+                return default
+            self._entries.move_to_end(key)
+            return self._entries[key][0]
+
+    def put(self, key, value):
+        """
+        Store value, evicting the least recently used entries to stay in budget.
+
+        Values larger than the whole budget are not stored.
+        """
+        size = estimate_size(value)
+        with self._lock:
+            if key in self._entries:
+                self.total_bytes -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, size)
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.total_bytes -= evicted_size
+
+    def get_or_compute(self, key, compute, refresh=False):
+        """
+        Return the cached value for key, computing and storing it on a miss.
+
+        With refresh, the value is recomputed and replaces any cached one.
+        """
+        value = _MISSING if refresh else self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+
+_MISSING = object()
+
+# Shared by every rerun and session of the app
+default_cache = MemoryLRUCache()
+
+
+def cached_shipping_legend(path, cache=default_cache):
+    """
+    Compiled shipping legend, reloaded only when the file changes.
+    """
+    return cache.get_or_compute(("shipping_legend", file_fingerprint(path)), lambda: ShippingLegend.from_excel(path))
+
+
+def upload_key(source):
+    """
+    Content hash of an uploaded file object or bytes, or the fingerprint of a file path.
+    """
+    if isinstance(source, bytes):
+        return content_hash(source)
+    if hasattr(source, "read"):
+        return stream_hash(source)
+    return file_fingerprint(source)
+
+
+def upload_keys(sources):
+    """
+    Content keys of sources, in order.
+    """
+    return tuple(upload_key(source) for source in sources)
+
+
+def reference_key(*paths):
+    """
+    Combined fingerprint of reference files; missing files key as None.
+    """
+    return tuple(file_fingerprint(path) if os.path.exists(path) else None for path in paths)
+
+
+def cached_ingest(sources, cache=default_cache):
+    """
+    Read uploads, parsing only those whose content has not been seen before.
+
+    Returns the keys of the uploads that were read successfully, their sheet
+    frames, and per-file errors. Uploads are hashed in chunks and only those
+    not cached yet are loaded for parsing. Failed reads are not cached.
+    """
+    sources = list(sources)
+    names = [source_name(source) for source in sources]
+    keys = [("sheets", upload_key(source)) for source in sources]
+
+    sheets = [cache.get(key) for key in keys]
+    missing = [i for i, frames in enumerate(sheets) if frames is None]
+    errors = []
+    jobs = ((names[i], source_payload(sources[i])) for i in missing)
+    for i, (frames, error) in zip(missing, read_payloads(jobs)):
+        if error:
+            errors.append(error)
+            continue
+        cache.put(keys[i], frames)
+        sheets[i] = frames
+
+    read_keys, all_data = [], []
+    for name, key, frames in zip(names, keys, sheets):
+        if frames is not None:
+            read_keys.append(key)
+            # The same content may have been cached under another file name
+            all_data.extend(label_frames(frames, name))
+    return tuple(read_keys), all_data, errors
+
+
+def cached_combine(upload_keys, all_data, cache=default_cache):
+    """
+    Combined raw frame for a set of uploads.
+    """
+    return cache.get_or_compute(("raw", upload_keys), lambda: pd.concat(all_data, ignore_index=True))
+
+
+def result_key(upload_keys, references, dedup_keys=DEFAULT_KEYS, keep=KEEP_FIRST):
+    """
+    Key of the cached pipeline result for these inputs, and the version of anything built from it.
+    """
+    return ("result", upload_keys, references, (tuple(dedup_keys) if dedup_keys is not None else None, keep))
+
+
+def cached_process(
+    upload_keys,
+    raw_df,
+    shipping_legend,
+    blocked_brands,
+    references,
+    instrument=None,
+    load_known_rows=None,
+    sources=None,
+    dedup_keys=DEFAULT_KEYS,
+    keep=KEEP_FIRST,
+    refresh=False,
+    cache=default_cache,
+):
+    """
+    Pipeline result for a set of uploads and reference data versions.
+
+    references identifies the versions shipping_legend and blocked_brands
+    came from, e.g. the legend's reference_key and the brand store revision.
+    Stages are recorded on instrument only when the pipeline actually runs.
+    load_known_rows returns rows to reuse (see ListingCatalog.known_rows) and
+    is only called when the pipeline runs; reuse only saves work, so it is not
+    part of the key. sources, dedup_keys and keep are passed to process();
+    the dedup settings are part of the key. refresh runs the pipeline even
+    when a result is cached, e.g. so that instrument can measure it.
+    """
+    def compute():
+        known_rows = load_known_rows() if load_known_rows else None
+        return process(raw_df, shipping_legend, blocked_brands, instrument, known_rows, sources, dedup_keys, keep)
+
+    return cache.get_or_compute(result_key(upload_keys, references, dedup_keys, keep), compute, refresh)
+
+
+def cached_stream_convert(
+    sources,
+    shipping_legend,
+    blocked_brands,
+    references,
+    instrument=None,
+    dedup_keys=DEFAULT_KEYS,
+    keep=KEEP_FIRST,
+    refresh=False,
+    cache=default_cache,
+):
+    """
+    StreamResult of a streaming conversion of sources, run once per set of uploads and reference versions.
+
+    references, the dedup settings and refresh are handled as in
+    cached_process; stages are recorded on instrument only when the
+    conversion runs.
+    """
+    key = ("stream",) + result_key(upload_keys(sources), references, dedup_keys, keep)[1:]
+    return cache.get_or_compute(
+        key, lambda: stream_convert_bytes(sources, shipping_legend, blocked_brands, instrument, dedup_keys, keep), refresh
+    )
+
+
+def cached_catalog_diff(catalog, listings, version, cache=default_cache):
+    """
+    ListingDelta of listings against the catalog snapshot, compared once per result and snapshot revision.
+
+    version is the result_key listings came from.
+    """
+    key = ("delta", version, catalog.path, catalog.revision())
+    return cache.get_or_compute(key, lambda: catalog.diff(listings))
+
+
+def cached_artifact(version, build, cache=default_cache):
+    """
+    Bytes of a generated download, built by build() once per version.
+
+    version names the artifact and the data it comes from, for example
+    ("removed_rows", result_key(...)), so it is rebuilt only when that data
+    changes.
+    """
+    return cache.get_or_compute(("artifact", version), build)
+
+
+def lazy_artifact(version, build, cache=default_cache):
+    """
+    A callable for st.download_button's data: the artifact is built on first download, then reused.
+    """
+    return partial(cached_artifact, version, build, cache)
@@ -0,0 +1,224 @@
+"""
+Catalog of the last saved conversion, for incremental daily runs.
+
+The catalog is an SQLite snapshot of the consolidated listings of the last
+saved run (in the compact layout), each with the hash of its cleaned supplier
+fields. A new run reuses the stored weight, shipping and price columns of
+rows whose fields are unchanged, and is compared against the snapshot by
+listing key (SKU and UPC/ISBN) to report added, changed and removed listings.
+
+Stored rows are only reused when the shipping legend and pricing constants
+match the version they were computed with.
+"""
+import hashlib
+import sqlite3
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from io import BytesIO
+
+import pandas as pd
+
+from convertor.columns import CONSTANT_COLUMNS, DERIVED_COLUMNS, source_hashes
+from convertor.export import write_sheets
+from convertor.pricing import HANDLING_COST, MAX_PRICE_FACTOR, RETAIL_MARKUP
+
+LISTING_KEY = ["SKU", "UPC/ISBN"]
+
+HASH_COLUMN = "source_hash"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS catalog_meta (
+    name TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def reference_version(shipping_legend):
+    """
+    Identifies the shipping legend and pricing constants derived columns were computed with.
+    """
+    digest = hashlib.sha256(f"{HANDLING_COST}:{RETAIL_MARKUP}:{MAX_PRICE_FACTOR}".encode())
+    if shipping_legend is not None:
+        digest.update(pd.util.hash_pandas_object(shipping_legend.frame, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+@dataclass
+class ListingDelta:
+    """
+    Listings added, changed and removed since the catalog snapshot.
+
+    changed holds the new rows of changed listings and previous their rows
+    in the snapshot.
+    """
+    added: pd.DataFrame
+    changed: pd.DataFrame
+    removed: pd.DataFrame
+    previous: pd.DataFrame
+
+    def __bool__(self):
+        return not (self.added.empty and self.changed.empty and self.removed.empty)
+
+    def counts(self):
+        return {"added": len(self.added), "changed": len(self.changed), "removed": len(self.removed)}
+
+    def sheets(self):
+        return {
+            "Added": self.added,
+            "Changed": self.changed,
+            "Previous Values": self.previous,
+            "Removed": self.removed,
+        }
+
+
+def write_delta_workbook(delta, target):
+    """
+    Write the delta as Added, Changed, Previous Values and Removed sheets.
+    """
+    write_sheets(delta.sheets(), target, constants=CONSTANT_COLUMNS)
+
+
+def delta_workbook_bytes(delta):
+    buffer = BytesIO()
+    write_delta_workbook(delta, buffer)
+    return buffer.getvalue()
+
+
+def _keys(df):
+    return pd.MultiIndex.from_frame(df[LISTING_KEY].astype(object))
+
+
+def _keys_with_hashes(keys, hashes):
+    return pd.MultiIndex.from_arrays([keys.get_level_values(0), keys.get_level_values(1), hashes.to_numpy()])
+
+
+def diff_listings(previous, current, previous_hashes=None, current_hashes=None):
+    """
+    Compare two listing tables by SKU and UPC/ISBN.
+
+    A listing is changed when any of its rows' supplier fields differ; a key
+    with several rows is compared as a whole.
+    """
+    if previous_hashes is None:
+        previous_hashes = source_hashes(previous)
+    if current_hashes is None:
+        current_hashes = source_hashes(current)
+
+    previous_keys, current_keys = _keys(previous), _keys(current)
+    added = ~current_keys.isin(previous_keys)
+    removed = ~previous_keys.isin(current_keys)
+
+    # Rows whose exact version exists on one side only, under a key both sides have
+    previous_rows = _keys_with_hashes(previous_keys, previous_hashes)
+    current_rows = _keys_with_hashes(current_keys, current_hashes)
+    changed_keys = current_keys[~current_rows.isin(previous_rows) & ~added].union(
+        previous_keys[~previous_rows.isin(current_rows) & ~removed]
+    )
+
+    return ListingDelta(
+        added=current[added],
+        changed=current[current_keys.isin(changed_keys)],
+        removed=previous[removed],
+        previous=previous[previous_keys.isin(changed_keys)],
+    )
+
+
+class ListingCatalog:
+    """
+    SQLite snapshot of the last saved run's listings.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _meta(self, conn, name):
+        row = conn.execute("SELECT value FROM catalog_meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def saved_at(self):
+        """
+        When the snapshot was last saved, or None if it never was.
+        """
+        with self._connect() as conn:
+            return self._meta(conn, "saved_at")
+
+    def revision(self):
+        """
+        Number of times the snapshot was saved; changes with every save.
+        """
+        with self._connect() as conn:
+            return int(self._meta(conn, "revision") or 0)
+
+    def load(self):
+        """
+        The snapshot as (listings, source hashes); empty if nothing was saved yet.
+        """
+        with self._connect() as conn:
+            if self._meta(conn, "saved_at") is None:
+                return pd.DataFrame(columns=LISTING_KEY), pd.Series([], dtype="int64")
+            listings = pd.read_sql("SELECT * FROM listings ORDER BY position", conn)
+        hashes = listings.pop(HASH_COLUMN)
+        listings = listings.drop(columns="position")
+        return listings, hashes
+
+    def known_rows(self, reference):
+        """
+        Derived columns of the snapshot indexed by source hash, if computed under reference.
+
+        Returns None when the snapshot is empty or was computed with another
+        shipping legend or pricing. The derived columns are always float64,
+        also when every stored value is NULL.
+        """
+        with self._connect() as conn:
+            if self._meta(conn, "reference") != reference:
+                return None
+            stored_columns = [row[1] for row in conn.execute("PRAGMA table_info(listings)")]
+            columns = ", ".join(f'"{col}"' for col in DERIVED_COLUMNS if col in stored_columns)
+            if not columns:
+                return None
+            known = pd.read_sql(f"SELECT {HASH_COLUMN}, {columns} FROM listings", conn)
+        known = known.astype({col: "float64" for col in known.columns if col != HASH_COLUMN})
+        return known.set_index(HASH_COLUMN)
+
+    def diff(self, listings):
+        """
+        Compare listings with the snapshot.
+        """
+        previous, previous_hashes = self.load()
+        if previous.empty:
+            previous = listings.iloc[0:0]
+            previous_hashes = pd.Series([], dtype="int64")
+        return diff_listings(previous, listings, previous_hashes, source_hashes(listings))
+
+    def save(self, listings, reference):
+        """
+        Replace the snapshot with listings, converted under reference.
+        """
+        stored = listings.reset_index(drop=True)
+        stored = stored.astype({col: object for col in stored.columns if isinstance(stored[col].dtype, pd.CategoricalDtype)})
+        stored.insert(0, "position", range(len(stored)))
+        stored[HASH_COLUMN] = source_hashes(listings).to_numpy()
+        with self._connect() as conn:
+            stored.to_sql("listings", conn, if_exists="replace", index=False)
+            conn.execute(f"CREATE INDEX IF NOT EXISTS listings_hash ON listings ({HASH_COLUMN})")
+            conn.executemany(
+                "INSERT OR REPLACE INTO catalog_meta (name, value) VALUES (?, ?)",
+                [("reference", reference), ("saved_at", time.strftime("%Y-%m-%d %H:%M:%S")), ("rows", str(len(stored)))],
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO catalog_meta (name, value) VALUES ('revision', ?)",
+                (str(int(self._meta(conn, "revision") or 0) + 1),),
+            )
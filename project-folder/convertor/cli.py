@@ -0,0 +1,196 @@
+"""
+Batch conversion from the command line, without Streamlit.
+
+Usage (from project-folder):
+
+    python -m convertor path/to/vendor_files -o Consolidated_Data.xlsx
+"""
+import argparse
+import glob
+import os
+import sys
+
+from convertor.brands import open_blocked_brands
+from convertor.catalog import ListingCatalog, reference_version, write_delta_workbook
+from convertor.codes import INVALID_CODES_SHEET
+from convertor.columns import CONSTANT_COLUMNS
+from convertor.config import BLOCKED_BRANDS_DB_PATH, BLOCKED_BRANDS_PATH, CATALOG_PATH, RUN_LOG_PATH, SHIPPING_LEGEND_PATH
+from convertor.dedup import DEFAULT_KEYS, KEEP_FIRST, KEEP_POLICIES
+from convertor.export import EXPORT_FORMATS, frame_to_xlsx_bytes, write_export
+from convertor.instrument import RunInstrument, stage_frame
+from convertor.pipeline import run_pipeline
+from convertor.profiles import load_profiles, price_profiles, profile_file_name, write_profile_export
+from convertor.readers import EXCEL_ENGINES, INPUT_EXTENSIONS
+from convertor.shipping import ShippingLegend
+from convertor.streaming import DEFAULT_CHUNK_SIZE, stream_convert
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m convertor",
+        description="Convert a directory of vendor files (xlsx, xls, csv or parquet) into the consolidated workbook.",
+        epilog="Parquet files, the calamine Excel reader, .xls files and YAML pricing profiles need the "
+        "optional packages in requirements-optional.txt.",
+    )
+    parser.add_argument("input_dir", help="Directory containing vendor files")
+    parser.add_argument("-o", "--output", default="Consolidated_Data_with_Embedded_Legend.xlsx", help="Output file path")
+    parser.add_argument(
+        "--format",
+        choices=sorted(EXPORT_FORMATS),
+        help="Output format; defaults to the output file's extension, else xlsx",
+    )
+    parser.add_argument("--shipping-legend", default=SHIPPING_LEGEND_PATH, help="Shipping legend workbook")
+    parser.add_argument(
+        "--blocked-brands",
+        help="Blocked Brands workbook (.xlsx) or brand database; defaults to the app's database. "
+        "A new database is seeded from the app's Blocked Brands file",
+    )
+    parser.add_argument("--removed-output", help="Also write rows removed for blocked brands to this workbook")
+    parser.add_argument("--invalid-codes-output", help="Also write output rows with an invalid UPC/ISBN to this workbook")
+    parser.add_argument(
+        "--dedup-keys",
+        nargs="+",
+        default=list(DEFAULT_KEYS),
+        metavar="COLUMN",
+        help="Columns that identify a duplicate listing, or 'all' for exact duplicate rows (default: SKU UPC/ISBN)",
+    )
+    parser.add_argument("--keep", choices=KEEP_POLICIES, default=KEEP_FIRST, help="Which duplicate to keep")
+    parser.add_argument(
+        "--excel-engine",
+        choices=EXCEL_ENGINES,
+        help="Excel parser for batch runs (--stream always reads with openpyxl); auto uses calamine when installed "
+        "(default: CONVERTOR_EXCEL_ENGINE or auto)",
+    )
+    parser.add_argument("--stream", action="store_true", help="Convert in bounded memory, chunk by chunk")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Rows per chunk in --stream mode")
+    parser.add_argument(
+        "--catalog",
+        nargs="?",
+        const=CATALOG_PATH,
+        help="Reuse unchanged rows from this catalog of the last run, write a delta workbook and save this run to it",
+    )
+    parser.add_argument("--delta-output", help="Delta workbook path with --catalog; defaults to <output>_delta.xlsx")
+    parser.add_argument(
+        "--pricing-profiles",
+        metavar="PATH",
+        help="Also write one output per marketplace pricing profile in this JSON, YAML or xlsx file",
+    )
+    parser.add_argument("--trace-memory", action="store_true", help="Record peak memory per stage (slower)")
+    parser.add_argument("--profile", metavar="PATH", help="Save cProfile stats of the run to PATH")
+    parser.add_argument("--run-log", default=RUN_LOG_PATH, help="Append a JSON line per run to this log; '' disables it")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    export_format = args.format or os.path.splitext(args.output)[1].lstrip(".").lower()
+    if export_format not in EXPORT_FORMATS:
+        export_format = "xlsx"
+    if args.stream and export_format != "xlsx":
+        parser.error("--stream writes xlsx output only")
+    if args.stream and args.catalog:
+        parser.error("--catalog is not supported with --stream")
+    if args.stream and args.pricing_profiles:
+        parser.error("--pricing-profiles is not supported with --stream")
+    if args.stream and args.excel_engine:
+        parser.error("--excel-engine is not supported with --stream, which reads workbooks with openpyxl")
+
+    dedup_keys = None if args.dedup_keys == ["all"] else args.dedup_keys
+
+    sources = sorted(
+        path
+        for extensions in INPUT_EXTENSIONS.values()
+        for extension in extensions
+        for path in glob.glob(os.path.join(args.input_dir, f"*.{extension}"))
+    )
+    if not sources:
+        print(f"No vendor files found in {args.input_dir}", file=sys.stderr)
+        return 1
+
+    legend = ShippingLegend.from_excel(args.shipping_legend)
+    profiles = load_profiles(args.pricing_profiles) if args.pricing_profiles else []
+    blocked = open_blocked_brands(args.blocked_brands or BLOCKED_BRANDS_DB_PATH, seed_xlsx=BLOCKED_BRANDS_PATH)
+    if not len(blocked):
+        print(f"Warning: no blocked brands in {args.blocked_brands or BLOCKED_BRANDS_DB_PATH}; no rows are filtered.", file=sys.stderr)
+
+    instrument = RunInstrument(trace_memory=args.trace_memory, profile=bool(args.profile))
+    if args.stream:
+        metrics, errors, dedup = stream_convert(
+            sources,
+            args.output,
+            legend,
+            blocked,
+            chunk_size=args.chunk_size,
+            removed_target=args.removed_output,
+            instrument=instrument,
+            dedup_keys=dedup_keys,
+            keep=args.keep,
+            invalid_target=args.invalid_codes_output,
+        )
+        for error in errors:
+            print(error, file=sys.stderr)
+    else:
+        catalog = ListingCatalog(args.catalog) if args.catalog else None
+        legend_version = reference_version(legend)
+        known_rows = catalog.known_rows(legend_version) if catalog else None
+        result = run_pipeline(sources, legend, blocked, instrument, known_rows, dedup_keys, args.keep, args.excel_engine)
+        for error in result.errors:
+            print(error, file=sys.stderr)
+        if result.data.empty:
+            print("No rows to export.", file=sys.stderr)
+            return 1
+
+        with instrument.stage("Export", len(result.data)):
+            write_export(result.data, args.output, export_format, legend.frame)
+            if args.removed_output and not result.removed_rows.empty:
+                with open(args.removed_output, "wb") as f:
+                    f.write(frame_to_xlsx_bytes(result.removed_rows, "Removed_Blocked_Brands", CONSTANT_COLUMNS))
+            if args.invalid_codes_output:
+                with open(args.invalid_codes_output, "wb") as f:
+                    f.write(frame_to_xlsx_bytes(result.invalid_codes, INVALID_CODES_SHEET))
+        metrics, dedup = result.metrics, result.dedup
+
+        if profiles:
+            # Every profile is priced from the one converted table
+            with instrument.stage("Pricing profiles", len(result.data) * len(profiles)):
+                priced = price_profiles(result.data, profiles, legend)
+            # Named after the output, with the extension of the format actually written
+            stem = os.path.splitext(args.output)[0]
+            with instrument.stage("Export", len(result.data) * len(profiles)):
+                for profile in profiles:
+                    path = profile_file_name(stem, profile.name, export_format)
+                    write_profile_export(priced[profile.name], profile, path, export_format, legend)
+                    print(f"Wrote {path} ({profile.name} pricing)")
+
+        if catalog is not None:
+            delta_output = args.delta_output or f"{os.path.splitext(args.output)[0]}_delta.xlsx"
+            with instrument.stage("Delta workbook", len(result.data)):
+                delta = catalog.diff(result.data)
+                write_delta_workbook(delta, delta_output)
+                catalog.save(result.data, legend_version)
+            counts = delta.counts()
+            print(f"Delta: {counts['added']} added, {counts['changed']} changed, {counts['removed']} removed; wrote {delta_output}")
+    instrument.finish()
+
+    print(f"Total Listings in Input Files: {metrics.total_input_listings}")
+    print(f"Total Listings in Output File: {metrics.total_output_listings}")
+    print(f"Total Duplicates Removed: {metrics.duplicates_removed}")
+    for source, count in dedup.frame().itertuples(index=False):
+        print(f"  {source}: {count}")
+    if dedup.removed:
+        print(f"  from another file: {dedup.cross_file}")
+    print(f"Total Blocked-Brand Listings Removed: {metrics.blocked_removed}")
+    print(f"Listings with No Weights: {metrics.listings_no_weights}")
+    print(f"Listings with an Invalid UPC/ISBN: {metrics.invalid_codes}")
+    print()
+    print(stage_frame(instrument.stages).to_string(index=False))
+    print(f"Wrote {args.output}")
+
+    if args.profile and instrument.dump_profile(args.profile):
+        print(f"Saved profile {args.profile}")
+    if args.run_log:
+        instrument.write_log(
+            args.run_log, metrics, source="cli", mode="stream" if args.stream else "batch", files=len(sources)
+        )
+    return 0
@@ -0,0 +1,116 @@
+"""
+Product code cleanup and GTIN check-digit validation.
+
+SKU and UPC/ISBN are read as text (see convertor.readers.CODE_COLUMNS), so
+leading zeros and 13-14 digit GTINs reach the cleanup intact instead of
+passing through float. Codes that still arrive as numbers, for example from
+a sheet whose headers did not match, are printed without their ".0". All
+steps work on whole columns; check digits are computed on a NumPy matrix of
+the digits.
+
+UPC/ISBN codes shorter than 12 digits are zero padded to GTIN-12 as before,
+and missing codes still become "000000000000". Codes are not dropped when
+they fail validation; invalid_codes lists them for a separate report.
+"""
+import numpy as np
+import pandas as pd
+
+UPC_LENGTH = 12
+MAX_GTIN_LENGTH = 14
+
+# What format_upc leaves in UPC/ISBN when the supplier gave no code
+MISSING_UPC = "0" * UPC_LENGTH
+
+# Columns of the invalid-code report, followed by PROBLEM_COLUMN
+REPORT_COLUMNS = ["TITLE", "BRAND", "SKU", "UPC/ISBN"]
+PROBLEM_COLUMN = "PROBLEM"
+INVALID_CODES_SHEET = "Invalid_UPC_ISBN"
+
+NOT_DIGITS = "not a number"
+TOO_LONG = "more than 14 digits"
+BAD_CHECK_DIGIT = "wrong check digit"
+
+# GTIN weights of the 13 data digits of a code zero padded to 14 digits
+CHECK_WEIGHTS = np.tile(np.array([3, 1], dtype="int64"), 7)[:MAX_GTIN_LENGTH - 1]
+
+
+def code_text(values):
+    """
+    Codes as stripped text; missing values stay missing.
+
+    Columns that were not read as text may hold whole numbers as floats;
+    their trailing ".0" is dropped.
+    """
+    # Before pandas 3, astype(str) turns missing values into "nan" or "None"
+    text = values.astype(str).str.strip().where(values.notna())
+    if isinstance(values.dtype, pd.StringDtype):
+        return text
+    return text.str.replace(r"^(\d+)\.0+$", r"\1", regex=True)
+
+
+def clean_skus(values):
+    """
+    SKUs as text without thousands separators.
+    """
+    return code_text(values).str.replace(",", "", regex=False).str.strip()
+
+
+def normalize_upcs(values):
+    """
+    UPC/ISBN codes as digit strings of at least 12 digits.
+
+    Spaces and hyphens (as in printed ISBNs) are removed. Codes with other
+    characters are kept as they are for invalid_codes to report.
+    """
+    text = code_text(values).fillna("").str.replace(r"[\s-]", "", regex=True)
+    digits = text.str.fullmatch(r"\d*").to_numpy(dtype=bool)
+    return text.where(~digits, text.str.zfill(UPC_LENGTH))
+
+
+def check_digits_valid(codes):
+    """
+    Mask of digit codes of up to 14 digits whose last digit is the GTIN check digit.
+
+    Padding with leading zeros does not change a GTIN's check digit, so
+    GTIN-12, -13 and -14 are checked together as 14-digit rows.
+    """
+    if len(codes) == 0:
+        return np.zeros(0, dtype=bool)
+    padded = np.asarray(pd.Series(codes).str.zfill(MAX_GTIN_LENGTH).to_numpy(dtype=str), dtype=f"S{MAX_GTIN_LENGTH}")
+    digits = padded.view(np.uint8).reshape(-1, MAX_GTIN_LENGTH).astype("int64") - ord("0")
+    expected = (10 - digits[:, :-1] @ CHECK_WEIGHTS % 10) % 10
+    return expected == digits[:, -1]
+
+
+def upc_problems(upcs):
+    """
+    Why each normalized UPC/ISBN is invalid, or "" for valid and missing codes.
+    """
+    upcs = pd.Series(upcs).fillna("").astype(str)
+    problems = np.full(len(upcs), "", dtype=object)
+    digits = upcs.str.fullmatch(r"\d+").to_numpy(dtype=bool)
+    problems[~digits & (upcs != "").to_numpy()] = NOT_DIGITS
+
+    too_long = digits & (upcs.str.len() > MAX_GTIN_LENGTH).to_numpy()
+    problems[too_long] = TOO_LONG
+
+    checked = digits & ~too_long & (upcs != MISSING_UPC).to_numpy()
+    bad = np.zeros(len(upcs), dtype=bool)
+    bad[checked] = ~check_digits_valid(upcs[checked])
+    problems[bad] = BAD_CHECK_DIGIT
+    return pd.Series(problems, index=upcs.index)
+
+
+def invalid_codes(combined_df):
+    """
+    Rows of combined_df with an invalid UPC/ISBN, with the reason in PROBLEM.
+    """
+    columns = [col for col in REPORT_COLUMNS if col in combined_df.columns]
+    if "UPC/ISBN" not in combined_df.columns:
+        return pd.DataFrame(columns=columns + [PROBLEM_COLUMN])
+
+    problems = upc_problems(combined_df["UPC/ISBN"])
+    invalid = (problems != "").to_numpy()
+    report = combined_df.loc[invalid, columns].copy()
+    report[PROBLEM_COLUMN] = problems[invalid].to_numpy()
+    return report
@@ -0,0 +1,99 @@
+"""
+Compact in-memory layout of the listing table.
+
+HANDLING COST, QUANTITY and ITEM LOCATION hold the same value on every row,
+so the working frame leaves them out and they are added back, in their usual
+place, only when rows are exported or displayed. BRAND is stored as a
+categorical, text columns as Arrow-backed strings when pyarrow is installed,
+and integer columns in the smallest type that holds their values. Floats stay
+float64: prices and weights do not survive a round trip through float32.
+"""
+import importlib.util
+
+import numpy as np
+import pandas as pd
+
+from convertor.pricing import HANDLING_COST
+
+QUANTITY = 1
+ITEM_LOCATION = "WALMART"
+
+# Same value on every row, in output order
+CONSTANT_COLUMNS = {
+    "HANDLING COST": HANDLING_COST,
+    "QUANTITY": QUANTITY,
+    "ITEM LOCATION": ITEM_LOCATION,
+}
+
+# Columns computed after the constants; the constants go right before the first of these
+DERIVED_COLUMNS = ["ITEM WEIGHT (pounds)", "SHIPPING COST", "RETAIL PRICE", "MIN PRICE", "MAX PRICE"]
+
+# Cleaned supplier fields every derived column is computed from
+SOURCE_FIELDS = ["TITLE", "BRAND", "SKU", "UPC/ISBN", "COST_PRICE"]
+
+CATEGORY_COLUMNS = ["BRAND"]
+TEXT_COLUMNS = ["TITLE", "SKU", "UPC/ISBN"]
+
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+
+def constant_column(value, length, index=None):
+    """
+    A column repeating value; strings become a single-category categorical.
+    """
+    if isinstance(value, str):
+        values = pd.Categorical.from_codes(np.zeros(length, dtype="int8"), categories=[value])
+        return pd.Series(values, index=index)
+    return pd.Series(np.full(length, value), index=index)
+
+
+def with_constant_columns(combined_df, constants=CONSTANT_COLUMNS):
+    """
+    Return combined_df with any missing constant columns filled in at their usual position.
+    """
+    missing = [name for name in constants if name not in combined_df.columns]
+    if not missing:
+        return combined_df
+
+    position = len(combined_df.columns)
+    for name in DERIVED_COLUMNS:
+        if name in combined_df.columns:
+            position = combined_df.columns.get_loc(name)
+            break
+
+    combined_df = combined_df.copy(deep=False)
+    for name in missing:
+        combined_df.insert(position, name, constant_column(constants[name], len(combined_df), combined_df.index))
+        position += 1
+    return combined_df
+
+
+def source_hashes(combined_df):
+    """
+    Hash of each row's cleaned supplier fields, as int64 so it fits an SQLite integer.
+
+    The hash does not depend on whether a column is stored compactly.
+    """
+    fields = [col for col in SOURCE_FIELDS if col in combined_df.columns]
+    hashes = pd.util.hash_pandas_object(combined_df[fields], index=False).to_numpy()
+    return pd.Series(hashes.view("int64"), index=combined_df.index)
+
+
+def compact_dtypes(combined_df):
+    """
+    Convert BRAND to a categorical, object text columns to Arrow strings and shrink integers.
+
+    Values are unchanged; only their in-memory representation is.
+    """
+    for col in CATEGORY_COLUMNS:
+        if col in combined_df.columns and not isinstance(combined_df[col].dtype, pd.CategoricalDtype):
+            combined_df[col] = combined_df[col].astype("category")
+
+    if HAS_PYARROW:
+        for col in TEXT_COLUMNS:
+            if col in combined_df.columns and combined_df[col].dtype == object:
+                combined_df[col] = combined_df[col].astype("string[pyarrow]")
+
+    for col in combined_df.select_dtypes("integer").columns:
+        combined_df[col] = pd.to_numeric(combined_df[col], downcast="integer")
+    return combined_df
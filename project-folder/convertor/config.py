@@ -0,0 +1,38 @@
+"""
+Default locations of the reference data shipped with the app.
+"""
+import os
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+# Path to the shipping legend
+SHIPPING_LEGEND_PATH = os.path.join(DATA_DIR, "default_shipping_legend.xlsx")
+
+# Path for Blocked Brands file, used to seed the blocked brand database
+BLOCKED_BRANDS_PATH = os.path.join(DATA_DIR, "Blocked_Brands.xlsx")
+
+# Blocked brand database used by the app
+BLOCKED_BRANDS_DB_PATH = os.environ.get("CONVERTOR_BLOCKED_BRANDS_DB", os.path.join(DATA_DIR, "blocked_brands.sqlite3"))
+
+# Excel parser for supplier files: "calamine" (python-calamine), "openpyxl", or "auto" for calamine when installed
+EXCEL_ENGINE = os.environ.get("CONVERTOR_EXCEL_ENGINE", "auto")
+
+# Memory budget for cached uploads and results, in megabytes
+CACHE_MAX_BYTES = int(os.environ.get("CONVERTOR_CACHE_MB", "512")) * 1024 * 1024
+
+# JSON-lines log of conversion runs with per-stage timings; empty disables it
+RUN_LOG_PATH = os.environ.get("CONVERTOR_RUN_LOG", os.path.join(DATA_DIR, "run_log.jsonl"))
+
+# Where cProfile stats of profiled runs are saved
+PROFILE_DIR = os.environ.get("CONVERTOR_PROFILE_DIR", os.path.join(DATA_DIR, "profiles"))
+
+# Snapshot of the last saved run, for reusing unchanged rows and building delta workbooks
+CATALOG_PATH = os.environ.get("CONVERTOR_CATALOG", os.path.join(DATA_DIR, "listing_catalog.sqlite3"))
+
+# Marketplace pricing profiles offered for export when the file exists (JSON, YAML or xlsx)
+PRICING_PROFILES_PATH = os.environ.get("CONVERTOR_PRICING_PROFILES", os.path.join(DATA_DIR, "pricing_profiles.json"))
+
+# Background conversion jobs: their store, their files and how many run at once
+JOB_STORE_PATH = os.environ.get("CONVERTOR_JOB_STORE", os.path.join(DATA_DIR, "jobs.sqlite3"))
+JOBS_DIR = os.environ.get("CONVERTOR_JOBS_DIR", os.path.join(DATA_DIR, "jobs"))
+MAX_CONCURRENT_JOBS = int(os.environ.get("CONVERTOR_MAX_JOBS", "2"))
@@ -0,0 +1,244 @@
+"""
+Key-based deduplication.
+
+Listings are duplicates when their key columns match, by default SKU and
+UPC/ISBN, so a product repeated across sheets with a slightly different title
+or price still collapses to one row. keys=None compares all columns, i.e.
+exact duplicate rows. The keep policy picks the surviving row: the first one
+seen, or the one with the lowest COST_PRICE (ties go to the first seen).
+
+Rows are compared by a 64-bit hash of their keys; rows with no SKU or
+UPC/ISBN at all only match identical rows. deduplicate works on a whole
+table in memory. For chunked conversions, DedupIndex keeps only a hash table
+of key hashes (with the source file and best cost per key), so each chunk
+costs time in proportion to its own rows and memory stays bounded by the
+number of distinct keys rather than rows.
+
+Duplicates are counted per source file, and separately when the surviving
+row came from a different file (cross-file duplicates).
+"""
+from dataclasses import dataclass, field, replace
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_KEYS = ("SKU", "UPC/ISBN")
+
+KEEP_FIRST = "first"
+KEEP_LOWEST_COST = "lowest_cost"
+KEEP_POLICIES = (KEEP_FIRST, KEEP_LOWEST_COST)
+
+COST_COLUMN = "COST_PRICE"
+
+# What the cleanup steps leave in SKU and UPC/ISBN when the supplier gave no value
+BLANK_KEY_VALUES = ["", "nan", "000000000000"]
+
+
+@dataclass
+class DedupReport:
+    """
+    How many duplicates were removed, in total and per source file.
+    """
+    keys: tuple = DEFAULT_KEYS
+    keep: str = KEEP_FIRST
+    removed: int = 0
+    cross_file: int = 0
+    by_source: dict = field(default_factory=dict)
+
+    def count(self, removed, sources=None, cross_file=0):
+        """
+        Add removed duplicates; sources are their source file names, if known.
+        """
+        self.removed += int(removed)
+        self.cross_file += int(cross_file)
+        if sources is None:
+            return
+        for source, count in pd.Series(sources, dtype=object).value_counts(sort=False).items():
+            self.by_source[source] = self.by_source.get(source, 0) + int(count)
+
+    def frame(self):
+        """
+        Per-file table for display.
+        """
+        return pd.DataFrame(
+            sorted(self.by_source.items(), key=lambda item: -item[1]),
+            columns=["Source File", "Duplicates Removed"],
+        )
+
+
+def resolve_keys(combined_df, keys):
+    """
+    Key columns to compare: keys if the frame has them all, else every column.
+    """
+    if keys is None or not all(col in combined_df.columns for col in keys):
+        return list(combined_df.columns)
+    return list(keys)
+
+
+def _costs(combined_df):
+    """
+    COST_PRICE as float64 with missing costs ranked last.
+    """
+    if COST_COLUMN not in combined_df.columns:
+        return np.zeros(len(combined_df))
+    costs = pd.to_numeric(combined_df[COST_COLUMN], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    return np.where(np.isnan(costs), np.inf, costs)
+
+
+def _check_keep(keep):
+    if keep not in KEEP_POLICIES:
+        raise ValueError(f"Unknown keep policy: {keep}. Choose one of {', '.join(KEEP_POLICIES)}.")
+
+
+def _blank_keys(keys_df):
+    """
+    Mask of rows whose key columns hold no value at all.
+    """
+    blank = np.ones(len(keys_df), dtype=bool)
+    for col in keys_df.columns:
+        values = keys_df[col]
+        blank &= (values.isna() | values.astype(str).str.strip().isin(BLANK_KEY_VALUES)).to_numpy()
+    return blank
+
+
+def key_hashes(combined_df, keys=DEFAULT_KEYS):
+    """
+    64-bit hash of each row's key columns.
+
+    Rows without any key value are hashed on all columns instead, so they are
+    only duplicates of identical rows.
+    """
+    subset = resolve_keys(combined_df, keys)
+    hashes = pd.util.hash_pandas_object(combined_df[subset], index=False).to_numpy(copy=True)
+    if len(subset) < len(combined_df.columns):
+        blank = _blank_keys(combined_df[subset])
+        if blank.any():
+            hashes[blank] = pd.util.hash_pandas_object(combined_df[blank], index=False).to_numpy()
+    return hashes
+
+
+def deduplicate(combined_df, keys=DEFAULT_KEYS, keep=KEEP_FIRST, sources=None):
+    """
+    Drop duplicate listings, keeping the surviving rows in their original order.
+
+    sources gives the source file of each row, by position, for the per-file
+    counts. Returns the deduplicated frame and a DedupReport.
+    """
+    _check_keep(keep)
+    report = DedupReport(tuple(keys) if keys is not None else None, keep)
+    if combined_df.empty:
+        return combined_df, report
+
+    hashes = key_hashes(combined_df, keys)
+    if keep == KEEP_LOWEST_COST:
+        # Cheapest first, first seen among equal costs
+        order = np.lexsort((np.arange(len(combined_df)), _costs(combined_df)))
+    else:
+        order = np.arange(len(combined_df))
+    duplicate = np.empty(len(combined_df), dtype=bool)
+    duplicate[order] = pd.Series(hashes[order]).duplicated().to_numpy()
+
+    if sources is not None:
+        sources = np.asarray(sources, dtype=object)
+        # Source file of the surviving row of each duplicate's key
+        survivors = pd.Series(sources[~duplicate], index=hashes[~duplicate])
+        survivor_source = survivors.reindex(hashes[duplicate]).to_numpy()
+        report.count(duplicate.sum(), sources[duplicate], (sources[duplicate] != survivor_source).sum())
+    else:
+        report.count(duplicate.sum())
+    return combined_df[~duplicate], report
+
+
+class DedupIndex:
+    """
+    Incremental deduplication over chunks in bounded memory.
+
+    With keep="lowest_cost", every chunk must first go through observe() so
+    the cheapest cost per key is known before filter() sees any chunk.
+    """
+
+    def __init__(self, keys=DEFAULT_KEYS, keep=KEEP_FIRST):
+        _check_keep(keep)
+        self.keys = keys
+        self.keep = keep
+        self.report = DedupReport(tuple(keys) if keys is not None else None, keep)
+        self._sources = []
+        # Key hash of every row kept so far -> its source file index, in the order kept
+        self._kept = {}
+        # Key hash seen by observe() -> (lowest cost, source file index of that row)
+        self._best = {}
+
+    def __len__(self):
+        return len(self._kept)
+
+    def checkpoint(self):
+        """
+        State of the kept keys and counts, for rollback().
+        """
+        return len(self._kept), replace(self.report, by_source=dict(self.report.by_source))
+
+    def rollback(self, state):
+        """
+        Forget the rows kept and the duplicates counted since checkpoint() returned state.
+        """
+        kept, self.report = state
+        # Keys are only ever added, so the ones kept since the checkpoint are the last ones
+        while len(self._kept) > kept:
+            self._kept.popitem()
+
+    def observe(self, chunk, source=None):
+        """
+        Record the lowest COST_PRICE of each key in chunk.
+
+        Chunks must be observed in the order they will be filtered.
+        """
+        hashes, costs = key_hashes(chunk, self.keys), _costs(chunk)
+        # lexsort is stable, so the first row seen wins among equal costs
+        order = np.lexsort((costs, hashes))
+        hashes, costs = hashes[order], costs[order]
+        first = np.ones(len(hashes), dtype=bool)
+        first[1:] = hashes[1:] != hashes[:-1]
+
+        source_index = self._source_index(source)
+        best = self._best
+        for key, cost in zip(hashes[first].tolist(), costs[first].tolist()):
+            previous = best.get(key)
+            if previous is None or cost < previous[0]:
+                best[key] = (cost, source_index)
+
+    def _source_index(self, source):
+        if source not in self._sources:
+            self._sources.append(source)
+        return self._sources.index(source)
+
+    def filter(self, chunk, source=None):
+        """
+        Mask of the rows of chunk to keep; counts the others as duplicates from source.
+        """
+        hashes = key_hashes(chunk, self.keys)
+        keys = hashes.tolist()
+        source_index = self._source_index(source)
+        kept_source = np.array([self._kept.get(key, -1) for key in keys], dtype="int32")
+        seen = kept_source >= 0
+
+        if self.keep == KEEP_LOWEST_COST:
+            best = [self._best.get(key) for key in keys]
+            if None in best:
+                raise ValueError("DedupIndex.observe() must see every chunk before filter() with keep='lowest_cost'.")
+            best_cost = np.array([cost for cost, _ in best], dtype="float64")
+            # The first row at its key's lowest cost survives
+            candidates = np.flatnonzero(_costs(chunk) == best_cost)
+            keep = np.zeros(len(chunk), dtype=bool)
+            keep[candidates[~pd.Series(hashes[candidates]).duplicated().to_numpy()]] = True
+            survivor_source = np.array([index for _, index in best], dtype="int32")
+        else:
+            keep = ~pd.Series(hashes).duplicated().to_numpy()
+            survivor_source = np.where(seen, kept_source, source_index)
+        keep &= ~seen
+
+        removed = ~keep
+        cross_file = (removed & (survivor_source != source_index)).sum()
+        self.report.count(removed.sum(), np.full(removed.sum(), source, dtype=object), cross_file)
+
+        self._kept.update(dict.fromkeys(hashes[keep].tolist(), source_index))
+        return keep
@@ -0,0 +1,228 @@
+"""
+Export of the consolidated data.
+
+Workbooks are streamed row by row through openpyxl's write-only mode. Rows
+with a missing weight get spreadsheet formulas for SHIPPING COST and the price
+columns in the same row stream, and the red highlighting is a single
+conditional-formatting rule on the weight column rather than a fill on every
+cell. CSV and Parquet exports carry the plain values for downstream systems
+that don't need Excel.
+
+The constant HANDLING COST, QUANTITY and ITEM LOCATION columns are filled in
+here, a slice of rows at a time, so the full table never has to carry them.
+"""
+from io import BytesIO
+
+import numpy as np
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.formatting.rule import FormulaRule
+from openpyxl.styles import Font, PatternFill
+from openpyxl.utils import get_column_letter
+
+from convertor.columns import CONSTANT_COLUMNS, with_constant_columns
+from convertor.pricing import MAX_PRICE_FACTOR, RETAIL_MARKUP
+
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+EXPORT_FORMATS = {
+    "xlsx": XLSX_MIME,
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+CONSOLIDATED_SHEET = "Consolidated Data"
+SHIPPING_LEGEND_SHEET = "ShippingLegend"
+
+# Red fill for rows with a missing weight
+MISSING_WEIGHT_COLOR = "FFCCCC"
+
+WEIGHT_COLUMN = "ITEM WEIGHT (pounds)"
+
+# Rows materialized at once when writing a whole table
+EXPORT_SLICE_ROWS = 50_000
+
+
+def _header_cells(worksheet, columns):
+    header = []
+    for name in columns:
+        cell = WriteOnlyCell(worksheet, value=name)
+        cell.font = Font(bold=True)
+        header.append(cell)
+    return header
+
+
+def _missing_weight_formulas(row_index, retail_markup=RETAIL_MARKUP, max_price_factor=MAX_PRICE_FACTOR):
+    """
+    Spreadsheet formulas for SHIPPING COST and the price columns (J-M) of one row.
+    """
+    return {
+        10: f"=IF(I{row_index}<>\"\", ROUND(VLOOKUP(I{row_index}, ShippingLegend!A:C, 3, TRUE), 2), \"\")",  # SHIPPING COST formula
+        11: f"=IF(AND(E{row_index}<>\"\", F{row_index}<>\"\", J{row_index}<>\"\"), ROUND((E{row_index}+F{row_index}+J{row_index})*{retail_markup}, 2), \"\")",  # RETAIL PRICE formula
+        12: f"=K{row_index}",  # MIN PRICE formula
+        13: f"=IF(L{row_index}<>\"\", ROUND(L{row_index}*{max_price_factor}, 2),\"\")",  # MAX PRICE formula
+    }
+
+
+class StreamingWorkbookWriter:
+    """
+    Append DataFrame chunks to a write-only workbook without keeping them in memory.
+
+    The column layout is fixed by the first chunk. With highlight_missing_weights,
+    rows without a weight get formulas for the shipping and price columns and
+    are highlighted by a conditional-formatting rule added on close. constants
+    maps constant columns missing from the chunks to their value. pricing, a
+    PricingProfile, supplies the markups used in those formulas; the
+    standard ones by default.
+    """
+
+    def __init__(
+        self,
+        target,
+        sheet_name=CONSOLIDATED_SHEET,
+        highlight_missing_weights=True,
+        shipping_legend=None,
+        constants=None,
+        pricing=None,
+    ):
+        self.target = target
+        self.highlight_missing_weights = highlight_missing_weights
+        self.shipping_legend = shipping_legend
+        self.constants = constants
+        self.pricing = pricing
+        self.columns = None
+        self.rows_written = 0
+        self._workbook = Workbook(write_only=True)
+        self._worksheet = self._workbook.create_sheet(sheet_name)
+
+    def _write_header(self, columns):
+        self.columns = list(columns)
+        self._worksheet.append(_header_cells(self._worksheet, self.columns))
+
+    def append(self, chunk):
+        """
+        Write the rows of one chunk below the rows already written.
+        """
+        if self.constants:
+            chunk = with_constant_columns(chunk, self.constants)
+        if self.columns is None:
+            self._write_header(chunk.columns)
+        chunk = chunk.reindex(columns=self.columns)
+        if chunk.empty:
+            return
+
+        values = chunk.astype(object).where(chunk.notna(), None)
+        if self.highlight_missing_weights and WEIGHT_COLUMN in chunk.columns:
+            missing = chunk[WEIGHT_COLUMN].isnull().to_numpy()
+        else:
+            missing = np.zeros(len(chunk), dtype=bool)
+        if self.pricing is not None and missing.any():
+            markups, max_factors = self.pricing.row_factors(chunk)
+        else:
+            markups = max_factors = np.full(len(chunk), None)
+
+        worksheet = self._worksheet
+        rows = zip(values.itertuples(index=False, name=None), missing, markups, max_factors)
+        for row, is_missing, markup, max_factor in rows:
+            row_index = self.rows_written + 2  # Excel row, after the header
+            if is_missing:
+                row = list(row)
+                factors = (markup, max_factor) if markup is not None else ()
+                for col_index, formula in _missing_weight_formulas(row_index, *factors).items():
+                    if col_index <= len(row):
+                        row[col_index - 1] = formula
+            worksheet.append(row)
+            self.rows_written += 1
+
+    def _add_missing_weight_rule(self):
+        if not (self.highlight_missing_weights and self.rows_written and WEIGHT_COLUMN in self.columns):
+            return
+        weight_letter = get_column_letter(self.columns.index(WEIGHT_COLUMN) + 1)
+        data_range = f"A2:{get_column_letter(len(self.columns))}{self.rows_written + 1}"
+        red_fill = PatternFill(start_color=MISSING_WEIGHT_COLOR, end_color=MISSING_WEIGHT_COLOR, fill_type="solid")
+        self._worksheet.conditional_formatting.add(data_range, FormulaRule(formula=[f"ISBLANK(${weight_letter}2)"], fill=red_fill))
+
+    def close(self):
+        """
+        Add the highlighting rule, embed the shipping legend if any, and save.
+        """
+        if self.columns is None:
+            self._write_header([])
+        self._add_missing_weight_rule()
+        if self.shipping_legend is not None:
+            legend_sheet = self._workbook.create_sheet(SHIPPING_LEGEND_SHEET)
+            legend_sheet.append(list(self.shipping_legend.columns))
+            legend_values = self.shipping_legend.astype(object).where(self.shipping_legend.notna(), None)
+            for row in legend_values.itertuples(index=False, name=None):
+                legend_sheet.append(row)
+        self._workbook.save(self.target)
+
+
+def frame_to_xlsx_bytes(df, sheet_name, constants=None):
+    """
+    Serialize a DataFrame to an in-memory xlsx workbook with one sheet.
+
+    Pass constants=CONSTANT_COLUMNS for listing rows in the compact layout.
+    """
+    buffer = BytesIO()
+    writer = StreamingWorkbookWriter(buffer, sheet_name=sheet_name, highlight_missing_weights=False, constants=constants)
+    writer.append(df)
+    writer.close()
+    return buffer.getvalue()
+
+
+def write_sheets(sheets, target, constants=None):
+    """
+    Write each DataFrame of the sheets dict to its own sheet, values only.
+    """
+    workbook = Workbook(write_only=True)
+    for sheet_name, df in sheets.items():
+        if constants:
+            df = with_constant_columns(df, constants)
+        worksheet = workbook.create_sheet(sheet_name)
+        worksheet.append(_header_cells(worksheet, df.columns))
+        values = df.astype(object).where(df.notna(), None)
+        for row in values.itertuples(index=False, name=None):
+            worksheet.append(row)
+    workbook.save(target)
+
+
+def write_consolidated_workbook(combined_df, target, shipping_legend=None, constants=CONSTANT_COLUMNS, pricing=None):
+    """
+    Write the consolidated data, and the shipping legend as a separate sheet.
+
+    Rows with a missing weight are highlighted in red and get spreadsheet
+    formulas for SHIPPING COST and the price columns, so filling in the weight
+    in Excel completes the row. For a pricing profile's table, pass its
+    constants() and the profile as pricing.
+    """
+    writer = StreamingWorkbookWriter(target, shipping_legend=shipping_legend, constants=constants, pricing=pricing)
+    for start in range(0, max(len(combined_df), 1), EXPORT_SLICE_ROWS):
+        writer.append(combined_df.iloc[start:start + EXPORT_SLICE_ROWS])
+    writer.close()
+
+
+def write_export(combined_df, target, export_format="xlsx", shipping_legend=None, constants=CONSTANT_COLUMNS, pricing=None):
+    """
+    Write the consolidated data as xlsx, csv or parquet.
+
+    Parquet needs pyarrow or fastparquet to be installed. constants and
+    pricing are as for write_consolidated_workbook.
+    """
+    if export_format == "xlsx":
+        write_consolidated_workbook(combined_df, target, shipping_legend, constants, pricing)
+    elif export_format == "csv":
+        with_constant_columns(combined_df, constants).to_csv(target, index=False)
+    elif export_format == "parquet":
+        with_constant_columns(combined_df, constants).to_parquet(target, index=False)
+    else:
+        raise ValueError(f"Unsupported export format: {export_format}")
+
+
+def export_bytes(combined_df, export_format="xlsx", shipping_legend=None, constants=CONSTANT_COLUMNS, pricing=None):
+    """
+    Build an export in memory for download.
+    """
+    buffer = BytesIO()
+    write_export(combined_df, buffer, export_format, shipping_legend, constants, pricing)
+    return buffer.getvalue()
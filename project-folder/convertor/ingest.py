@@ -0,0 +1,129 @@
+"""
+Supplier file ingestion.
+
+Each file is parsed once by the reader for its format (see convertor.readers)
+and all of its sheets are read from that single handle. Independent files are
+spread across a process pool sized to the available cores; a file that fails
+to parse is reported without stopping the others.
+
+The SKU and UPC/ISBN columns are read as text, so codes keep their leading
+zeros and every digit rather than being inferred as numbers.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+from convertor.readers import read_frames
+
+
+def available_cores():
+    """
+    Number of CPU cores this process may run on.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def source_name(source):
+    """
+    Display name of a path or uploaded file object.
+    """
+    return getattr(source, "name", None) or os.path.basename(str(source))
+
+
+def source_payload(source):
+    """
+    Picklable form of a source: the path, or the bytes of a file-like object.
+    """
+    if hasattr(source, "getvalue"):
+        return source.getvalue()
+    if hasattr(source, "read"):
+        source.seek(0)
+        return source.read()
+    return source
+
+
+def _read_payload(name, payload, engine=None):
+    """
+    Worker entry point. Returns (sheet frames, error message).
+
+    Each frame records its file name in attrs["source"].
+    """
+    try:
+        if isinstance(payload, bytes):
+            payload = BytesIO(payload)
+        return label_frames(read_frames(payload, name, engine), name), None
+    except Exception as e:
+        return [], f"Error reading file {name}: {e}"
+
+
+def label_frames(frames, name):
+    """
+    Shallow copies of frames recording name as their source file.
+
+    The frames themselves are not changed, so cached frames can be labelled.
+    """
+    labelled = []
+    for frame in frames:
+        frame = frame.copy(deep=False)
+        frame.attrs["source"] = name
+        labelled.append(frame)
+    return labelled
+
+
+def source_labels(frames):
+    """
+    Source file name of every row of the frames once concatenated, as a categorical.
+    """
+    names = [frame.attrs.get("source", "") for frame in frames]
+    categories = list(dict.fromkeys(names))
+    codes = np.repeat([categories.index(name) for name in names], [len(frame) for frame in frames])
+    return pd.Categorical.from_codes(codes.astype("int32"), categories=categories)
+
+
+def read_payloads(jobs, max_workers=None, engine=None):
+    """
+    Read (name, payload) jobs, returning (sheet frames, error) per job in order.
+
+    max_workers defaults to the available cores; a single job or
+    max_workers=1 reads in-process. engine chooses the Excel parser.
+    Workers are spawned rather than forked, since the Streamlit server is
+    multi-threaded.
+    """
+    jobs = list(jobs)
+    workers = min(max_workers or available_cores(), len(jobs))
+    if workers <= 1:
+        return [_read_payload(name, payload, engine) for name, payload in jobs]
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        futures = [executor.submit(_read_payload, name, payload, engine) for name, payload in jobs]
+        for (name, _), future in zip(jobs, futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append(([], f"Error reading file {name}: {e}"))
+    return results
+
+
+def ingest(sources, max_workers=None, engine=None):
+    """
+    Read all sheets of all sources. Returns the sheet frames and per-file errors.
+
+    Frames keep the order of sources and sheets. engine chooses the Excel
+    parser (see convertor.readers.excel_engine).
+    """
+    jobs = [(source_name(source), source_payload(source)) for source in sources]
+
+    all_data = []
+    errors = []
+    for frames, error in read_payloads(jobs, max_workers, engine):
+        all_data.extend(frames)
+        if error:
+            errors.append(error)
+    return all_data, errors
@@ -0,0 +1,231 @@
+"""
+Per-stage timing and memory instrumentation.
+
+A RunInstrument records wall time, CPU time and row counts for each named
+stage of a conversion run, and how far each stage raised the process's peak
+resident memory (a cheap getrusage call, so it is always on). The Python
+heap peak of each stage is measured with tracemalloc when trace_memory is on
+(it slows Python-heavy stages down, so it is off by default), and
+profile=True captures cProfile stats for everything the run does on the
+calling thread. tracemalloc and cProfile are process-wide, so only one run at
+a time gets them; a run started while another holds them goes without and
+reports it as contended. Stages with the same name accumulate, so
+chunked conversions report one line per stage. A listener, when given, is
+told whenever a stage starts or ends, e.g. to report progress of a
+background job.
+
+Finished runs can be appended to a JSON-lines run log to track throughput
+over time.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+import warnings
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# Held by the run that is tracing memory or profiling
+_PROCESS_INSTRUMENTS = threading.Lock()
+
+
+@dataclass
+class StageTiming:
+    """
+    Measurements for one stage, summed over every time it ran.
+    """
+    name: str
+    wall_s: float = 0.0
+    cpu_s: float = 0.0
+    rows_in: int = 0
+    rows_out: int = 0
+    peak_mb: float = None
+    rss_growth_mb: float = None
+    calls: int = 0
+
+    def merge(self, other):
+        self.wall_s += other.wall_s
+        self.cpu_s += other.cpu_s
+        self.rows_in += other.rows_in
+        self.rows_out += other.rows_out
+        self.calls += other.calls
+        if other.peak_mb is not None:
+            self.peak_mb = max(self.peak_mb or 0.0, other.peak_mb)
+        if other.rss_growth_mb is not None:
+            self.rss_growth_mb = (self.rss_growth_mb or 0.0) + other.rss_growth_mb
+
+
+def peak_rss_mb():
+    """
+    High-water mark of this process's resident memory, or None where unsupported.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+class RunInstrument:
+    """
+    Collects StageTiming records for one run.
+
+    listener(name, finished) is called before and after each stage; an
+    exception it raises aborts the run. When another run is already tracing
+    memory or profiling, trace_memory and profile are turned off and
+    contended is set.
+    """
+
+    def __init__(self, trace_memory=False, profile=False, listener=None):
+        self.run_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        self.listener = listener
+        self.stages = []
+        self.contended = False
+        self._started_tracing = False
+        self._profiler = None
+        self._holds_lock = False
+        if (trace_memory or profile) and not _PROCESS_INSTRUMENTS.acquire(blocking=False):
+            warnings.warn("Another run is tracing memory or profiling; this run goes without.", stacklevel=2)
+            self.contended = True
+            trace_memory = profile = False
+        self._holds_lock = bool(trace_memory or profile)
+        self.trace_memory = trace_memory
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        if profile:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def _record(self, name):
+        for record in self.stages:
+            if record.name == name:
+                return record
+        record = StageTiming(name)
+        self.stages.append(record)
+        return record
+
+    @contextmanager
+    def stage(self, name, rows_in=0):
+        """
+        Time the body as stage name; set rows_out on the yielded record if rows change.
+        """
+        if self.listener is not None:
+            self.listener(name, False)
+        run = StageTiming(name, rows_in=rows_in, rows_out=rows_in, calls=1)
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            memory_before = tracemalloc.get_traced_memory()[0]
+        rss_before = peak_rss_mb()
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield run
+        finally:
+            run.wall_s = time.perf_counter() - wall_start
+            run.cpu_s = time.process_time() - cpu_start
+            if rss_before is not None:
+                run.rss_growth_mb = peak_rss_mb() - rss_before
+            if tracing:
+                run.peak_mb = max(0, tracemalloc.get_traced_memory()[1] - memory_before) / 2**20
+            self._record(name).merge(run)
+        if self.listener is not None:
+            self.listener(name, True)
+
+    def run(self, name, function, df, *args):
+        """
+        Call function(df, *args) as stage name and return its result.
+        """
+        with self.stage(name, len(df)) as record:
+            df = function(df, *args)
+            record.rows_out = len(df)
+        return df
+
+    def finish(self):
+        """
+        Stop memory tracing and profiling and let another run use them. Safe to call more than once.
+        """
+        if self._profiler is not None:
+            self._profiler.disable()
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        if self._holds_lock:
+            self._holds_lock = False
+            _PROCESS_INSTRUMENTS.release()
+
+    def __del__(self):
+        # A run abandoned by an exception must not keep the others from profiling
+        self.finish()
+
+    def profile_text(self, limit=30):
+        """
+        The top functions by cumulative time, or None if profiling is off.
+        """
+        if self._profiler is None:
+            return None
+        self._profiler.disable()
+        output = io.StringIO()
+        pstats.Stats(self._profiler, stream=output).sort_stats("cumulative").print_stats(limit)
+        return output.getvalue()
+
+    def dump_profile(self, path):
+        """
+        Save the cProfile stats for pstats or snakeviz.
+        """
+        if self._profiler is None:
+            return None
+        self._profiler.disable()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._profiler.dump_stats(path)
+        return path
+
+    def write_log(self, path, metrics=None, **fields):
+        """
+        Append this run as one JSON line to the run log at path.
+        """
+        entry = {
+            "run_id": self.run_id,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            **fields,
+            "total_wall_s": sum(record.wall_s for record in self.stages),
+            "peak_rss_mb": peak_rss_mb(),
+            "metrics": asdict(metrics) if metrics is not None else None,
+            "stages": [asdict(record) for record in self.stages],
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+        return entry
+
+
+def stage_frame(stages):
+    """
+    Stage breakdown table for display.
+    """
+    rows = []
+    for record in stages:
+        rows.append({
+            "Stage": record.name,
+            "Wall (s)": round(record.wall_s, 3),
+            "CPU (s)": round(record.cpu_s, 3),
+            "Rows in": record.rows_in,
+            "Rows out": record.rows_out,
+            "Rows/s": round(max(record.rows_in, record.rows_out) / record.wall_s) if record.wall_s > 0 else None,
+            "Peak memory (MB)": round(record.peak_mb, 1) if record.peak_mb is not None else None,
+            "Peak RSS growth (MB)": round(record.rss_growth_mb, 1) if record.rss_growth_mb is not None else None,
+        })
+    columns = ["Stage", "Wall (s)", "CPU (s)", "Rows in", "Rows out", "Rows/s", "Peak memory (MB)", "Peak RSS growth (MB)"]
+    return pd.DataFrame(rows, columns=columns)
@@ -0,0 +1,470 @@
+"""
+Background conversion jobs.
+
+Conversions can run in a local process pool instead of the Streamlit
+session, so a large upload does not block the page and several users can
+share one server without a broker. Every job has an ID and a row in a small
+SQLite job store with its status, the pipeline step it is on, per-step
+timings, metrics and the path of its result; its uploads and output files
+live in a directory of their own. The store outlives the session, so a
+finished job can be downloaded after a page reload.
+
+At most max_workers jobs run at once; the rest wait in the queue.
+Cancellation is cooperative: a running job checks for a cancel request when
+it starts a pipeline step (for streamed conversions, that is every chunk).
+"""
+import json
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+
+import pandas as pd
+
+from convertor.columns import CONSTANT_COLUMNS
+from convertor.config import RUN_LOG_PATH
+from convertor.dedup import DEFAULT_KEYS, KEEP_FIRST
+from convertor.export import frame_to_xlsx_bytes, write_export
+from convertor.ingest import source_name, source_payload
+from convertor.instrument import RunInstrument, StageTiming
+from convertor.pipeline import run_pipeline
+from convertor.streaming import stream_convert
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATUSES = (DONE, FAILED, CANCELLED)
+
+# Seconds between progress writes from a running job
+PROGRESS_INTERVAL = 0.5
+
+DEFAULT_OPTIONS = {
+    "stream": False,
+    "export_format": "xlsx",
+    "dedup_keys": list(DEFAULT_KEYS),
+    "keep": KEEP_FIRST,
+    "trace_memory": False,
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT,
+    runner_pid INTEGER,
+    files TEXT NOT NULL,
+    options TEXT NOT NULL,
+    stage TEXT,
+    stages TEXT,
+    metrics TEXT,
+    dedup TEXT,
+    errors TEXT,
+    result_path TEXT,
+    removed_path TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS jobs_created ON jobs (created_at);
+"""
+
+
+class JobCancelled(BaseException):
+    """
+    Raised inside a job when a cancel request is seen.
+
+    Like KeyboardInterrupt, it is not an Exception, so the pipeline's
+    per-file error handling does not swallow it.
+    """
+
+
+def _now():
+    return time.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _process_alive(pid):
+    """
+    Whether process pid is still running.
+
+    Only checked on POSIX; elsewhere any other process counts as gone.
+    """
+    if pid == os.getpid():
+        return True
+    if os.name != "posix":
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+@dataclass
+class Job:
+    """
+    One background conversion as recorded in the job store.
+    """
+    id: str
+    status: str
+    created_at: str
+    files: list
+    options: dict
+    started_at: str = None
+    finished_at: str = None
+    runner_pid: int = None
+    stage: str = None
+    stages: list = field(default_factory=list)
+    metrics: dict = None
+    dedup: dict = None
+    errors: list = field(default_factory=list)
+    result_path: str = None
+    removed_path: str = None
+    cancel_requested: bool = False
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATUSES
+
+    @classmethod
+    def from_row(cls, row):
+        job = dict(row)
+        for name in ("files", "options", "metrics", "dedup"):
+            job[name] = json.loads(job[name]) if job[name] else None
+        job["stages"] = [StageTiming(**record) for record in json.loads(job["stages"] or "[]")]
+        job["errors"] = json.loads(job["errors"] or "[]")
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        return cls(**job)
+
+
+def _stages_json(stages):
+    return json.dumps([asdict(record) for record in stages])
+
+
+class JobStore:
+    """
+    SQLite record of background jobs, shared by the app and the job workers.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def create(self, files, options, runner_pid=None):
+        """
+        Record a new queued job and return its ID.
+        """
+        job_id = uuid.uuid4().hex[:12]
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, created_at, runner_pid, files, options) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, QUEUED, _now(), runner_pid, json.dumps(files), json.dumps(options)),
+            )
+        return job_id
+
+    def get(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return Job.from_row(row) if row else None
+
+    def list(self, limit=20):
+        """
+        The most recent jobs, newest first.
+        """
+        with self._connect() as conn:
+            rows = conn.execute("SELECT * FROM jobs ORDER BY created_at DESC, rowid DESC LIMIT ?", (limit,)).fetchall()
+        return [Job.from_row(row) for row in rows]
+
+    def start(self, job_id):
+        """
+        Mark a queued job running. Returns False if it was cancelled meanwhile.
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, started_at = ? WHERE id = ? AND status = ? AND cancel_requested = 0",
+                (RUNNING, _now(), job_id, QUEUED),
+            )
+            return cursor.rowcount == 1
+
+    def progress(self, job_id, stage, stages):
+        """
+        Record the step a running job is on. Returns True if it should cancel.
+        """
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET stage = ?, stages = ? WHERE id = ?", (stage, _stages_json(stages), job_id))
+            row = conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def finish(self, job_id, status, stages=(), metrics=None, dedup=None, errors=(), result_path=None, removed_path=None):
+        with self._connect() as conn:
+            conn.execute(
+                """
+                UPDATE jobs SET status = ?, finished_at = ?, stage = NULL, stages = ?, metrics = ?, dedup = ?,
+                    errors = ?, result_path = ?, removed_path = ?
+                WHERE id = ?
+                """,
+                (
+                    status,
+                    _now(),
+                    _stages_json(stages),
+                    json.dumps(metrics) if metrics is not None else None,
+                    json.dumps(dedup) if dedup is not None else None,
+                    json.dumps(list(errors)),
+                    result_path,
+                    removed_path,
+                    job_id,
+                ),
+            )
+
+    def request_cancel(self, job_id):
+        """
+        Cancel a queued job now, or ask a running one to stop at its next step.
+        """
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status IN (?, ?)", (job_id, QUEUED, RUNNING))
+            conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ? WHERE id = ? AND status = ?",
+                (CANCELLED, _now(), job_id, QUEUED),
+            )
+
+    def interrupt_orphans(self):
+        """
+        Mark unfinished jobs whose runner process is gone as failed.
+        """
+        with self._connect() as conn:
+            rows = conn.execute("SELECT id, runner_pid FROM jobs WHERE status IN (?, ?)", (QUEUED, RUNNING)).fetchall()
+            orphans = [(row["id"],) for row in rows if row["runner_pid"] is None or not _process_alive(row["runner_pid"])]
+            conn.executemany(
+                "UPDATE jobs SET status = ?, finished_at = ?, errors = ? WHERE id = ?",
+                [(FAILED, _now(), json.dumps(["Interrupted by a server restart."]), job_id) for job_id, in orphans],
+            )
+        return len(orphans)
+
+    def delete(self, job_id):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+
+class JobProgress:
+    """
+    RunInstrument listener that reports a job's current step and honours cancel requests.
+    """
+
+    def __init__(self, store, job_id, interval=PROGRESS_INTERVAL):
+        self.store = store
+        self.job_id = job_id
+        self.interval = interval
+        self.instrument = None
+        self._last_report = 0.0
+
+    def __call__(self, name, finished):
+        now = time.monotonic()
+        if finished or now - self._last_report < self.interval:
+            return
+        self._last_report = now
+        if self.store.progress(self.job_id, name, self.instrument.stages):
+            raise JobCancelled()
+
+
+def run_job(store_path, job_id, paths, job_dir, shipping_legend, blocked_brands, options):
+    """
+    Worker entry point: convert the job's input files and record the outcome.
+    """
+    store = JobStore(store_path)
+    if not store.start(job_id):
+        return
+    progress = JobProgress(store, job_id)
+    instrument = RunInstrument(trace_memory=options["trace_memory"], listener=progress)
+    progress.instrument = instrument
+    dedup_keys = options["dedup_keys"]
+    metrics, errors, dedup = None, [], None
+    result_path = removed_path = None
+    try:
+        if options["stream"]:
+            result_path = os.path.join(job_dir, "Consolidated_Data_with_Embedded_Legend.xlsx")
+            removed_path = os.path.join(job_dir, "Removed_Blocked_Brands.xlsx")
+            metrics, errors, dedup = stream_convert(
+                paths,
+                result_path,
+                shipping_legend,
+                blocked_brands,
+                removed_target=removed_path,
+                instrument=instrument,
+                dedup_keys=dedup_keys,
+                keep=options["keep"],
+            )
+        else:
+            result = run_pipeline(paths, shipping_legend, blocked_brands, instrument, dedup_keys=dedup_keys, keep=options["keep"])
+            metrics, errors, dedup = result.metrics, result.errors, result.dedup
+            if result.data.empty:
+                errors.append("No rows to export.")
+            else:
+                export_format = options["export_format"]
+                name = "Consolidated_Data_with_Embedded_Legend.xlsx" if export_format == "xlsx" else f"Consolidated_Data.{export_format}"
+                result_path = os.path.join(job_dir, name)
+                with instrument.stage("Export", len(result.data)):
+                    write_export(result.data, result_path, export_format, shipping_legend.frame if shipping_legend else None)
+                    if not result.removed_rows.empty:
+                        removed_path = os.path.join(job_dir, "Removed_Blocked_Brands.xlsx")
+                        with open(removed_path, "wb") as f:
+                            f.write(frame_to_xlsx_bytes(result.removed_rows, "Removed_Blocked_Brands", CONSTANT_COLUMNS))
+    except JobCancelled:
+        instrument.finish()
+        # Partial output is not a result
+        for path in (result_path, removed_path):
+            if path and os.path.exists(path):
+                os.remove(path)
+        store.finish(job_id, CANCELLED, instrument.stages)
+        return
+    except Exception as e:
+        instrument.finish()
+        store.finish(job_id, FAILED, instrument.stages, errors=errors + [f"Conversion failed: {e}"])
+        return
+
+    instrument.finish()
+    store.finish(
+        job_id,
+        DONE,
+        instrument.stages,
+        metrics=asdict(metrics),
+        dedup=asdict(dedup),
+        errors=errors,
+        result_path=result_path,
+        removed_path=removed_path if removed_path and os.path.exists(removed_path) else None,
+    )
+    if RUN_LOG_PATH:
+        instrument.write_log(
+            RUN_LOG_PATH, metrics, source="job", mode="stream" if options["stream"] else "batch", files=len(paths), job_id=job_id
+        )
+
+
+class JobRunner:
+    """
+    Process pool that runs conversion jobs, recording them in a JobStore.
+
+    One runner per server process; its pool is shared by every session.
+    Workers are spawned rather than forked, since the Streamlit server is
+    multi-threaded.
+    """
+
+    def __init__(self, store_path, jobs_dir, max_workers=2):
+        self.store = JobStore(store_path)
+        self.jobs_dir = jobs_dir
+        self.max_workers = max_workers
+        self.store.interrupt_orphans()
+        self._executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+        self._futures = {}
+
+    def submit(self, sources, shipping_legend, blocked_brands, options=None):
+        """
+        Queue a conversion of sources (paths or uploaded files) and return the job ID.
+
+        The uploads are copied into the job's directory, so the job does not
+        depend on the session that submitted it.
+        """
+        options = {**DEFAULT_OPTIONS, **(options or {})}
+        if options["dedup_keys"] is not None:
+            options["dedup_keys"] = list(options["dedup_keys"])
+        names = [source_name(source) for source in sources]
+        job_id = self.store.create(names, options, runner_pid=os.getpid())
+        job_dir = self.job_dir(job_id)
+
+        paths = []
+        for i, (name, source) in enumerate(zip(names, sources)):
+            # One directory per input keeps the original file names, even repeated ones
+            path = os.path.join(job_dir, "inputs", str(i), os.path.basename(name))
+            os.makedirs(os.path.dirname(path))
+            payload = source_payload(source)
+            if isinstance(payload, bytes):
+                with open(path, "wb") as f:
+                    f.write(payload)
+            else:
+                shutil.copyfile(payload, path)
+            paths.append(path)
+
+        future = self._executor.submit(run_job, self.store.path, job_id, paths, job_dir, shipping_legend, blocked_brands, options)
+        future.add_done_callback(lambda done: self._job_done(job_id, done))
+        self._futures[job_id] = future
+        return job_id
+
+    def _job_done(self, job_id, future):
+        self._futures.pop(job_id, None)
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            # The worker died or could not start; record it so the job does not stay queued
+            job = self.store.get(job_id)
+            if job is not None and not job.finished:
+                self.store.finish(job_id, FAILED, job.stages, errors=[f"Job worker failed: {error}"])
+
+    def job_dir(self, job_id):
+        return os.path.join(self.jobs_dir, job_id)
+
+    def cancel(self, job_id):
+        """
+        Cancel a job: queued jobs never start, running ones stop at their next step.
+        """
+        self.store.request_cancel(job_id)
+        future = self._futures.get(job_id)
+        if future is not None:
+            future.cancel()
+
+    def remove(self, job_id):
+        """
+        Delete a finished job's record and files.
+        """
+        job = self.store.get(job_id)
+        if job is None or not job.finished:
+            return False
+        self.store.delete(job_id)
+        shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+        return True
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+def job_frame(jobs):
+    """
+    Job list table for display.
+    """
+    rows = []
+    for job in jobs:
+        rows.append({
+            "Job": job.id,
+            "Status": job.status,
+            "Step": job.stage or "",
+            "Files": len(job.files),
+            "Submitted": job.created_at,
+            "Finished": job.finished_at or "",
+        })
+    return pd.DataFrame(rows, columns=["Job", "Status", "Step", "Files", "Submitted", "Finished"])
+
+
+def read_result(path):
+    """
+    Bytes of a job's output file, for a deferred download.
+    """
+    with open(path, "rb") as f:
+        return f.read()
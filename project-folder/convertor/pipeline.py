@@ -0,0 +1,336 @@
+"""
+Headless conversion pipeline.
+
+Turns supplier workbooks into the consolidated listing table without any UI
+dependency, so the same steps back the Streamlit app and the batch CLI.
+
+The table comes out in the compact layout of convertor.columns: the constant
+HANDLING COST, QUANTITY and ITEM LOCATION columns are left out until
+with_constant_columns adds them for export or display.
+"""
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from convertor.brands import brand_matcher
+from convertor.codes import clean_skus, invalid_codes, normalize_upcs
+from convertor.columns import CONSTANT_COLUMNS, compact_dtypes, source_hashes
+from convertor.dedup import DEFAULT_KEYS, KEEP_FIRST, DedupReport, deduplicate
+from convertor.ingest import ingest, source_labels
+from convertor.instrument import RunInstrument
+from convertor.pricing import max_price, retail_price
+from convertor.shipping import ShippingLegend
+from convertor.weights import extract_weights
+
+COLUMN_MAPPING = {
+    "Product Details": "TITLE",
+    "Brand": "BRAND",
+    "Product ID": "SKU",
+    "UPC Code": "UPC/ISBN",
+    "Price": "COST_PRICE",
+}
+
+
+@dataclass
+class PipelineMetrics:
+    """
+    Row counts reported in the Metrics Summary.
+
+    duplicates_removed counts duplicate listings only; rows dropped for
+    blocked brands are in blocked_removed.
+    """
+    total_input_listings: int = 0
+    total_output_listings: int = 0
+    duplicates_removed: int = 0
+    blocked_removed: int = 0
+    listings_no_weights: int = 0
+    invalid_codes: int = 0
+
+
+@dataclass
+class PipelineResult:
+    """
+    Converted data, the rows removed for blocked brands, and run metrics.
+
+    dedup has the duplicate counts per source file; invalid_codes lists the
+    output rows whose UPC/ISBN fails validation (see convertor.codes).
+    """
+    data: pd.DataFrame
+    removed_rows: pd.DataFrame
+    metrics: PipelineMetrics
+    errors: list = field(default_factory=list)
+    stages: list = field(default_factory=list)
+    dedup: DedupReport = field(default_factory=DedupReport)
+    invalid_codes: pd.DataFrame = field(default_factory=pd.DataFrame)
+
+
+def rename_columns(combined_df):
+    """
+    Standardize headers and rename the supplier columns.
+    """
+    combined_df.columns = combined_df.columns.str.strip()  # Strip column headers of extra spaces
+    return combined_df.rename(columns=COLUMN_MAPPING)
+
+
+def clean_sku(combined_df):
+    """
+    Format SKU as a string without commas.
+    """
+    if "SKU" in combined_df.columns:
+        combined_df["SKU"] = clean_skus(combined_df["SKU"])
+    return combined_df
+
+
+def clean_title(combined_df):
+    """
+    Remove the (W+), (SP) and (P) markers from TITLE.
+    """
+    if "TITLE" in combined_df.columns:
+        combined_df["TITLE"] = (
+            combined_df["TITLE"]
+            .str.replace(r"\(W\+\)", "", regex=True)
+            .str.replace(r"\(SP\)", "", regex=True)
+            .str.replace(r"\(P\)", "", regex=True)
+            .str.strip()
+        )
+    return combined_df
+
+
+def format_upc(combined_df):
+    """
+    Format UPC/ISBN as a string of at least 12 digits, keeping every digit given.
+    """
+    if "UPC/ISBN" in combined_df.columns:
+        combined_df["UPC/ISBN"] = normalize_upcs(combined_df["UPC/ISBN"])
+    return combined_df
+
+
+def format_cost_price(combined_df):
+    """
+    Parse COST_PRICE to a number with two decimal places.
+    """
+    if "COST_PRICE" in combined_df.columns:
+        combined_df["COST_PRICE"] = (
+            combined_df["COST_PRICE"]
+            .astype(str)
+            .str.replace(r"[$,]", "", regex=True)  # Remove currency symbols and commas
+            .astype(float)
+            .round(2)
+        )
+    return combined_df
+
+
+def add_weights(combined_df):
+    """
+    Add ITEM WEIGHT (pounds) parsed from TITLE.
+    """
+    if "TITLE" in combined_df.columns:
+        combined_df["ITEM WEIGHT (pounds)"] = extract_weights(combined_df["TITLE"])
+    return combined_df
+
+
+def add_shipping_cost(combined_df, shipping_legend):
+    """
+    Add SHIPPING COST for each weight from the legend.
+    """
+    if shipping_legend is not None and "ITEM WEIGHT (pounds)" in combined_df.columns:
+        combined_df["SHIPPING COST"] = shipping_legend.lookup(combined_df["ITEM WEIGHT (pounds)"])
+    return combined_df
+
+
+def add_prices(combined_df):
+    """
+    Add RETAIL, MIN and MAX PRICE from the cost, shipping and handling.
+
+    HANDLING COST comes from its column when present, else the constant.
+    """
+    if all(col in combined_df.columns for col in ["COST_PRICE", "SHIPPING COST"]):
+        handling_cost = combined_df.get("HANDLING COST", CONSTANT_COLUMNS["HANDLING COST"])
+        combined_df["RETAIL PRICE"] = retail_price(combined_df["COST_PRICE"], combined_df["SHIPPING COST"], handling_cost)
+
+    if all(col in combined_df.columns for col in ["SHIPPING COST", "ITEM WEIGHT (pounds)", "RETAIL PRICE"]):
+        combined_df["MIN PRICE"] = combined_df["RETAIL PRICE"]
+        combined_df["MAX PRICE"] = max_price(combined_df["RETAIL PRICE"])
+    return combined_df
+
+
+def add_shipping_and_prices(combined_df, shipping_legend):
+    """
+    Add SHIPPING COST from the legend, then RETAIL, MIN and MAX PRICE.
+    """
+    return add_prices(add_shipping_cost(combined_df, shipping_legend))
+
+
+def _prepare_columns(combined_df):
+    return rename_columns(combined_df.copy())
+
+
+def _derive_columns(combined_df, shipping_legend, instrument):
+    combined_df = instrument.run("Extract weights", add_weights, combined_df)
+    combined_df = instrument.run("Shipping lookup", add_shipping_cost, combined_df, shipping_legend)
+    return instrument.run("Pricing", add_prices, combined_df)
+
+
+def reuse_known_rows(combined_df, known_rows, shipping_legend, instrument):
+    """
+    Add the weight, shipping and price columns, copying them from known_rows where possible.
+
+    known_rows is indexed by source_hashes and holds the derived columns of
+    rows converted earlier with the same shipping legend and pricing. Only
+    the remaining rows go through weight extraction, shipping and pricing.
+    """
+    with instrument.stage("Reuse known rows", len(combined_df)) as stage:
+        hashes = source_hashes(combined_df)
+        known = hashes.isin(known_rows.index).to_numpy()
+        stage.rows_out = int((~known).sum())
+
+    new_rows = _derive_columns(combined_df[~known], shipping_legend, instrument)
+    if not known.any():
+        return new_rows
+
+    reused = combined_df[known].copy()
+    stored = known_rows[~known_rows.index.duplicated()].reindex(hashes[known])
+    for col in new_rows.columns:
+        if col not in reused.columns:
+            reused[col] = stored[col].to_numpy() if col in stored.columns else np.nan
+
+    # Put the reused and new rows back in their original order
+    combined_df = pd.concat([reused, new_rows])
+    order = np.concatenate([np.flatnonzero(known), np.flatnonzero(~known)])
+    return combined_df.iloc[np.argsort(order, kind="stable")]
+
+
+def transform(combined_df, shipping_legend, instrument=None, known_rows=None):
+    """
+    Apply the row-local conversion steps to raw supplier rows.
+
+    The result is in the compact layout, without the constant columns.
+    Missing required columns are reported in the returned list of errors.
+    Each step is timed as a stage of instrument when one is given. With
+    known_rows (see reuse_known_rows), rows converted before are not
+    recomputed.
+    """
+    instrument = instrument or RunInstrument()
+    errors = []
+    combined_df = instrument.run("Rename columns", _prepare_columns, combined_df)
+    if "COST_PRICE" not in combined_df.columns:
+        errors.append("COST_PRICE column is missing. Ensure the input file has a 'Price' column.")
+
+    combined_df = instrument.run("Clean SKU", clean_sku, combined_df)
+    combined_df = instrument.run("Clean titles", clean_title, combined_df)
+    combined_df = instrument.run("Format UPC", format_upc, combined_df)
+    combined_df = instrument.run("Parse cost price", format_cost_price, combined_df)
+    if known_rows is None:
+        combined_df = _derive_columns(combined_df, shipping_legend, instrument)
+    else:
+        combined_df = reuse_known_rows(combined_df, known_rows, shipping_legend, instrument)
+    combined_df = instrument.run("Compact dtypes", compact_dtypes, combined_df)
+    return combined_df, errors
+
+
+def filter_blocked_brands(combined_df, blocked_brands):
+    """
+    Split rows into kept rows and rows whose BRAND is blocked.
+
+    blocked_brands is a BlockedBrandMatcher or an iterable of brand names;
+    matching ignores case and surrounding or repeated whitespace.
+    """
+    if combined_df.empty or "BRAND" not in combined_df.columns:
+        return combined_df, combined_df.iloc[0:0]
+
+    blocked = brand_matcher(blocked_brands).matches(combined_df["BRAND"])
+    return combined_df[~blocked], combined_df[blocked]
+
+
+def move_missing_weights_last(combined_df):
+    """
+    Move rows with missing weights to the end, keeping the order otherwise.
+    """
+    if "ITEM WEIGHT (pounds)" not in combined_df.columns:
+        return combined_df
+    missing = combined_df["ITEM WEIGHT (pounds)"].isnull()
+    return combined_df.iloc[missing.to_numpy().argsort(kind="stable")]
+
+
+def process(
+    raw_df,
+    shipping_legend,
+    blocked_brands,
+    instrument=None,
+    known_rows=None,
+    sources=None,
+    dedup_keys=DEFAULT_KEYS,
+    keep=KEEP_FIRST,
+):
+    """
+    Convert combined raw supplier rows into the final listing table.
+
+    The result's stages hold the timings of the steps run here; they are also
+    recorded on instrument when one is given. known_rows lets rows converted
+    in an earlier run skip recomputation; the result is the same either way.
+    Duplicates are listings with the same dedup_keys (None compares whole
+    rows), resolved by the keep policy of convertor.dedup; sources, the
+    source file of each raw row (see source_labels), gives per-file counts.
+    """
+    instrument = instrument or RunInstrument()
+    first_stage = len(instrument.stages)
+    if isinstance(shipping_legend, pd.DataFrame):
+        shipping_legend = ShippingLegend(shipping_legend)
+
+    combined_df, errors = transform(raw_df, shipping_legend, instrument, known_rows)
+    with instrument.stage("Remove duplicates", len(combined_df)) as stage:
+        combined_df, dedup = deduplicate(combined_df, dedup_keys, keep, sources)
+        stage.rows_out = len(combined_df)
+    with instrument.stage("Filter blocked brands", len(combined_df)) as stage:
+        combined_df, removed_rows = filter_blocked_brands(combined_df, blocked_brands)
+        stage.rows_out = len(combined_df)
+    combined_df = instrument.run("Move missing weights last", move_missing_weights_last, combined_df)
+    invalid = instrument.run("Validate UPC/ISBN", invalid_codes, combined_df)
+
+    metrics = PipelineMetrics(
+        total_input_listings=len(raw_df),
+        total_output_listings=len(combined_df),
+        duplicates_removed=dedup.removed,
+        blocked_removed=len(removed_rows),
+        listings_no_weights=int(combined_df["ITEM WEIGHT (pounds)"].isnull().sum()) if "ITEM WEIGHT (pounds)" in combined_df.columns else 0,
+        invalid_codes=len(invalid),
+    )
+    return PipelineResult(combined_df, removed_rows, metrics, errors, instrument.stages[first_stage:], dedup, invalid)
+
+
+def run_pipeline(
+    sources,
+    shipping_legend,
+    blocked_brands,
+    instrument=None,
+    known_rows=None,
+    dedup_keys=DEFAULT_KEYS,
+    keep=KEEP_FIRST,
+    engine=None,
+):
+    """
+    Ingest supplier files and convert them in one call.
+
+    sources are paths or file-like objects in any input format of
+    convertor.readers; shipping_legend is the legend DataFrame (or a
+    compiled ShippingLegend, or None); blocked_brands is an iterable of
+    brand names to drop. dedup_keys and keep choose how duplicates are
+    removed (see process); engine chooses the Excel parser.
+    """
+    instrument = instrument or RunInstrument()
+    first_stage = len(instrument.stages)
+    with instrument.stage("Read files") as stage:
+        all_data, read_errors = ingest(sources, engine=engine)
+        stage.rows_out = sum(len(frame) for frame in all_data)
+    with instrument.stage("Combine sheets", stage.rows_out) as stage:
+        raw_df = pd.concat(all_data, ignore_index=True) if all_data else pd.DataFrame()
+    if raw_df.empty:
+        return PipelineResult(raw_df, raw_df, PipelineMetrics(), read_errors, instrument.stages[first_stage:])
+
+    result = process(
+        raw_df, shipping_legend, blocked_brands, instrument, known_rows, source_labels(all_data), dedup_keys, keep
+    )
+    result.stages = instrument.stages[first_stage:]
+    result.errors = read_errors + result.errors
+    return result
@@ -0,0 +1,83 @@
+"""
+Bounded previews of large frames.
+
+Only one page of rows is ever styled and sent to the browser. Highlighting
+rows with a missing weight is a boolean mask broadcast over the page instead
+of a Python call per row.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+PAGE_SIZES = [50, 100, 250, 1000]
+
+WEIGHT_COLUMN = "ITEM WEIGHT (pounds)"
+
+# Format numeric columns to 2 decimal places
+NUMERIC_COLUMNS = [
+    "COST_PRICE",
+    "HANDLING COST",
+    "ITEM WEIGHT (pounds)",
+    "SHIPPING COST",
+    "RETAIL PRICE",
+    "MIN PRICE",
+    "MAX PRICE",
+]
+
+MISSING_WEIGHT_STYLE = "background-color: #FFCCCC"
+
+
+def page_count(n_rows, page_size):
+    """
+    Number of pages needed for n_rows, at least 1.
+    """
+    return max(1, math.ceil(n_rows / page_size))
+
+
+def get_page(df, page, page_size):
+    """
+    Rows of a 1-based page; out-of-range pages are clamped.
+    """
+    page = min(max(1, int(page)), page_count(len(df), page_size))
+    start = (page - 1) * page_size
+    return df.iloc[start:start + page_size]
+
+
+def missing_weight_rows(df):
+    """
+    Rows whose ITEM WEIGHT (pounds) is empty.
+    """
+    if WEIGHT_COLUMN not in df.columns:
+        return df.iloc[0:0]
+    return df[df[WEIGHT_COLUMN].isnull()]
+
+
+def column_stats(df):
+    """
+    Per-column dtype, filled and missing counts, distinct values, and numeric range.
+    """
+    non_null = df.notna().sum()
+    stats = pd.DataFrame({
+        "dtype": df.dtypes.astype(str),
+        "non-null": non_null,
+        "missing": len(df) - non_null,
+        "distinct": df.nunique(dropna=True),
+    })
+    numeric = df.select_dtypes("number")
+    stats["min"] = numeric.min()
+    stats["max"] = numeric.max()
+    return stats
+
+
+def style_page(page_df):
+    """
+    Styler for one page: rows with a missing weight in red, numbers to 2 places.
+    """
+    styler = page_df.style
+    if WEIGHT_COLUMN in page_df.columns:
+        missing = page_df[WEIGHT_COLUMN].isnull().to_numpy()
+        css = np.where(missing[:, None], MISSING_WEIGHT_STYLE, "")
+        styles = pd.DataFrame(np.broadcast_to(css, page_df.shape), index=page_df.index, columns=page_df.columns)
+        styler = styler.apply(lambda _: styles, axis=None)
+    return styler.format({col: "{:.2f}" for col in NUMERIC_COLUMNS if col in page_df.columns})
@@ -0,0 +1,39 @@
+"""
+Price columns derived from cost, shipping and handling.
+"""
+import numpy as np
+import pandas as pd
+
+from convertor.rounding import round_half_even
+
+HANDLING_COST = 0.75
+RETAIL_MARKUP = 1.35
+MAX_PRICE_FACTOR = 1.35
+
+
+def _as_float(values):
+    """
+    Return a scalar or column as float64 with NaN for missing entries.
+    """
+    if np.isscalar(values):
+        return float(values)
+    return pd.Series(values).to_numpy(dtype="float64", na_value=np.nan)
+
+
+def retail_price(cost_price, shipping_cost, handling_cost=HANDLING_COST):
+    """
+    RETAIL PRICE = (COST_PRICE + SHIPPING COST + HANDLING COST) * markup, rounded to 2 places.
+
+    Rows missing any input stay empty.
+    """
+    index = pd.Series(cost_price).index
+    total = (_as_float(cost_price) + _as_float(shipping_cost) + _as_float(handling_cost)) * RETAIL_MARKUP
+    return pd.Series(round_half_even(total, 2), index=index, dtype="float64")
+
+
+def max_price(retail):
+    """
+    MAX PRICE = RETAIL PRICE * factor, rounded to 2 places.
+    """
+    index = pd.Series(retail).index
+    return pd.Series(round_half_even(_as_float(retail) * MAX_PRICE_FACTOR, 2), index=index, dtype="float64")
@@ -0,0 +1,390 @@
+"""
+Marketplace pricing profiles.
+
+A profile declares how one marketplace prices the converted listings: the
+handling cost, retail markup and MAX PRICE factor, the packaging padding
+added to unit weights, and the QUANTITY and ITEM LOCATION written with every
+row. Override rules change the handling cost, markup or MAX PRICE factor for
+listings of given brands and/or weight tiers; when several rules match a
+row, the last one wins.
+
+Profiles are read from JSON, YAML (with PyYAML installed) or a workbook, and
+priced together: titles are parsed for weights and brands normalized once,
+each rule becomes a boolean mask over the rows, and the price columns of
+every profile are computed as one set of (profiles x rows) array operations
+on the already converted table. A profile without any settings reproduces
+the standard columns.
+
+JSON and YAML files hold a list of profiles under "profiles":
+
+    {"profiles": [
+        {"name": "Walmart"},
+        {"name": "Amazon", "item_location": "AMAZON", "retail_markup": 1.45,
+         "overrides": [
+            {"brands": ["Acme"], "retail_markup": 1.6},
+            {"min_weight": 5, "handling_cost": 1.5}
+         ]}
+    ]}
+
+Workbooks have a "Profiles" sheet with a name column plus any setting
+columns, and optionally an "Overrides" sheet with a profile column, brand,
+min_weight and max_weight columns and the settings to override.
+"""
+import json
+import os
+import re
+from dataclasses import dataclass, field, fields
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+from convertor.brands import normalize_brands
+from convertor.columns import DERIVED_COLUMNS, ITEM_LOCATION, QUANTITY, with_constant_columns
+from convertor.export import write_export, write_sheets
+from convertor.pricing import HANDLING_COST, MAX_PRICE_FACTOR, RETAIL_MARKUP
+from convertor.rounding import round_half_even
+from convertor.weights import FLUID_OUNCE_PADDING, OUNCE_PADDING, parse_weight_parts, weights_from_parts
+
+PROFILES_SHEET = "Profiles"
+OVERRIDES_SHEET = "Overrides"
+
+# Settings an override rule may change, per row
+RULE_SETTINGS = ["handling_cost", "retail_markup", "max_price_factor"]
+
+# Keys that select the rows a rule applies to
+RULE_SELECTORS = ["brand", "brands", "min_weight", "max_weight"]
+
+# Excel limits sheet names to 31 characters without []:*?/\
+_SHEET_NAME_CHARACTERS = re.compile(r"[\[\]:*?/\\]")
+
+
+@dataclass
+class PricingRule:
+    """
+    Override of some settings for the rows of given brands and/or weight tier (inclusive, pounds).
+    """
+    settings: dict
+    brands: list = None
+    min_weight: float = None
+    max_weight: float = None
+
+    def mask(self, brand_codes, brand_keys, weights):
+        """
+        Rows the rule applies to. Weight bounds never match a missing weight.
+        """
+        mask = np.ones(len(brand_codes), dtype=bool)
+        if self.brands is not None:
+            selected = brand_keys.isin(normalize_brands(self.brands).dropna()).to_numpy()
+            mask &= (brand_codes >= 0) & selected[np.clip(brand_codes, 0, None)]
+        with np.errstate(invalid="ignore"):
+            if self.min_weight is not None:
+                mask &= weights >= self.min_weight
+            if self.max_weight is not None:
+                mask &= weights <= self.max_weight
+        return mask
+
+
+@dataclass
+class PricingProfile:
+    """
+    Pricing settings for one marketplace; the defaults are the standard pricing.
+    """
+    name: str
+    handling_cost: float = HANDLING_COST
+    retail_markup: float = RETAIL_MARKUP
+    max_price_factor: float = MAX_PRICE_FACTOR
+    ounce_padding: float = OUNCE_PADDING
+    fluid_ounce_padding: float = FLUID_OUNCE_PADDING
+    quantity: int = QUANTITY
+    item_location: str = ITEM_LOCATION
+    overrides: list = field(default_factory=list)
+
+    @property
+    def padding(self):
+        return (self.ounce_padding, self.fluid_ounce_padding)
+
+    def constants(self):
+        """
+        Constant columns of this profile's output, as for with_constant_columns.
+
+        HANDLING COST is left out when rules make it vary by row; the priced
+        frame then carries it as a column.
+        """
+        constants = {"HANDLING COST": self.handling_cost, "QUANTITY": self.quantity, "ITEM LOCATION": self.item_location}
+        if any("handling_cost" in rule.settings for rule in self.overrides):
+            del constants["HANDLING COST"]
+        return constants
+
+    def settings(self, brand_codes, brand_keys, weights):
+        """
+        Per-row handling cost, retail markup and MAX PRICE factor after the override rules.
+        """
+        values = {name: np.full(len(brand_codes), float(getattr(self, name))) for name in RULE_SETTINGS}
+        for rule in self.overrides:
+            mask = rule.mask(brand_codes, brand_keys, weights)
+            for name, value in rule.settings.items():
+                values[name][mask] = value
+        return values
+
+    def row_factors(self, chunk):
+        """
+        Retail markup and MAX PRICE factor of each row of chunk, for spreadsheet formulas.
+        """
+        brand_codes, brand_keys = brand_index(chunk)
+        weights = _column(chunk, "ITEM WEIGHT (pounds)")
+        values = self.settings(brand_codes, brand_keys, weights)
+        return values["retail_markup"], values["max_price_factor"]
+
+
+def brand_index(combined_df):
+    """
+    Codes of each row's BRAND into its distinct normalized brands.
+    """
+    if "BRAND" not in combined_df.columns:
+        return np.full(len(combined_df), -1), pd.Series([], dtype=object)
+    codes, uniques = pd.factorize(combined_df["BRAND"])
+    return codes, normalize_brands(uniques)
+
+
+def _column(combined_df, name):
+    if name not in combined_df.columns:
+        return np.full(len(combined_df), np.nan)
+    return combined_df[name].to_numpy(dtype="float64", na_value=np.nan)
+
+
+def _number(profile_name, key, value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Pricing profile '{profile_name}': {key} must be a number, got {value!r}.") from None
+
+
+def _rule(profile_name, data):
+    unknown = sorted(set(data) - set(RULE_SETTINGS) - set(RULE_SELECTORS))
+    if unknown:
+        raise ValueError(f"Pricing profile '{profile_name}': unknown override keys {unknown}.")
+    settings = {name: _number(profile_name, name, data[name]) for name in RULE_SETTINGS if data.get(name) is not None}
+    if not settings:
+        raise ValueError(f"Pricing profile '{profile_name}': an override must set one of {RULE_SETTINGS}.")
+
+    brands = data.get("brands")
+    if isinstance(brands, str):
+        brands = [brands]
+    if data.get("brand") is not None:
+        brands = [data["brand"]] + list(brands or [])
+    bounds = {key: _number(profile_name, key, data[key]) for key in ("min_weight", "max_weight") if data.get(key) is not None}
+    return PricingRule(settings, brands, **bounds)
+
+
+def profile_from_dict(data):
+    """
+    Build a PricingProfile from a mapping of its settings and override rules.
+    """
+    name = str(data.get("name") or "").strip()
+    if not name:
+        raise ValueError("Every pricing profile needs a name.")
+    known = {f.name for f in fields(PricingProfile)}
+    unknown = sorted(set(data) - known)
+    if unknown:
+        raise ValueError(f"Pricing profile '{name}': unknown settings {unknown}.")
+
+    profile = PricingProfile(name)
+    for key, value in data.items():
+        if key in ("name", "overrides") or value is None:
+            continue
+        if key == "item_location":
+            profile.item_location = str(value)
+        elif key == "quantity":
+            profile.quantity = int(_number(name, key, value))
+        else:
+            setattr(profile, key, _number(name, key, value))
+    profile.overrides = [_rule(name, rule) for rule in data.get("overrides") or []]
+    return profile
+
+
+def parse_profiles(data):
+    """
+    PricingProfiles from parsed JSON or YAML: {"profiles": [...]} or a bare list.
+    """
+    if isinstance(data, dict):
+        data = data.get("profiles")
+    if not isinstance(data, list) or not data:
+        raise ValueError("Pricing profiles must be a non-empty list under 'profiles'.")
+    profiles = [profile_from_dict(item) for item in data]
+
+    names = [profile.name.casefold() for profile in profiles]
+    duplicates = sorted({profile.name for profile in profiles if names.count(profile.name.casefold()) > 1})
+    if duplicates:
+        raise ValueError(f"Pricing profile names must be unique: {duplicates}.")
+    return profiles
+
+
+def _records(frame):
+    """
+    Rows of a sheet as dicts, without blank cells.
+    """
+    frame = frame.dropna(how="all")
+    frame.columns = frame.columns.astype(str).str.strip()
+    return [{key: value for key, value in row.items() if pd.notna(value)} for row in frame.to_dict("records")]
+
+
+def read_profiles_xlsx(source):
+    """
+    Profile mappings from the Profiles and Overrides sheets of a workbook.
+    """
+    sheets = pd.read_excel(source, sheet_name=None)
+    if PROFILES_SHEET not in sheets:
+        raise ValueError(f"The pricing profile workbook must have a '{PROFILES_SHEET}' sheet.")
+    profiles = _records(sheets[PROFILES_SHEET])
+    by_name = {str(profile.get("name", "")).strip(): profile for profile in profiles}
+    for rule in _records(sheets.get(OVERRIDES_SHEET, pd.DataFrame())):
+        name = str(rule.pop("profile", "")).strip()
+        if name not in by_name:
+            raise ValueError(f"Override for unknown pricing profile '{name}'.")
+        by_name[name].setdefault("overrides", []).append(rule)
+    return profiles
+
+
+def load_profiles(source, name=None):
+    """
+    Read pricing profiles from a .json, .yaml/.yml or .xlsx path or uploaded file.
+
+    name gives the file name when source is a file object without one.
+    """
+    name = name or getattr(source, "name", None) or str(source)
+    extension = os.path.splitext(name)[1].lower()
+    if extension == ".xlsx":
+        return parse_profiles(read_profiles_xlsx(source))
+
+    if hasattr(source, "read"):
+        text = source.read()
+    else:
+        with open(source, "rb") as f:
+            text = f.read()
+    if isinstance(text, bytes):
+        text = text.decode("utf-8")
+
+    if extension in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError as e:
+            raise ImportError("Reading YAML pricing profiles needs PyYAML installed; use JSON instead.") from e
+        return parse_profiles(yaml.safe_load(text))
+    if extension == ".json":
+        return parse_profiles(json.loads(text))
+    raise ValueError(f"Unsupported pricing profile file: {name}. Use .json, .yaml, .yml or .xlsx.")
+
+
+def price_profiles(combined_df, profiles, shipping_legend):
+    """
+    Price the converted listings under every profile in one vectorized pass.
+
+    combined_df is the pipeline's output. Returns a dict of profile name to
+    its listing table in the compact layout; write it with the profile's
+    constants(). Weights are reused from combined_df for the standard
+    padding and parsed from TITLE once for all other paddings.
+    """
+    if not profiles:
+        return {}
+    base = combined_df.drop(columns=[col for col in DERIVED_COLUMNS + ["HANDLING COST"] if col in combined_df.columns])
+    rows = len(combined_df)
+
+    # One weight column per distinct packaging padding
+    paddings = list(dict.fromkeys(profile.padding for profile in profiles))
+    parts = None
+    weight_by_padding = {}
+    for padding in paddings:
+        if padding == (OUNCE_PADDING, FLUID_OUNCE_PADDING) and "ITEM WEIGHT (pounds)" in combined_df.columns:
+            weight_by_padding[padding] = _column(combined_df, "ITEM WEIGHT (pounds)")
+        elif "TITLE" in combined_df.columns:
+            parts = parts or parse_weight_parts(combined_df["TITLE"])
+            weight_by_padding[padding] = weights_from_parts(parts, *padding)
+        else:
+            weight_by_padding[padding] = np.full(rows, np.nan)
+    weights = np.vstack([weight_by_padding[profile.padding] for profile in profiles])
+
+    if shipping_legend is not None:
+        shipping = shipping_legend.lookup(weights.ravel()).to_numpy().reshape(weights.shape)
+    else:
+        shipping = np.full(weights.shape, np.nan)
+
+    brand_codes, brand_keys = brand_index(combined_df)
+    settings = [profile.settings(brand_codes, brand_keys, weights[i]) for i, profile in enumerate(profiles)]
+    handling, markup, max_factor = (np.vstack([values[name] for values in settings]) for name in RULE_SETTINGS)
+
+    # Same arithmetic as pricing.retail_price and pricing.max_price, for all profiles at once
+    cost = _column(combined_df, "COST_PRICE")
+    retail = round_half_even((cost + shipping + handling) * markup, 2)
+    maximum = round_half_even(retail * max_factor, 2)
+
+    priced = {}
+    for i, profile in enumerate(profiles):
+        df = base.copy(deep=False)
+        if "HANDLING COST" not in profile.constants():
+            df["HANDLING COST"] = handling[i]
+        df["ITEM WEIGHT (pounds)"] = weights[i]
+        df["SHIPPING COST"] = shipping[i]
+        if "COST_PRICE" in combined_df.columns:
+            df["RETAIL PRICE"] = retail[i]
+            df["MIN PRICE"] = retail[i]
+            df["MAX PRICE"] = maximum[i]
+        priced[profile.name] = df
+    return priced
+
+
+def profile_sheet_name(name):
+    """
+    name made safe for use as an Excel sheet name.
+    """
+    return _SHEET_NAME_CHARACTERS.sub("_", name)[:31] or "Profile"
+
+
+def profile_file_name(stem, name, extension):
+    """
+    Output file name for one profile, e.g. Consolidated_Data_Amazon.xlsx.
+    """
+    safe = re.sub(r"[^\w.-]+", "_", name).strip("_") or "profile"
+    return f"{stem}_{safe}.{extension}"
+
+
+def write_profiles_workbook(priced, profiles, target):
+    """
+    Write every priced profile to its own sheet of one workbook, values only.
+    """
+    sheets = {}
+    for profile in profiles:
+        sheet_name = profile_sheet_name(profile.name)
+        suffix = 2
+        while sheet_name in sheets:
+            sheet_name = f"{profile_sheet_name(profile.name)[:28]}_{suffix}"
+            suffix += 1
+        sheets[sheet_name] = with_constant_columns(priced[profile.name], profile.constants())
+    write_sheets(sheets, target)
+
+
+def profiles_workbook_bytes(combined_df, profiles, shipping_legend):
+    """
+    Price all profiles in one pass and build the one-sheet-per-profile workbook.
+    """
+    buffer = BytesIO()
+    write_profiles_workbook(price_profiles(combined_df, profiles, shipping_legend), profiles, buffer)
+    return buffer.getvalue()
+
+
+def write_profile_export(priced_df, profile, target, export_format="xlsx", shipping_legend=None):
+    """
+    Write one priced profile like the consolidated export, with the profile's formulas in xlsx.
+    """
+    legend_frame = shipping_legend.frame if shipping_legend is not None else None
+    write_export(priced_df, target, export_format, legend_frame, profile.constants(), profile)
+
+
+def profile_export_bytes(combined_df, profile, shipping_legend, export_format="xlsx"):
+    """
+    Price one profile and build its export for download.
+    """
+    buffer = BytesIO()
+    priced = price_profiles(combined_df, [profile], shipping_legend)[profile.name]
+    write_profile_export(priced, profile, buffer, export_format, shipping_legend)
+    return buffer.getvalue()
@@ -0,0 +1,171 @@
+"""
+Readers for supplier files in each input format.
+
+Every reader returns one DataFrame per sheet holding the five supplier
+columns: B,E,G,H,I of a workbook, or the columns in the same positions of a
+CSV or Parquet file. The product code columns are read as text. The format
+is detected from the first bytes of the file.
+
+Excel files are parsed by calamine (python-calamine, a Rust parser many
+times faster than openpyxl) when it is installed, else by openpyxl, or xlrd
+for legacy .xls. Either engine can be chosen by name, per call or with the
+CONVERTOR_EXCEL_ENGINE setting (convertor.config.EXCEL_ENGINE).
+"""
+import importlib.util
+import os
+
+import pandas as pd
+
+from convertor.config import EXCEL_ENGINE
+
+XLSX = "xlsx"
+XLS = "xls"
+CSV = "csv"
+PARQUET = "parquet"
+INPUT_FORMATS = (XLSX, XLS, CSV, PARQUET)
+
+# File name extensions accepted for upload, per format
+INPUT_EXTENSIONS = {XLSX: ["xlsx", "xlsm"], XLS: ["xls"], CSV: ["csv", "txt"], PARQUET: ["parquet", "pq"]}
+
+# Leading bytes of each binary format; anything else is read as CSV
+SIGNATURES = [(b"PK\x03\x04", XLSX), (b"\xd0\xcf\x11\xe0", XLS), (b"PAR1", PARQUET)]
+
+AUTO = "auto"
+CALAMINE = "calamine"
+OPENPYXL = "openpyxl"
+EXCEL_ENGINES = (AUTO, CALAMINE, OPENPYXL)
+
+HAS_CALAMINE = importlib.util.find_spec("python_calamine") is not None
+
+# Supplier sheets keep the fields we need in these columns
+SOURCE_COLUMNS = "B,E,G,H,I"
+
+# Zero-based positions of columns B,E,G,H,I
+SOURCE_COLUMN_INDEXES = (1, 4, 6, 7, 8)
+
+# Product code columns G and H, read as text. They are picked by position
+# among the supplier columns, so a header with stray spaces still matches.
+CODE_COLUMNS = {2: str, 3: str}
+
+# The same columns by position in the whole sheet, for readers given column indexes
+SHEET_CODE_COLUMNS = {SOURCE_COLUMN_INDEXES[position]: dtype for position, dtype in CODE_COLUMNS.items()}
+
+
+def _peek(source, size=8):
+    """
+    First bytes of a path, bytes or file-like source, leaving a file's position unchanged.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source[:size])
+    if hasattr(source, "read"):
+        position = source.tell()
+        head = source.read(size)
+        source.seek(position)
+        return head
+    with open(source, "rb") as f:
+        return f.read(size)
+
+
+def detect_format(source, name=None):
+    """
+    Input format of source: xlsx, xls, csv or parquet.
+
+    Binary formats are recognised by their signature and anything else is
+    read as CSV, except a file whose name (name, or the source's own) has
+    the extension of a binary format, which is reported as invalid.
+    """
+    head = _peek(source)
+    for signature, input_format in SIGNATURES:
+        if head.startswith(signature):
+            return input_format
+
+    name = str(name or getattr(source, "name", None) or (source if isinstance(source, str) else ""))
+    extension = os.path.splitext(name)[1].lower().lstrip(".")
+    for input_format in (XLSX, XLS, PARQUET):
+        if extension in INPUT_EXTENSIONS[input_format]:
+            raise ValueError(f"{os.path.basename(name)} is not a valid {input_format} file.")
+    return CSV
+
+
+def excel_engine(engine=None, input_format=XLSX):
+    """
+    pandas engine for an Excel file: calamine when installed unless engine names another.
+
+    engine defaults to the EXCEL_ENGINE setting.
+    """
+    engine = engine or EXCEL_ENGINE
+    if engine == AUTO:
+        if HAS_CALAMINE:
+            return CALAMINE
+        engine = OPENPYXL
+    if engine == CALAMINE and not HAS_CALAMINE:
+        raise ImportError("The calamine reader needs python-calamine installed: pip install python-calamine")
+    if engine == OPENPYXL and input_format == XLS:
+        return "xlrd"
+    return engine
+
+
+def read_excel_frames(source, engine=None, input_format=XLSX):
+    """
+    Columns B,E,G,H,I of every sheet of a workbook, parsing it once.
+    """
+    sheets = pd.read_excel(
+        source,
+        sheet_name=None,
+        usecols=SOURCE_COLUMNS,
+        dtype=CODE_COLUMNS,
+        engine=excel_engine(engine, input_format),
+    )
+    return list(sheets.values())
+
+
+def read_csv_frames(source, chunk_size=None):
+    """
+    The supplier columns of a CSV file, as one frame or an iterator of chunk_size-row frames.
+    """
+    return pd.read_csv(source, usecols=list(SOURCE_COLUMN_INDEXES), dtype=SHEET_CODE_COLUMNS, chunksize=chunk_size)
+
+
+def _parquet_file(source):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Parquet input needs pyarrow installed: pip install pyarrow") from e
+    return pq.ParquetFile(source)
+
+
+def _parquet_columns(parquet_file):
+    names = parquet_file.schema_arrow.names
+    return [names[i] for i in SOURCE_COLUMN_INDEXES if i < len(names)]
+
+
+def read_parquet_frames(source):
+    """
+    The supplier columns of a Parquet file, reading only those columns.
+    """
+    parquet_file = _parquet_file(source)
+    return [parquet_file.read(columns=_parquet_columns(parquet_file)).to_pandas()]
+
+
+def iter_parquet_chunks(source, chunk_size):
+    """
+    Yield frames of at most chunk_size rows of the supplier columns of a Parquet file.
+    """
+    parquet_file = _parquet_file(source)
+    for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=_parquet_columns(parquet_file)):
+        yield batch.to_pandas()
+
+
+def read_frames(source, name=None, engine=None):
+    """
+    Read the supplier columns of a path or file-like source in any input format.
+
+    Returns one frame per sheet. name is used to detect the format when the
+    source has no name of its own; engine chooses the Excel parser.
+    """
+    input_format = detect_format(source, name)
+    if input_format in (XLSX, XLS):
+        return read_excel_frames(source, engine, input_format)
+    if input_format == PARQUET:
+        return read_parquet_frames(source)
+    return [read_csv_frames(source)]
@@ -0,0 +1,45 @@
+"""
+Vectorized rounding that matches Python's built-in round().
+
+np.round scales by 10**decimals before rounding, so values whose scaled
+product is inexact (e.g. 1.005 * 100) can round differently from round().
+This module recovers the exact product with an error-free transformation and
+applies round-half-even to it, giving the same floats as round(x, 2).
+"""
+import numpy as np
+
+# Veltkamp splitter for float64: splits a double into two 26-bit halves
+_SPLITTER = 2.0**27 + 1
+
+# Above this magnitude every float is already an integer after scaling
+_EXACT_LIMIT = 2.0**52
+
+
+def round_half_even(values, decimals=2):
+    """
+    Round an array like Python's round(x, decimals), element-wise.
+
+    NaN and infinite values are passed through unchanged.
+    """
+    x = np.asarray(values, dtype="float64")
+    scale = float(10**decimals)
+
+    with np.errstate(invalid="ignore", over="ignore"):
+        # Exact scaled value is product + error (Dekker's two-product)
+        product = x * scale
+        split = x * _SPLITTER
+        high = split - (split - x)
+        low = x - high
+        error = (high * scale - product) + low * scale
+
+        whole = np.floor(product)
+        fraction = product - whole
+
+        # Only an exact .5 fraction needs the error term to break the tie
+        round_up = (fraction > 0.5) | (
+            (fraction == 0.5) & ((error > 0) | ((error == 0) & (np.fmod(whole, 2) != 0)))
+        )
+        rounded = np.copysign((whole + round_up) / scale, x)
+
+    passthrough = ~np.isfinite(product) | (np.abs(product) >= _EXACT_LIMIT)
+    return np.where(passthrough, x, rounded)
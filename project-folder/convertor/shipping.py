@@ -0,0 +1,82 @@
+"""
+Shipping tier lookup against the shipping legend workbook.
+"""
+import warnings
+
+import numpy as np
+import pandas as pd
+
+LEGEND_COLUMNS = ["Weight Range Min (lb)", "Weight Range Max (lb)", "SHIPPING COST"]
+
+
+class ShippingLegend:
+    """
+    Shipping legend compiled into sorted, inclusive weight intervals.
+
+    A weight resolves to the tier whose min and max bounds both contain it;
+    weights that fall between or outside the tiers get no shipping cost.
+    When tiers overlap, a weight gets the cost of the first matching row of
+    the legend, as the per-row lookup did, and a warning is issued.
+    """
+
+    def __init__(self, legend):
+        missing = [col for col in LEGEND_COLUMNS if col not in legend.columns]
+        if missing:
+            raise ValueError(f"Shipping legend is missing required columns: {missing}")
+
+        # Rows with a blank bound, or a max below their min, can never match a weight
+        tiers = legend[LEGEND_COLUMNS].dropna(subset=LEGEND_COLUMNS[:2])
+        tiers = tiers[tiers[LEGEND_COLUMNS[0]] <= tiers[LEGEND_COLUMNS[1]]]
+        self.frame = legend
+        self.overlapping = _has_overlaps(tiers)
+        if not self.overlapping:
+            tiers = tiers.sort_values(LEGEND_COLUMNS[0], kind="stable")
+        else:
+            warnings.warn(
+                "Shipping legend has overlapping weight ranges; each weight gets the first matching row.",
+                stacklevel=2,
+            )
+        self.mins = tiers[LEGEND_COLUMNS[0]].to_numpy(dtype="float64")
+        self.maxs = tiers[LEGEND_COLUMNS[1]].to_numpy(dtype="float64")
+        self.costs = tiers[LEGEND_COLUMNS[2]].to_numpy(dtype="float64")
+
+    @classmethod
+    def from_excel(cls, path):
+        """
+        Load and compile the legend from an Excel file.
+        """
+        return cls(pd.read_excel(path, engine="openpyxl"))
+
+    def lookup(self, weights):
+        """
+        Resolve SHIPPING COST for a whole weight column in one pass.
+        """
+        weights = pd.Series(weights)
+        values = weights.to_numpy(dtype="float64", na_value=np.nan)
+        costs = np.full(len(values), np.nan)
+        if len(self.mins) == 0:
+            return pd.Series(costs, index=weights.index, dtype="float64")
+
+        if self.overlapping:
+            # Tiers are in legend order; assign from the last row so the first match wins
+            for low, high, cost in zip(self.mins[::-1], self.maxs[::-1], self.costs[::-1]):
+                costs[(values >= low) & (values <= high)] = cost
+            return pd.Series(costs, index=weights.index, dtype="float64")
+
+        # Last tier starting at or below each weight, then check its upper bound
+        tier = np.searchsorted(self.mins, values, side="right") - 1
+        candidate = np.clip(tier, 0, None)
+        matched = (tier >= 0) & (values <= self.maxs[candidate])
+
+        costs[matched] = self.costs[candidate[matched]]
+        return pd.Series(costs, index=weights.index, dtype="float64")
+
+
+def _has_overlaps(tiers):
+    """
+    Whether any weight lies in two tiers.
+    """
+    tiers = tiers.sort_values(LEGEND_COLUMNS[0])
+    mins = tiers[LEGEND_COLUMNS[0]].to_numpy(dtype="float64")
+    maxs = tiers[LEGEND_COLUMNS[1]].to_numpy(dtype="float64")
+    return bool(np.any(mins[1:] <= np.maximum.accumulate(maxs)[:-1]))
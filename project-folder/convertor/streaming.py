@@ -0,0 +1,356 @@
+"""
+Bounded-memory streaming conversion for very large supplier workbooks.
+
+Rows are read in chunks (with openpyxl's read-only iter_rows for xlsx, and
+the chunked CSV and Parquet readers of convertor.readers), run through the
+row-local conversion steps and the blocked-brand filter, and appended to a
+write-only output workbook. Only the key hash index used for deduplication
+and the metrics counters stay in memory. Each file's rows are staged in a
+temporary file and written once the whole file has been read, so a file
+that fails part way adds nothing to the output; rows with a missing weight
+are spooled until the end so they can still be written last. Keeping the
+lowest-cost duplicate takes an extra pass over the files to find each key's
+lowest cost before any row is written.
+
+Each chunk is type-inferred on its own, so a column whose cells mix numbers
+and blanks can come out differently than when a whole sheet is loaded at once.
+The product code columns are read as text, as in convertor.ingest, so SKU
+and UPC/ISBN are not affected. Legacy .xls workbooks cannot be read in
+chunks and are loaded whole before being split.
+"""
+import pickle
+import tempfile
+from dataclasses import dataclass, field, fields
+from io import BytesIO
+
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
+from pandas.io.parsers import TextParser
+
+from convertor.brands import brand_matcher
+from convertor.codes import INVALID_CODES_SHEET, invalid_codes
+from convertor.columns import CONSTANT_COLUMNS
+from convertor.dedup import DEFAULT_KEYS, KEEP_FIRST, KEEP_LOWEST_COST, DedupIndex, DedupReport
+from convertor.export import StreamingWorkbookWriter
+from convertor.ingest import source_name
+from convertor.instrument import RunInstrument
+from convertor.pipeline import PipelineMetrics, filter_blocked_brands, transform
+from convertor.readers import (
+    CODE_COLUMNS,
+    PARQUET,
+    SOURCE_COLUMN_INDEXES,
+    XLS,
+    XLSX,
+    detect_format,
+    iter_parquet_chunks,
+    read_csv_frames,
+    read_excel_frames,
+)
+from convertor.shipping import ShippingLegend
+
+DEFAULT_CHUNK_SIZE = 50_000
+
+# Kinds of rows staged per file: output rows, output rows missing a weight, blocked-brand rows, invalid codes
+KEPT = "kept"
+MISSING_WEIGHT = "missing_weight"
+REMOVED = "removed"
+INVALID = "invalid"
+
+
+@dataclass
+class StreamResult:
+    """
+    Workbooks of a streaming conversion run in memory, with its metrics, errors and stage timings.
+    """
+    output: bytes
+    invalid_codes: bytes
+    metrics: PipelineMetrics
+    errors: list = field(default_factory=list)
+    dedup: DedupReport = field(default_factory=DedupReport)
+    stages: list = field(default_factory=list)
+
+
+def _convert_cell(cell):
+    """
+    Convert a cell value the way pandas' openpyxl reader does.
+    """
+    if cell.value is None:
+        return ""
+    if cell.data_type == TYPE_ERROR:
+        return float("nan")
+    if cell.data_type == TYPE_NUMERIC:
+        value = int(cell.value)
+        return value if value == cell.value else float(cell.value)
+    return cell.value
+
+
+def _select(row):
+    return [_convert_cell(row[i]) if i < len(row) else "" for i in SOURCE_COLUMN_INDEXES]
+
+
+def _parse_chunk(header, rows):
+    """
+    Build a DataFrame from raw rows with read_excel's NA handling and type inference.
+    """
+    return TextParser([header] + rows, header=0, skip_blank_lines=False, dtype=CODE_COLUMNS).read()
+
+
+def iter_sheet_chunks(source, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield DataFrames of at most chunk_size rows from columns B,E,G,H,I of every sheet.
+    """
+    workbook = load_workbook(source, read_only=True, data_only=True, keep_links=False)
+    try:
+        for worksheet in workbook.worksheets:
+            worksheet.reset_dimensions()
+            rows = worksheet.iter_rows()
+            first_row = next(rows, None)
+            if first_row is None:
+                continue
+            header = _select(first_row)
+
+            chunk = []
+            blank_rows = 0
+            for row in rows:
+                # Blank rows only count if data follows them, like read_excel
+                if all(cell.value is None for cell in row):
+                    blank_rows += 1
+                    continue
+                chunk.extend([[""] * len(SOURCE_COLUMN_INDEXES)] * blank_rows)
+                blank_rows = 0
+                chunk.append(_select(row))
+                if len(chunk) >= chunk_size:
+                    yield _parse_chunk(header, chunk)
+                    chunk = []
+            if chunk:
+                yield _parse_chunk(header, chunk)
+    finally:
+        workbook.close()
+
+
+def iter_source_chunks(source, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield DataFrames of at most chunk_size supplier rows from a file in any input format.
+    """
+    if hasattr(source, "seek"):
+        # Uploaded files are read once per pass
+        source.seek(0)
+    input_format = detect_format(source)
+    if input_format == XLSX:
+        yield from iter_sheet_chunks(source, chunk_size)
+    elif input_format == XLS:
+        for frame in read_excel_frames(source, input_format=XLS):
+            for start in range(0, len(frame), chunk_size):
+                yield frame.iloc[start:start + chunk_size]
+    elif input_format == PARQUET:
+        yield from iter_parquet_chunks(source, chunk_size)
+    else:
+        yield from read_csv_frames(source, chunk_size)
+
+
+def _converted_chunks(source, chunk_size, shipping_legend, instrument, errors):
+    """
+    Yield (raw row count, transformed chunk) for each chunk of source.
+    """
+    chunks = iter_source_chunks(source, chunk_size)
+    while True:
+        with instrument.stage("Read files") as stage:
+            raw_chunk = next(chunks, None)
+            stage.rows_out = len(raw_chunk) if raw_chunk is not None else 0
+        if raw_chunk is None:
+            return
+        chunk, chunk_errors = transform(raw_chunk, shipping_legend, instrument)
+        errors.extend(error for error in chunk_errors if error not in errors)
+        yield len(raw_chunk), chunk
+
+
+def _lowest_cost_index(sources, chunk_size, shipping_legend, dedup_keys, instrument, errors):
+    """
+    First pass for keep="lowest_cost": index the lowest cost of every key.
+
+    Returns the index and the sources that could be read. A file that fails
+    part way is dropped and the others are indexed again without it.
+    """
+    sources = list(sources)
+    while True:
+        index = DedupIndex(dedup_keys, KEEP_LOWEST_COST)
+        for source in sources:
+            try:
+                for _, chunk in _converted_chunks(source, chunk_size, shipping_legend, instrument, errors):
+                    with instrument.stage("Find lowest costs", len(chunk)):
+                        index.observe(chunk, source_name(source))
+            except Exception as e:
+                errors.append(f"Error reading file {source_name(source)}: {e}")
+                sources.remove(source)
+                break
+        else:
+            return index, sources
+
+
+def _spool(spool, kind, frame):
+    if not frame.empty:
+        pickle.dump((kind, frame), spool)
+
+
+def _spooled(spool):
+    """
+    Yield the (kind, frame) records pickled to spool, from the start.
+    """
+    spool.seek(0)
+    while True:
+        try:
+            yield pickle.load(spool)
+        except EOFError:
+            return
+
+
+def _stage_file(source, spool, chunk_size, shipping_legend, blocked_brands, index, instrument, errors):
+    """
+    Convert one file into spool as (kind, frame) records and return its metrics.
+
+    Nothing reaches the output workbooks until the whole file has converted,
+    so a file that fails part way leaves none of its rows behind.
+    """
+    metrics = PipelineMetrics()
+    for input_rows, chunk in _converted_chunks(source, chunk_size, shipping_legend, instrument, errors):
+        metrics.total_input_listings += input_rows
+
+        # Drop rows whose key was kept from this or an earlier chunk
+        with instrument.stage("Remove duplicates", len(chunk)) as stage:
+            chunk = chunk[index.filter(chunk, source_name(source))]
+            stage.rows_out = len(chunk)
+
+        with instrument.stage("Filter blocked brands", len(chunk)) as stage:
+            chunk, removed_rows = filter_blocked_brands(chunk, blocked_brands)
+            stage.rows_out = len(chunk)
+        metrics.blocked_removed += len(removed_rows)
+
+        with instrument.stage("Validate UPC/ISBN", len(chunk)) as stage:
+            invalid = invalid_codes(chunk)
+            stage.rows_out = len(invalid)
+        metrics.invalid_codes += len(invalid)
+
+        with instrument.stage("Stage rows", len(chunk)):
+            # Rows with missing weights are written after all others
+            missing = chunk["ITEM WEIGHT (pounds)"].isnull() if "ITEM WEIGHT (pounds)" in chunk.columns else pd.Series(False, index=chunk.index)
+            _spool(spool, KEPT, chunk[~missing])
+            _spool(spool, MISSING_WEIGHT, chunk[missing])
+            _spool(spool, REMOVED, removed_rows)
+            _spool(spool, INVALID, invalid)
+        metrics.total_output_listings += int((~missing).sum())
+        metrics.listings_no_weights += int(missing.sum())
+    return metrics
+
+
+def stream_convert(
+    sources,
+    target,
+    shipping_legend,
+    blocked_brands,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    removed_target=None,
+    instrument=None,
+    dedup_keys=DEFAULT_KEYS,
+    keep=KEEP_FIRST,
+    invalid_target=None,
+):
+    """
+    Convert supplier workbooks straight into the consolidated workbook at target.
+
+    Returns the run metrics, a list of errors and the DedupReport. Each file's
+    rows are staged in a temporary file and written only once the whole file
+    has converted, so a file that fails to read, even part way, is reported
+    and leaves no rows, counts or dedup keys behind. Rows removed for blocked
+    brands are written to removed_target, and output rows with an invalid
+    UPC/ISBN to invalid_target, when given. Stage timings are summed over
+    all chunks on instrument when one is given. dedup_keys and keep choose
+    how duplicates are removed, as in process().
+    """
+    instrument = instrument or RunInstrument()
+    if isinstance(shipping_legend, pd.DataFrame):
+        shipping_legend = ShippingLegend(shipping_legend)
+    blocked_brands = brand_matcher(blocked_brands)
+
+    writer = StreamingWorkbookWriter(
+        target, shipping_legend=shipping_legend.frame if shipping_legend else None, constants=CONSTANT_COLUMNS
+    )
+    removed_writer = None
+    if removed_target is not None:
+        removed_writer = StreamingWorkbookWriter(
+            removed_target, sheet_name="Removed_Blocked_Brands", highlight_missing_weights=False, constants=CONSTANT_COLUMNS
+        )
+    invalid_writer = None
+    if invalid_target is not None:
+        invalid_writer = StreamingWorkbookWriter(invalid_target, sheet_name=INVALID_CODES_SHEET, highlight_missing_weights=False)
+
+    metrics = PipelineMetrics()
+    errors = []
+    if keep == KEEP_LOWEST_COST:
+        index, sources = _lowest_cost_index(sources, chunk_size, shipping_legend, dedup_keys, instrument, errors)
+    else:
+        index = DedupIndex(dedup_keys, keep)
+
+    with tempfile.TemporaryFile() as missing_spool:
+        for source in sources:
+            state = index.checkpoint()
+            with tempfile.TemporaryFile() as spool:
+                try:
+                    file_metrics = _stage_file(
+                        source, spool, chunk_size, shipping_legend, blocked_brands, index, instrument, errors
+                    )
+                except Exception as e:
+                    index.rollback(state)
+                    errors.append(f"Error reading file {source_name(source)}: {e}")
+                    continue
+
+                with instrument.stage("Write workbook", file_metrics.total_output_listings):
+                    for kind, frame in _spooled(spool):
+                        if kind == KEPT:
+                            writer.append(frame)
+                        elif kind == MISSING_WEIGHT:
+                            _spool(missing_spool, kind, frame)
+                        elif kind == REMOVED and removed_writer is not None:
+                            removed_writer.append(frame)
+                        elif kind == INVALID and invalid_writer is not None:
+                            invalid_writer.append(frame)
+            for counter in fields(PipelineMetrics):
+                setattr(metrics, counter.name, getattr(metrics, counter.name) + getattr(file_metrics, counter.name))
+
+        # Rows with missing weights are counted in listings_no_weights; they join the output count as written
+        with instrument.stage("Write workbook", metrics.listings_no_weights):
+            for _, chunk in _spooled(missing_spool):
+                writer.append(chunk)
+                metrics.total_output_listings += len(chunk)
+
+            writer.close()
+            for extra_writer in (removed_writer, invalid_writer):
+                if extra_writer is not None:
+                    extra_writer.close()
+
+    metrics.duplicates_removed = index.report.removed
+    return metrics, errors, index.report
+
+
+def stream_convert_bytes(
+    sources, shipping_legend, blocked_brands, instrument=None, dedup_keys=DEFAULT_KEYS, keep=KEEP_FIRST
+):
+    """
+    Run stream_convert into in-memory workbooks and return a StreamResult.
+    """
+    instrument = instrument or RunInstrument()
+    first_stage = len(instrument.stages)
+    output, invalid_output = BytesIO(), BytesIO()
+    metrics, errors, dedup = stream_convert(
+        sources,
+        output,
+        shipping_legend,
+        blocked_brands,
+        instrument=instrument,
+        dedup_keys=dedup_keys,
+        keep=keep,
+        invalid_target=invalid_output,
+    )
+    return StreamResult(
+        output.getvalue(), invalid_output.getvalue(), metrics, errors, dedup, instrument.stages[first_stage:]
+    )
@@ -0,0 +1,80 @@
+"""
+Weight extraction for the TITLE column.
+
+Titles carry the unit weight ("8 oz", "10 fl oz", ...) and optionally a pack
+size ("2 pack", "pack of 3"). The shipping weight is the unit weight plus
+packaging padding, multiplied by the pack size and converted to pounds.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+from convertor.rounding import round_half_even
+
+# Extract the weight (e.g., "8 oz", "10 fl oz", etc.); the outer group keeps the full match
+WEIGHT_PATTERN = re.compile(
+    r"((\d+(?:\.\d+)?)\s*(?:oz|ounces|ounce|fl. oz.|fluid ounce|fl oz|fluid ounces))", re.IGNORECASE
+)
+
+# Extract the pack size (e.g., "2 pack", "pack of 3", etc.)
+PACK_PATTERN = re.compile(r"(?:\b(\d+)\s*pack\b|\bpack of\s*(\d+))", re.IGNORECASE)
+
+# Packaging padding in ounces added to a single unit
+FLUID_OUNCE_PADDING = 10
+OUNCE_PADDING = 6
+
+OUNCES_PER_POUND = 16
+
+
+def parse_weight_parts(titles):
+    """
+    Parse the unit weight, fluid flag and pack size of a whole TITLE column.
+
+    Each distinct title is parsed once. Returns the per-row codes into the
+    distinct titles and, per distinct title, the unit weight in ounces, whether
+    it is in fluid ounces and the pack size (NaN where unparseable).
+    """
+    titles = pd.Series(titles)
+    codes, uniques = pd.factorize(titles)
+    distinct = pd.Series(uniques, dtype=object)
+    distinct = distinct.where(distinct.map(type) == str)
+
+    weight_match = distinct.str.extract(WEIGHT_PATTERN)
+    pack_match = distinct.str.extract(PACK_PATTERN)
+
+    unit_weight = weight_match[1].astype("float64").to_numpy()
+    is_fluid = weight_match[0].str.lower().str.contains("fl oz", regex=False).fillna(False).to_numpy(dtype=bool)
+    pack_size = pack_match[0].fillna(pack_match[1]).astype("float64").fillna(1).to_numpy()
+    # Pack sizes too large for a float cannot be converted; treat them as unparseable
+    pack_size = np.where(np.isinf(pack_size), np.nan, pack_size)
+    return codes, unit_weight, is_fluid, pack_size
+
+
+def weights_from_parts(parts, ounce_padding=OUNCE_PADDING, fluid_ounce_padding=FLUID_OUNCE_PADDING):
+    """
+    Shipping weights in pounds per row from parse_weight_parts, with the given padding.
+    """
+    codes, unit_weight, is_fluid, pack_size = parts
+    padding = np.where(is_fluid, fluid_ounce_padding, ounce_padding)
+    total = ((unit_weight + padding) * pack_size) / OUNCES_PER_POUND
+
+    weights = round_half_even(total, 2)
+
+    result = np.full(len(codes), np.nan)
+    found = codes >= 0
+    result[found] = weights[codes[found]]
+    return result
+
+
+def extract_weights(titles):
+    """
+    Compute ITEM WEIGHT (pounds) for a whole TITLE column.
+
+    Each distinct title is parsed once; the padding and pound conversion run as
+    array math. Non-string titles and titles without a weight yield NaN.
+    """
+    titles = pd.Series(titles)
+    if titles.empty:
+        return pd.Series(np.nan, index=titles.index, dtype="float64")
+    return pd.Series(weights_from_parts(parse_weight_parts(titles)), index=titles.index, dtype="float64")
@@ -0,0 +1,28 @@
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import generate_vendor_files
+from convertor.config import SHIPPING_LEGEND_PATH
+from convertor.shipping import ShippingLegend
+
+SUPPLIER_HEADER = ["Product Details", "Brand", "Product ID", "UPC Code", "Price"]
+
+
+def supplier_frame(rows):
+    """
+    Raw supplier rows with the headers of columns B,E,G,H,I.
+    """
+    return pd.DataFrame(rows, columns=SUPPLIER_HEADER)
+
+
+@pytest.fixture(scope="session")
+def legend():
+    return ShippingLegend.from_excel(SHIPPING_LEGEND_PATH)
+
+
+@pytest.fixture(scope="session")
+def vendor_files(tmp_path_factory):
+    """
+    Two synthetic vendor workbooks of two sheets each, 600 rows in all.
+    """
+    return generate_vendor_files(str(tmp_path_factory.mktemp("vendors")), 600, files=2, sheets=2, seed=7)
@@ -0,0 +1,78 @@
+import pandas as pd
+
+from benchmarks.run import compare, main, mismatched_parameters
+from benchmarks.synthetic import generate_rows
+from convertor.codes import BAD_CHECK_DIGIT, normalize_upcs, upc_problems
+
+UPC_COLUMN = 7
+
+
+def upc_problem_counts(rows):
+    upcs = pd.Series([row[UPC_COLUMN] for row in rows], dtype=object)
+    return upc_problems(normalize_upcs(upcs)).value_counts()
+
+
+def test_generated_upcs_have_valid_check_digits():
+    counts = upc_problem_counts(generate_rows(2000, seed=3, invalid_upc_ratio=0))
+    assert BAD_CHECK_DIGIT not in counts
+
+
+def test_generated_invalid_upc_share():
+    counts = upc_problem_counts(generate_rows(20000, seed=3, duplicate_ratio=0, invalid_upc_ratio=0.1))
+    assert 0.08 < counts[BAD_CHECK_DIGIT] / 20000 < 0.12
+
+
+def stages(**metrics):
+    return {"stages": {"export": metrics}}
+
+
+def test_compare_flags_regressions_past_threshold():
+    baseline = stages(wall_s=1.0, peak_mb=40.0)
+    assert compare(stages(wall_s=1.2, peak_mb=45.0), baseline, threshold=0.25) == []
+    regressions = compare(stages(wall_s=1.3, peak_mb=60.0), baseline, threshold=0.25)
+    assert [regression.split(":")[1].split()[0] for regression in regressions] == ["wall_s", "peak_mb"]
+
+
+def test_compare_ignores_noise_and_unknown_stages():
+    assert compare(stages(wall_s=0.04, peak_mb=4.0), stages(wall_s=0.01, peak_mb=0.5)) == []
+    assert compare(stages(wall_s=9.0), {"stages": {}}) == []
+
+
+def benchmark_args(tmp_path, *args):
+    return [
+        "--rows", "200", "--repeat", "1", "--no-memory",
+        "--work-dir", str(tmp_path / "work"),
+        "--baseline-dir", str(tmp_path / "baselines"),
+        "--results-dir", str(tmp_path / "results"),
+        *args,
+    ]
+
+
+def test_missing_baseline_fails_when_required(tmp_path, capsys):
+    assert main(benchmark_args(tmp_path)) == 0
+    assert main(benchmark_args(tmp_path, "--require-baseline")) == 1
+    assert "MISSING BASELINE" in capsys.readouterr().err
+
+
+def test_saved_baseline_is_compared(tmp_path):
+    assert main(benchmark_args(tmp_path, "--save-baseline")) == 0
+    assert (tmp_path / "baselines" / "200.json").exists()
+    assert main(benchmark_args(tmp_path, "--require-baseline", "--threshold", "10")) == 0
+
+
+def test_mismatched_parameters():
+    result = {"rows": 200, "files": 2, "sheets": 2, "duplicates": 0.1, "invalid_upcs": 0.05, "seed": 0}
+    assert mismatched_parameters(result, dict(result)) == []
+    assert mismatched_parameters(result, {**result, "seed": 1, "duplicates": 0.2}) == [
+        "duplicates: baseline 0.2, this run 0.1",
+        "seed: baseline 1, this run 0",
+    ]
+
+
+def test_baseline_with_other_parameters_is_not_compared(tmp_path, capsys):
+    assert main(benchmark_args(tmp_path, "--save-baseline", "--seed", "1")) == 0
+    assert main(benchmark_args(tmp_path)) == 0
+    assert main(benchmark_args(tmp_path, "--require-baseline")) == 1
+    err = capsys.readouterr().err
+    assert "BASELINE MISMATCH" in err and "seed: baseline 1, this run 0" in err
+    assert "REGRESSION" not in err
@@ -0,0 +1,103 @@
+import os
+from io import BytesIO
+
+import pandas as pd
+import pytest
+
+from convertor.brands import (
+    BLOCKED_BRANDS_COLUMN,
+    BlockedBrandMatcher,
+    BlockedBrandStore,
+    normalize_brand,
+    normalize_brands,
+    open_blocked_brands,
+    read_blocked_brands_xlsx,
+)
+
+
+def write_brands(path, brands, mtime=None):
+    pd.DataFrame({BLOCKED_BRANDS_COLUMN: brands}).to_excel(path, index=False)
+    if mtime is not None:
+        os.utime(path, ns=(mtime, mtime))
+    return str(path)
+
+
+def test_normalize_brand():
+    assert normalize_brand("  Great \t  VALUE ") == "great value"
+    assert normalize_brand("STRASSE") == normalize_brand("straße")
+    assert normalize_brands(["A  b", None, 5]).tolist()[0] == "a b"
+    assert normalize_brands(["A  b", None, 5]).isna().tolist() == [False, True, True]
+
+
+def test_matcher_ignores_case_and_spacing():
+    matcher = BlockedBrandMatcher.from_names(["Great Value", "hefty", None])
+    brands = pd.Series(["great  value", " HEFTY", "Tide", None, "Great Values"], index=[5, 6, 7, 8, 9])
+    mask = matcher.matches(brands)
+    assert mask.tolist() == [True, True, False, False, False]
+    assert list(mask.index) == [5, 6, 7, 8, 9]
+    assert len(matcher) == 2
+
+
+def test_store_collapses_spelling_variants(tmp_path):
+    store = BlockedBrandStore(str(tmp_path / "brands.sqlite3"))
+    assert store.add("Hefty")
+    assert not store.add("  HEFTY ")
+    assert store.upsert_many(["Tide", "tide", "", None, "Dove"]) == 2
+    assert store.to_frame()[BLOCKED_BRANDS_COLUMN].tolist() == ["Hefty", "Tide", "Dove"]
+
+
+def test_store_revision_and_cached_views(tmp_path):
+    store = BlockedBrandStore(str(tmp_path / "brands.sqlite3"))
+    store.add("Hefty")
+    revision, matcher, data = store.revision(), store.matcher(), store.xlsx_bytes()
+    assert store.matcher() is matcher and store.xlsx_bytes() is data
+    store.add("Hefty")
+    assert store.revision() == revision
+    store.add("Tide")
+    assert store.revision() == revision + 1
+    assert store.matcher() is not matcher and store.xlsx_bytes() != data
+    assert "tide" in store.matcher().normalized
+
+
+def test_seed_imported_when_created(tmp_path):
+    seed = write_brands(tmp_path / "seed.xlsx", ["Hefty", "Tide"])
+    store = BlockedBrandStore.open(str(tmp_path / "brands.sqlite3"), seed_xlsx=seed)
+    assert len(store) == 2
+
+
+def test_seed_changes_import_new_brands_only(tmp_path):
+    db = str(tmp_path / "brands.sqlite3")
+    seed = write_brands(tmp_path / "seed.xlsx", ["Hefty", "Tide"], mtime=1_000_000_000)
+    store = BlockedBrandStore.open(db, seed_xlsx=seed)
+    store.add("Dove")
+    assert store.import_seed(seed) == 0
+
+    write_brands(seed, ["Tide", "Kraft"], mtime=2_000_000_000)
+    reopened = BlockedBrandStore.open(db, seed_xlsx=seed)
+    # Kraft is new; Hefty stays blocked although the workbook dropped it
+    assert reopened.to_frame()[BLOCKED_BRANDS_COLUMN].tolist() == ["Hefty", "Tide", "Dove", "Kraft"]
+    assert reopened.import_seed(seed) == 0
+
+
+def test_open_blocked_brands_from_workbook(tmp_path):
+    matcher = open_blocked_brands(write_brands(tmp_path / "list.xlsx", ["Hefty"]))
+    assert matcher.normalized == {"hefty"}
+
+
+def test_open_blocked_brands_seeds_a_new_database(tmp_path):
+    seed = write_brands(tmp_path / "seed.xlsx", ["Hefty", "Tide"])
+    assert len(open_blocked_brands(str(tmp_path / "new.sqlite3"), seed_xlsx=seed)) == 2
+    assert len(open_blocked_brands(str(tmp_path / "empty.sqlite3"))) == 0
+
+
+def test_workbook_without_brand_column(tmp_path):
+    path = tmp_path / "bad.xlsx"
+    pd.DataFrame({"Brand": ["Hefty"]}).to_excel(path, index=False)
+    with pytest.raises(ValueError, match=BLOCKED_BRANDS_COLUMN):
+        open_blocked_brands(str(path))
+
+
+def test_xlsx_bytes_round_trip(tmp_path):
+    store = BlockedBrandStore(str(tmp_path / "brands.sqlite3"))
+    store.upsert_many(["Hefty", "Great Value"])
+    assert read_blocked_brands_xlsx(BytesIO(store.xlsx_bytes())) == ["Hefty", "Great Value"]
@@ -0,0 +1,206 @@
+from io import BytesIO
+
+import pandas as pd
+import pytest
+
+import convertor.cache as cache_module
+from convertor.cache import (
+    MemoryLRUCache,
+    cached_artifact,
+    cached_catalog_diff,
+    cached_ingest,
+    cached_process,
+    content_hash,
+    estimate_size,
+    lazy_artifact,
+    stream_hash,
+    upload_key,
+)
+from convertor.catalog import ListingCatalog
+from convertor.dedup import KEEP_FIRST, KEEP_LOWEST_COST
+from convertor.instrument import RunInstrument
+
+
+def upload(path, name):
+    with open(path, "rb") as f:
+        data = BytesIO(f.read())
+    data.name = name
+    return data
+
+
+@pytest.fixture
+def read_calls(monkeypatch):
+    calls = []
+    read_payloads = cache_module.read_payloads
+
+    def recording(jobs):
+        jobs = list(jobs)
+        calls.append([name for name, _ in jobs])
+        return read_payloads(jobs, max_workers=1)
+
+    monkeypatch.setattr(cache_module, "read_payloads", recording)
+    return calls
+
+
+def test_lru_evicts_least_recently_used():
+    cache = MemoryLRUCache(max_bytes=250)
+    cache.put("a", b"x" * 100)
+    cache.put("b", b"x" * 100)
+    cache.get("a")
+    cache.put("c", b"x" * 100)
+    assert "a" in cache and "c" in cache and "b" not in cache
+    assert cache.total_bytes == 200
+
+
+def test_lru_skips_values_over_budget():
+    cache = MemoryLRUCache(max_bytes=50)
+    cache.put("small", b"x" * 10)
+    cache.put("big", b"x" * 100)
+    assert "big" not in cache and "small" in cache
+
+
+def test_lru_replaces_entry_size():
+    cache = MemoryLRUCache(max_bytes=1000)
+    cache.put("a", b"x" * 100)
+    cache.put("a", b"x" * 10)
+    assert len(cache) == 1 and cache.total_bytes == 10
+
+
+def test_get_or_compute_computes_once():
+    cache = MemoryLRUCache()
+    calls = []
+    compute = lambda: calls.append(1) or b"value"
+    assert cache.get_or_compute("k", compute) == cache.get_or_compute("k", compute) == b"value"
+    assert len(calls) == 1
+
+
+def test_estimate_size_of_frames():
+    df = pd.DataFrame({"a": range(1000)})
+    assert estimate_size(df) >= 8000
+    assert estimate_size([df, df]) >= 16000
+
+
+def test_stream_hash_matches_content_hash(monkeypatch):
+    monkeypatch.setattr(cache_module, "HASH_CHUNK_SIZE", 7)
+    data = bytes(range(256)) * 10
+    stream = BytesIO(data)
+    stream.seek(42)
+    assert stream_hash(stream) == content_hash(data) == upload_key(data)
+    assert stream.tell() == 42
+
+
+def test_ingest_parses_each_content_once(vendor_files, read_calls):
+    cache = MemoryLRUCache()
+    keys, frames, errors = cached_ingest([upload(vendor_files[0], "a.xlsx")], cache)
+    assert errors == [] and len(frames) == 2
+    again_keys, again, _ = cached_ingest([upload(vendor_files[0], "a.xlsx"), upload(vendor_files[1], "b.xlsx")], cache)
+    assert read_calls == [["a.xlsx"], ["b.xlsx"]]
+    assert again_keys[0] == keys[0]
+    pd.testing.assert_frame_equal(again[0], frames[0])
+
+
+def test_ingest_labels_copies_of_cached_frames(vendor_files, read_calls):
+    cache = MemoryLRUCache()
+    _, first, _ = cached_ingest([upload(vendor_files[0], "a.xlsx")], cache)
+    _, renamed, _ = cached_ingest([upload(vendor_files[0], "renamed.xlsx")], cache)
+    assert [frame.attrs["source"] for frame in renamed] == ["renamed.xlsx"] * 2
+    assert [frame.attrs["source"] for frame in first] == ["a.xlsx"] * 2
+    assert [frame.attrs["source"] for frame in cache.get(("sheets", upload_key(upload(vendor_files[0], "x"))))] == ["a.xlsx"] * 2
+
+
+def test_ingest_does_not_cache_failures(tmp_path, read_calls):
+    cache = MemoryLRUCache()
+    bad = BytesIO(b"PK\x03\x04 broken")
+    bad.name = "bad.xlsx"
+    for _ in range(2):
+        keys, frames, errors = cached_ingest([bad], cache)
+        assert keys == () and frames == [] and len(errors) == 1
+    assert len(read_calls) == 2 and len(cache) == 0
+
+
+def test_process_keyed_by_references_and_dedup(vendor_files, legend):
+    cache = MemoryLRUCache()
+    keys, frames, _ = cached_ingest(vendor_files, cache)
+    raw = pd.concat(frames, ignore_index=True)
+    first = cached_process(keys, raw, legend, [], ("legend", 1), cache=cache)
+    assert cached_process(keys, raw, legend, [], ("legend", 1), cache=cache) is first
+    assert cached_process(keys, raw, legend, [], ("legend", 2), cache=cache) is not first
+    lowest = cached_process(keys, raw, legend, [], ("legend", 1), keep=KEEP_LOWEST_COST, cache=cache)
+    assert lowest is not first and lowest.dedup.keep == KEEP_LOWEST_COST
+    assert cached_process(keys, raw, legend, [], ("legend", 1), keep=KEEP_FIRST, cache=cache) is first
+
+
+def test_refresh_reruns_a_cached_process_for_measuring(vendor_files, legend):
+    cache = MemoryLRUCache()
+    keys, frames, _ = cached_ingest(vendor_files, cache)
+    raw = pd.concat(frames, ignore_index=True)
+    first = cached_process(keys, raw, legend, [], ("legend", 1), cache=cache)
+
+    instrument = RunInstrument()
+    refreshed = cached_process(keys, raw, legend, [], ("legend", 1), instrument=instrument, refresh=True, cache=cache)
+    instrument.finish()
+    assert refreshed is not first and instrument.stages
+    assert cached_process(keys, raw, legend, [], ("legend", 1), cache=cache) is refreshed
+
+
+def counting_build(data):
+    calls = []
+
+    def build():
+        calls.append(1)
+        return data
+    return build, calls
+
+
+def test_artifact_built_once_per_version():
+    cache = MemoryLRUCache(max_bytes=10_000)
+    build, calls = counting_build(b"workbook")
+    assert cached_artifact(("removed_rows", 1), build, cache) == b"workbook"
+    assert cached_artifact(("removed_rows", 1), build, cache) == b"workbook"
+    assert len(calls) == 1
+    cached_artifact(("removed_rows", 2), build, cache)
+    assert len(calls) == 2
+
+
+def test_lazy_artifact_builds_on_first_download():
+    cache = MemoryLRUCache(max_bytes=10_000)
+    build, calls = counting_build(b"workbook")
+    download = lazy_artifact(("invalid_codes", 1), build, cache)
+    assert calls == []
+    assert download() == b"workbook" and download() == b"workbook"
+    assert len(calls) == 1
+    # Rebuilding the page makes a new callable for the same version, which reuses the bytes
+    assert lazy_artifact(("invalid_codes", 1), build, cache)() == b"workbook"
+    assert len(calls) == 1
+
+
+def test_artifact_over_budget_is_rebuilt():
+    cache = MemoryLRUCache(max_bytes=4)
+    build, calls = counting_build(b"too large to keep")
+    cached_artifact("big", build, cache)
+    cached_artifact("big", build, cache)
+    assert len(calls) == 2 and len(cache) == 0
+
+
+def test_catalog_diff_recomputed_only_after_a_save(tmp_path, monkeypatch):
+    cache = MemoryLRUCache()
+    catalog = ListingCatalog(str(tmp_path / "catalog.sqlite3"))
+    listings = pd.DataFrame({"SKU": ["1", "2"], "UPC/ISBN": ["036000291452", "012345678905"], "COST_PRICE": [5.0, 3.0]})
+    diffs = []
+    diff = ListingCatalog.diff
+
+    def recording(self, df):
+        diffs.append(len(df))
+        return diff(self, df)
+
+    monkeypatch.setattr(ListingCatalog, "diff", recording)
+
+    first = cached_catalog_diff(catalog, listings, ("result", 1), cache)
+    assert cached_catalog_diff(catalog, listings, ("result", 1), cache) is first
+    assert first.counts()["added"] == 2 and len(diffs) == 1
+
+    catalog.save(listings, "reference")
+    assert catalog.revision() == 1
+    assert not cached_catalog_diff(catalog, listings, ("result", 1), cache)
+    cached_catalog_diff(catalog, listings, ("result", 2), cache)
+    assert len(diffs) == 3
@@ -0,0 +1,111 @@
+from io import BytesIO
+
+import pandas as pd
+
+from convertor.catalog import ListingCatalog, delta_workbook_bytes, diff_listings, reference_version
+from convertor.columns import DERIVED_COLUMNS
+from convertor.pipeline import process
+from convertor.preview import style_page
+
+from conftest import supplier_frame
+
+
+def listings(rows):
+    return pd.DataFrame(rows, columns=["TITLE", "BRAND", "SKU", "UPC/ISBN", "COST_PRICE"])
+
+
+def yesterday():
+    return listings([
+        ["Coffee", "Folgers", "1", "036000291452", 5.0],
+        ["Tea", "Lipton", "2", "012345678905", 3.0],
+        ["Oats", "Quaker", "3", "030000010204", 4.0],
+    ])
+
+
+def test_diff_listings_by_key():
+    today = listings([
+        ["Coffee", "Folgers", "1", "036000291452", 5.0],
+        ["Tea", "Lipton", "2", "012345678905", 3.5],
+        ["Soap", "Dove", "4", "011111000000", 2.0],
+    ])
+    delta = diff_listings(yesterday(), today)
+    assert delta.counts() == {"added": 1, "changed": 1, "removed": 1}
+    assert delta.added["SKU"].tolist() == ["4"]
+    assert delta.changed["COST_PRICE"].tolist() == [3.5]
+    assert delta.previous["COST_PRICE"].tolist() == [3.0]
+    assert delta.removed["SKU"].tolist() == ["3"]
+    assert delta
+
+
+def test_diff_listings_compares_repeated_keys_as_a_whole():
+    previous = listings([["Tea", "Lipton", "2", "012345678905", 3.0], ["Tea", "Lipton", "2", "012345678905", 3.2]])
+    reordered = previous.iloc[::-1].reset_index(drop=True)
+    assert not diff_listings(previous, reordered)
+
+    dropped_one = previous.iloc[:1]
+    delta = diff_listings(previous, dropped_one)
+    assert delta.counts() == {"added": 0, "changed": 1, "removed": 0}
+    assert len(delta.previous) == 2
+
+
+def test_empty_catalog(tmp_path):
+    catalog = ListingCatalog(str(tmp_path / "catalog.sqlite3"))
+    assert catalog.saved_at() is None
+    assert catalog.known_rows("any") is None
+    delta = catalog.diff(yesterday())
+    assert delta.counts() == {"added": 3, "changed": 0, "removed": 0}
+
+
+def test_snapshot_round_trip(tmp_path, legend):
+    catalog = ListingCatalog(str(tmp_path / "catalog.sqlite3"))
+    data = process(supplier_frame([
+        ["Green Tea 8 oz", "Lipton", "1,234", "12345678905", "$4.00"],
+        ["Olive Oil 16 oz", "Kraft", 77, 36000291452, 10.5],
+    ]), legend, []).data
+    catalog.save(data, reference_version(legend))
+
+    loaded, hashes = catalog.load()
+    assert catalog.saved_at() is not None
+    assert loaded["SKU"].tolist() == data["SKU"].tolist()
+    assert loaded["SHIPPING COST"].tolist() == data["SHIPPING COST"].tolist()
+    assert len(hashes) == len(data)
+    assert not catalog.diff(data)
+
+
+def test_known_rows_are_reused_only_under_the_same_reference(tmp_path, legend):
+    catalog = ListingCatalog(str(tmp_path / "catalog.sqlite3"))
+    raw = supplier_frame([
+        ["Green Tea 8 oz", "Lipton", "1,234", "12345678905", "$4.00"],
+        ["Olive Oil 16 oz", "Kraft", 77, 36000291452, 10.5],
+    ])
+    fresh = process(raw, legend, []).data
+    reference = reference_version(legend)
+    catalog.save(fresh, reference)
+
+    assert catalog.known_rows("another legend") is None
+    known = catalog.known_rows(reference)
+    assert len(known) == 2
+
+    more = pd.concat([raw, supplier_frame([["Coffee 12 oz", "Folgers", 5, None, 6]])], ignore_index=True)
+    reused = process(more, legend, [], known_rows=known).data
+    pd.testing.assert_frame_equal(reused, process(more, legend, []).data)
+
+
+def test_delta_workbook_has_a_sheet_per_change_kind():
+    delta = diff_listings(yesterday(), yesterday().iloc[1:])
+    sheets = pd.read_excel(BytesIO(delta_workbook_bytes(delta)), sheet_name=None)
+    assert list(sheets) == ["Added", "Changed", "Previous Values", "Removed"]
+    assert sheets["Removed"]["SKU"].tolist() == [1]
+
+
+def test_reused_columns_stay_numeric_when_the_snapshot_has_no_values(tmp_path, legend):
+    catalog = ListingCatalog(str(tmp_path / "catalog.sqlite3"))
+    weightless = supplier_frame([["Paper Towels", "Kraft", 4, "030000010204", 3.0]])
+    reference = reference_version(legend)
+    catalog.save(process(weightless, legend, []).data, reference)
+
+    more = pd.concat([weightless, supplier_frame([["Coffee 12 oz", "Folgers", 5, None, 6]])], ignore_index=True)
+    reused = process(more, legend, [], known_rows=catalog.known_rows(reference)).data
+    for col in DERIVED_COLUMNS:
+        assert reused[col].dtype == "float64", col
+    style_page(reused).to_html()
@@ -0,0 +1,34 @@
+import os
+
+import pandas as pd
+
+from convertor.cli import main
+from convertor.export import CONSOLIDATED_SHEET
+
+
+def run_cli(tmp_path, input_dir, *args):
+    output = str(tmp_path / "out.xlsx")
+    code = main([str(input_dir), "-o", output, "--blocked-brands", str(tmp_path / "brands.sqlite3"), "--run-log", "", *args])
+    return code, output
+
+
+def test_converts_directory(tmp_path, vendor_files, capsys):
+    code, output = run_cli(tmp_path, os.path.dirname(vendor_files[0]))
+    assert code == 0
+    data = pd.read_excel(output, sheet_name=CONSOLIDATED_SHEET)
+    out = capsys.readouterr().out
+    assert "Total Listings in Input Files: 600" in out
+    assert f"Total Listings in Output File: {len(data)}" in out
+
+
+def test_empty_directory(tmp_path, capsys):
+    code, _ = run_cli(tmp_path, tmp_path)
+    assert code == 1
+    assert "No vendor files found" in capsys.readouterr().err
+
+
+def test_warns_when_no_brands_are_blocked(tmp_path, vendor_files, capsys, monkeypatch):
+    monkeypatch.setattr("convertor.cli.BLOCKED_BRANDS_PATH", str(tmp_path / "missing.xlsx"))
+    code, _ = run_cli(tmp_path, os.path.dirname(vendor_files[0]))
+    assert code == 0
+    assert "no blocked brands" in capsys.readouterr().err
@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+from convertor.codes import (
+    BAD_CHECK_DIGIT,
+    NOT_DIGITS,
+    PROBLEM_COLUMN,
+    TOO_LONG,
+    check_digits_valid,
+    clean_skus,
+    code_text,
+    invalid_codes,
+    normalize_upcs,
+    upc_problems,
+)
+from convertor.readers import CALAMINE, HAS_CALAMINE, OPENPYXL, read_frames
+from convertor.streaming import iter_source_chunks
+
+# Column B..I headers with stray spaces around the code columns
+PADDED_HEADER = ["Row", "Product Details", "Category", "Seller", "Brand", "Color", " Product ID ", "UPC Code  ", "Price"]
+
+
+def test_code_text_keeps_missing_values_missing():
+    values = pd.Series([" 00123 ", 456.0, None, np.nan, 7], dtype=object)
+    text = code_text(values)
+    assert text.iloc[:2].tolist() == ["00123", "456"]
+    assert text.iloc[2:4].isna().all()
+    assert text.iloc[4] == "7"
+
+
+def test_missing_sku_stays_missing():
+    skus = clean_skus(pd.Series(["1,234", None, 55], dtype=object))
+    assert skus.iloc[0] == "1234" and skus.iloc[2] == "55"
+    assert pd.isna(skus.iloc[1])
+
+
+def test_normalize_upcs():
+    upcs = normalize_upcs(pd.Series(["36000291452", "978-0-306-40615-7", None, np.nan, "ABC123", 12345678905.0], dtype=object))
+    assert upcs.tolist() == ["036000291452", "9780306406157", "000000000000", "000000000000", "ABC123", "012345678905"]
+
+
+@pytest.mark.parametrize("code, valid", [
+    ("036000291452", True),  # UPC-A
+    ("4006381333931", True),  # EAN-13
+    ("9780306406157", True),  # ISBN-13
+    ("10012345678902", True),  # GTIN-14
+    ("036000291453", False),
+    ("9780306406158", False),
+])
+def test_check_digits(code, valid):
+    assert check_digits_valid(pd.Series([code])).tolist() == [valid]
+
+
+def test_upc_problems():
+    upcs = pd.Series(["036000291452", "036000291453", "ABC123", "123456789012345", "000000000000", ""])
+    assert upc_problems(upcs).tolist() == ["", BAD_CHECK_DIGIT, NOT_DIGITS, TOO_LONG, "", ""]
+
+
+def test_invalid_codes_report():
+    df = pd.DataFrame({
+        "TITLE": ["Tea", "Coffee"],
+        "BRAND": ["Lipton", "Folgers"],
+        "SKU": ["1", "2"],
+        "UPC/ISBN": ["036000291452", "036000291453"],
+        "COST_PRICE": [1.0, 2.0],
+    })
+    report = invalid_codes(df)
+    assert list(report.columns) == ["TITLE", "BRAND", "SKU", "UPC/ISBN", PROBLEM_COLUMN]
+    assert report["SKU"].tolist() == ["2"]
+    assert report[PROBLEM_COLUMN].tolist() == [BAD_CHECK_DIGIT]
+    assert invalid_codes(df.drop(columns="UPC/ISBN")).empty
+
+
+@pytest.fixture
+def padded_header_workbook(tmp_path):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(PADDED_HEADER)
+    sheet.append([1, "Tea 8 oz", "", "", "Lipton", "", "00123", "012345678905", 4.0])
+    sheet.append([2, "Coffee 12 oz", "", "", "Folgers", "", None, "0036000291452", 5.0])
+    path = tmp_path / "padded.xlsx"
+    workbook.save(path)
+    return path
+
+
+def codes_of(frame):
+    return frame.iloc[:, 2].tolist()[:1] + frame.iloc[:, 3].tolist()
+
+
+@pytest.mark.parametrize("engine", [OPENPYXL, CALAMINE])
+def test_codes_read_as_text_despite_header_spaces(padded_header_workbook, engine):
+    if engine == CALAMINE and not HAS_CALAMINE:
+        pytest.skip("python-calamine is not installed")
+    (frame,) = read_frames(str(padded_header_workbook), engine=engine)
+    assert codes_of(frame) == ["00123", "012345678905", "0036000291452"]
+
+
+def test_csv_and_streamed_codes_read_as_text(tmp_path, padded_header_workbook):
+    csv_path = tmp_path / "padded.csv"
+    pd.read_excel(padded_header_workbook, dtype=str).to_csv(csv_path, index=False)
+    (frame,) = read_frames(str(csv_path))
+    assert codes_of(frame) == ["00123", "012345678905", "0036000291452"]
+
+    (chunk,) = iter_source_chunks(str(padded_header_workbook))
+    assert codes_of(chunk) == ["00123", "012345678905", "0036000291452"]
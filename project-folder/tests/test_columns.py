@@ -0,0 +1,81 @@
+import pandas as pd
+import pytest
+
+from convertor.columns import (
+    CONSTANT_COLUMNS,
+    HAS_PYARROW,
+    compact_dtypes,
+    constant_column,
+    source_hashes,
+    with_constant_columns,
+)
+
+
+def listing_frame():
+    return pd.DataFrame({
+        "TITLE": ["Coffee 12 oz", "Tea 4 oz", "Oats 18 oz"],
+        "BRAND": ["Folgers", "Lipton", "Folgers"],
+        "SKU": ["1001", "1002", "1003"],
+        "UPC/ISBN": ["036000291452", "041000001234", "030000010204"],
+        "COST_PRICE": [5.5, 3.25, 4.0],
+        "ITEM WEIGHT (pounds)": [0.75, 0.25, None],
+        "SHIPPING COST": [4.1, 3.9, None],
+        "ROW": [1, 2, 3],
+    })
+
+
+def test_compact_dtypes_keeps_values():
+    df = listing_frame()
+    compact = compact_dtypes(df.copy())
+    assert isinstance(compact["BRAND"].dtype, pd.CategoricalDtype)
+    assert compact["ROW"].dtype == "int8"
+    assert compact["COST_PRICE"].dtype == "float64"
+    if HAS_PYARROW:
+        assert isinstance(compact["TITLE"].dtype, pd.StringDtype)
+    for col in df.columns:
+        assert compact[col].astype(object).where(compact[col].notna(), None).tolist() == \
+            df[col].astype(object).where(df[col].notna(), None).tolist()
+
+
+def test_constant_columns_go_before_the_derived_columns():
+    df = with_constant_columns(listing_frame())
+    columns = list(df.columns)
+    start = columns.index("ITEM WEIGHT (pounds)") - len(CONSTANT_COLUMNS)
+    assert columns[start:start + len(CONSTANT_COLUMNS)] == list(CONSTANT_COLUMNS)
+    for name, value in CONSTANT_COLUMNS.items():
+        assert (df[name] == value).all()
+    assert "HANDLING COST" not in listing_frame().columns
+
+
+def test_constant_columns_append_without_derived_columns():
+    df = with_constant_columns(listing_frame()[["TITLE", "BRAND"]])
+    assert list(df.columns) == ["TITLE", "BRAND", *CONSTANT_COLUMNS]
+
+
+def test_present_constant_columns_are_left_alone():
+    df = with_constant_columns(listing_frame())
+    assert with_constant_columns(df) is df
+
+
+def test_string_constants_are_categorical():
+    column = constant_column("WALMART", 4)
+    assert isinstance(column.dtype, pd.CategoricalDtype)
+    assert column.tolist() == ["WALMART"] * 4
+
+
+def test_source_hashes_ignore_storage_and_derived_columns():
+    df = listing_frame()
+    hashes = source_hashes(df)
+    assert hashes.dtype == "int64"
+    pd.testing.assert_series_equal(source_hashes(compact_dtypes(df.copy())), hashes)
+
+    derived = df.assign(**{"SHIPPING COST": [0.0, 0.0, 0.0]})
+    pd.testing.assert_series_equal(source_hashes(derived), hashes)
+
+
+@pytest.mark.parametrize("column, value", [("SKU", "9999"), ("COST_PRICE", 5.75), ("BRAND", "Maxwell")])
+def test_source_hashes_change_with_source_fields(column, value):
+    df = listing_frame()
+    changed = df.copy()
+    changed.loc[0, column] = value
+    assert (source_hashes(changed) != source_hashes(df)).tolist() == [True, False, False]
@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from convertor.dedup import KEEP_FIRST, KEEP_LOWEST_COST, DedupIndex, deduplicate
+
+
+def listings(rows):
+    return pd.DataFrame(rows, columns=["TITLE", "SKU", "UPC/ISBN", "COST_PRICE"])
+
+
+def sample():
+    return listings([
+        ["Tea", "1", "012345678905", 4.0],
+        ["Tea (new title)", "1", "012345678905", 3.0],
+        ["Coffee", "2", "036000291452", 5.0],
+        ["Coffee", "2", "036000291452", 5.0],
+        ["No codes A", "nan", "000000000000", 1.0],
+        ["No codes B", "nan", "000000000000", 1.0],
+        ["No codes A", "nan", "000000000000", 1.0],
+    ])
+
+
+def test_keep_first_by_key():
+    data, report = deduplicate(sample())
+    assert data["TITLE"].tolist() == ["Tea", "Coffee", "No codes A", "No codes B"]
+    assert report.removed == 3
+
+
+def test_keep_lowest_cost_keeps_original_order():
+    data, report = deduplicate(sample(), keep=KEEP_LOWEST_COST)
+    assert data["TITLE"].tolist() == ["Tea (new title)", "Coffee", "No codes A", "No codes B"]
+    assert report.keep == KEEP_LOWEST_COST
+
+
+def test_exact_rows_without_keys():
+    data, report = deduplicate(sample(), keys=None)
+    assert data["TITLE"].tolist() == ["Tea", "Tea (new title)", "Coffee", "No codes A", "No codes B"]
+    assert report.keys is None
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError, match="Unknown keep policy"):
+        deduplicate(sample(), keep="newest")
+    with pytest.raises(ValueError, match="Unknown keep policy"):
+        DedupIndex(keep="newest")
+
+
+def test_counts_per_source_and_across_files():
+    sources = ["a.xlsx", "b.xlsx", "a.xlsx", "b.xlsx", "a.xlsx", "a.xlsx", "b.xlsx"]
+    _, report = deduplicate(sample(), sources=sources)
+    assert report.by_source == {"b.xlsx": 3}
+    assert report.cross_file == 3
+
+    _, report = deduplicate(sample(), keep=KEEP_LOWEST_COST, sources=sources)
+    # Tea from a.xlsx loses to the cheaper row of b.xlsx
+    assert report.by_source == {"a.xlsx": 1, "b.xlsx": 2}
+    assert report.cross_file == 3
+    assert report.frame()["Source File"].tolist() == ["b.xlsx", "a.xlsx"]
+
+
+def random_listings(n, seed):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "TITLE": [f"Item {i}" for i in range(n)],
+        "SKU": rng.integers(0, n // 3, n).astype(str),
+        "UPC/ISBN": rng.integers(0, 4, n).astype(str),
+        "COST_PRICE": rng.integers(1, 6, n).astype(float),
+    })
+
+
+def chunked(df, size, files=3):
+    """
+    (source, chunk) pairs of df split into chunks spread over several files.
+    """
+    per_file = -(-len(df) // files)
+    for start in range(0, len(df), size):
+        yield f"file{start // per_file}.xlsx", df.iloc[start:start + size]
+
+
+@pytest.mark.parametrize("keep", [KEEP_FIRST, KEEP_LOWEST_COST])
+def test_index_matches_deduplicate(keep):
+    df = random_listings(3000, seed=5)
+    index = DedupIndex(keep=keep)
+    if keep == KEEP_LOWEST_COST:
+        for source, chunk in chunked(df, 250):
+            index.observe(chunk, source)
+    masks = [index.filter(chunk, source) for source, chunk in chunked(df, 250)]
+
+    sources = [source for source, chunk in chunked(df, 250) for _ in range(len(chunk))]
+    expected, report = deduplicate(df, keep=keep, sources=sources)
+    pd.testing.assert_frame_equal(df[np.concatenate(masks)], expected)
+    assert len(index) == len(expected)
+    assert index.report.removed == report.removed
+    assert index.report.cross_file == report.cross_file
+    assert index.report.by_source == report.by_source
+
+
+def test_lowest_cost_needs_observe():
+    with pytest.raises(ValueError, match="observe"):
+        DedupIndex(keep=KEEP_LOWEST_COST).filter(sample())
+
+
+def test_rollback_forgets_a_failed_file():
+    index = DedupIndex()
+    first = sample().iloc[:3]
+    index.filter(first, "a.xlsx")
+    state = index.checkpoint()
+    index.filter(sample(), "b.xlsx")
+    index.rollback(state)
+
+    assert len(index) == 2
+    assert index.report.removed == 1 and index.report.by_source == {"a.xlsx": 1}
+    retry = index.filter(sample().iloc[2:], "c.xlsx")
+    # Coffee was kept from a.xlsx; the rows without codes are new again
+    assert retry.tolist() == [False, False, True, True, False]
@@ -0,0 +1,94 @@
+from io import BytesIO
+
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+from convertor.export import (
+    CONSOLIDATED_SHEET,
+    SHIPPING_LEGEND_SHEET,
+    StreamingWorkbookWriter,
+    export_bytes,
+    frame_to_xlsx_bytes,
+)
+from convertor.pipeline import process
+
+from conftest import supplier_frame
+from test_pipeline import OUTPUT_COLUMNS
+
+
+@pytest.fixture(scope="module")
+def converted(legend):
+    raw = supplier_frame([
+        ["Green Tea 8 oz", "Lipton", "1234", "12345678905", 4.0],
+        ["Paper Towels", "Dove", "55", None, 3.0],
+        ["Olive Oil 16 oz", "Kraft", "77", "036000291452", 10.5],
+    ])
+    return process(raw, legend, []).data
+
+
+def test_workbook_layout(converted, legend):
+    workbook = load_workbook(BytesIO(export_bytes(converted, "xlsx", legend.frame)))
+    assert workbook.sheetnames == [CONSOLIDATED_SHEET, SHIPPING_LEGEND_SHEET]
+
+    sheet = workbook[CONSOLIDATED_SHEET]
+    rows = list(sheet.values)
+    assert list(rows[0]) == OUTPUT_COLUMNS
+    assert [row[0] for row in rows[1:]] == ["Green Tea 8 oz", "Olive Oil 16 oz", "Paper Towels"]
+    assert rows[1][5:8] == (0.75, 1, "WALMART")
+    assert rows[1][9] == 6.0
+
+    legend_rows = list(workbook[SHIPPING_LEGEND_SHEET].values)
+    assert list(legend_rows[0]) == list(legend.frame.columns)
+    assert len(legend_rows) == len(legend.frame) + 1
+
+
+def test_missing_weight_rows_get_formulas_and_highlight(converted, legend):
+    sheet = load_workbook(BytesIO(export_bytes(converted, "xlsx", legend.frame)))[CONSOLIDATED_SHEET]
+    missing = [cell.value for cell in sheet[4]]
+    assert missing[8] is None
+    assert missing[9].startswith("=IF(I4") and "ShippingLegend!A:C" in missing[9]
+    assert missing[10].startswith("=IF(AND(E4") and "*1.35" in missing[10]
+    assert missing[11] == "=K4"
+    assert [cell.value for cell in sheet[2]][9] == 6.0
+
+    rules = list(sheet.conditional_formatting)
+    assert len(rules) == 1
+    assert str(rules[0].sqref) == "A2:M4"
+    assert rules[0].rules[0].formula == ["ISBLANK($I2)"]
+
+
+def test_streaming_writer_appends_chunks(converted):
+    buffer = BytesIO()
+    writer = StreamingWorkbookWriter(buffer, highlight_missing_weights=False)
+    for start in range(len(converted)):
+        writer.append(converted.iloc[start:start + 1])
+    writer.close()
+    assert writer.rows_written == 3
+    sheet = load_workbook(buffer)[CONSOLIDATED_SHEET]
+    assert sheet.max_row == 4
+    assert not list(sheet.conditional_formatting)
+
+
+def test_empty_table_writes_header_only():
+    sheet = load_workbook(BytesIO(export_bytes(pd.DataFrame(columns=["TITLE"]))))[CONSOLIDATED_SHEET]
+    assert list(sheet.values) == [("TITLE", "HANDLING COST", "QUANTITY", "ITEM LOCATION")]
+
+
+@pytest.mark.parametrize("export_format, read", [("csv", pd.read_csv), ("parquet", pd.read_parquet)])
+def test_flat_exports(converted, export_format, read):
+    exported = read(BytesIO(export_bytes(converted, export_format)), **({"dtype": {"SKU": str, "UPC/ISBN": str}} if export_format == "csv" else {}))
+    assert list(exported.columns) == OUTPUT_COLUMNS
+    assert exported["UPC/ISBN"].tolist() == ["012345678905", "036000291452", "000000000000"]
+    assert exported["ITEM LOCATION"].eq("WALMART").all()
+
+
+def test_unknown_format(converted):
+    with pytest.raises(ValueError, match="Unsupported export format"):
+        export_bytes(converted, "ods")
+
+
+def test_frame_to_xlsx_bytes():
+    sheet = load_workbook(BytesIO(frame_to_xlsx_bytes(pd.DataFrame({"A": [None, 2]}), "Data"))).active
+    assert sheet.title == "Data"
+    assert list(sheet.values) == [("A",), (None,), (2,)]
@@ -0,0 +1,64 @@
+import os
+from io import BytesIO
+
+import pandas as pd
+
+import convertor.ingest as ingest_module
+from convertor.ingest import ingest, source_labels
+
+
+def test_reads_every_sheet_once_in_order(vendor_files):
+    frames, errors = ingest(vendor_files, max_workers=1)
+    assert errors == []
+    assert len(frames) == 4
+    assert sum(len(frame) for frame in frames) == 600
+    assert list(frames[0].columns) == ["Product Details", "Brand", "Product ID", "UPC Code", "Price"]
+    assert [frame.attrs["source"] for frame in frames] == [os.path.basename(path) for path in vendor_files for _ in "ab"]
+
+
+def test_process_pool_matches_in_process(vendor_files):
+    serial, _ = ingest(vendor_files, max_workers=1)
+    pooled, _ = ingest(vendor_files, max_workers=2)
+    assert len(serial) == len(pooled)
+    for a, b in zip(serial, pooled):
+        pd.testing.assert_frame_equal(a, b)
+        assert a.attrs == b.attrs
+
+
+def test_uploaded_file_objects(vendor_files):
+    with open(vendor_files[0], "rb") as f:
+        upload = BytesIO(f.read())
+    upload.name = "upload.xlsx"
+    upload.seek(100)
+    frames, errors = ingest([upload], max_workers=1)
+    assert errors == []
+    assert [frame.attrs["source"] for frame in frames] == ["upload.xlsx", "upload.xlsx"]
+
+
+def test_bad_file_does_not_stop_the_others(tmp_path, vendor_files):
+    bad = tmp_path / "bad.xlsx"
+    bad.write_bytes(b"PK\x03\x04 truncated")
+    frames, errors = ingest([vendor_files[0], str(bad), vendor_files[1]], max_workers=2)
+    assert len(frames) == 4
+    assert len(errors) == 1 and errors[0].startswith("Error reading file bad.xlsx")
+
+
+def test_source_labels(vendor_files):
+    frames, _ = ingest(vendor_files, max_workers=1)
+    labels = source_labels(frames)
+    assert len(labels) == 600
+    assert list(labels.categories) == [os.path.basename(path) for path in vendor_files]
+    assert (labels[: len(frames[0])] == labels.categories[0]).all()
+
+
+def test_pool_spawns_its_workers(vendor_files, monkeypatch):
+    contexts = []
+    executor = ingest_module.ProcessPoolExecutor
+
+    def recording(*args, **kwargs):
+        contexts.append(kwargs.get("mp_context"))
+        return executor(*args, **kwargs)
+
+    monkeypatch.setattr(ingest_module, "ProcessPoolExecutor", recording)
+    ingest(vendor_files, max_workers=2)
+    assert [context.get_start_method() for context in contexts] == ["spawn"]
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from convertor.instrument import RunInstrument, StageTiming, stage_frame
+
+
+def test_stages_record_rss_growth_by_default():
+    instrument = RunInstrument()
+    with instrument.stage("Allocate", 10):
+        block = np.ones(64 * 2**20 // 8)
+    with instrument.stage("Allocate", 10):
+        pass
+    instrument.finish()
+    del block
+
+    (record,) = instrument.stages
+    assert record.calls == 2 and record.rows_in == 20
+    assert record.peak_mb is None
+    assert record.rss_growth_mb >= 0
+    assert "Peak RSS growth (MB)" in stage_frame(instrument.stages).columns
+
+
+def test_trace_memory_records_heap_peak():
+    instrument = RunInstrument(trace_memory=True)
+    with instrument.stage("Allocate"):
+        data = [str(i) for i in range(100_000)]
+    instrument.finish()
+    del data
+    assert instrument.stages[0].peak_mb > 1
+
+
+def test_merge_sums_rss_growth():
+    record = StageTiming("Export", rss_growth_mb=1.5)
+    record.merge(StageTiming("Export", rss_growth_mb=2.0, calls=1))
+    record.merge(StageTiming("Export", calls=1))
+    assert record.rss_growth_mb == 3.5
+
+
+def test_only_one_run_profiles_at_a_time():
+    first = RunInstrument(trace_memory=True, profile=True)
+    with pytest.warns(UserWarning, match="Another run"):
+        second = RunInstrument(profile=True)
+    assert second.contended and not second.trace_memory
+    assert second.profile_text() is None
+
+    second.finish()
+    first.finish()
+    third = RunInstrument(profile=True)
+    assert not third.contended
+    assert third.profile_text() is not None
+    third.finish()
+
+
+def test_unprofiled_runs_are_never_contended():
+    profiling = RunInstrument(profile=True)
+    assert not RunInstrument().contended
+    profiling.finish()
@@ -0,0 +1,135 @@
+import os
+import time
+
+import pytest
+
+from convertor.brands import BlockedBrandMatcher
+from convertor.jobs import (
+    CANCELLED,
+    DEFAULT_OPTIONS,
+    DONE,
+    FAILED,
+    QUEUED,
+    RUNNING,
+    JobRunner,
+    JobStore,
+    job_frame,
+    read_result,
+    run_job,
+)
+
+# Seconds to wait for a job in the process pool
+JOB_TIMEOUT = 120
+
+
+@pytest.fixture(autouse=True)
+def no_run_log(monkeypatch):
+    monkeypatch.setattr("convertor.jobs.RUN_LOG_PATH", "")
+    monkeypatch.setenv("CONVERTOR_RUN_LOG", "")
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.sqlite3"))
+
+
+def blocked():
+    return BlockedBrandMatcher.from_names(["Stanley"])
+
+
+def test_job_lifecycle(store):
+    first = store.create(["a.xlsx"], DEFAULT_OPTIONS)
+    second = store.create(["b.xlsx", "c.xlsx"], DEFAULT_OPTIONS)
+    assert [job.id for job in store.list()] == [second, first]
+    assert store.get(first).status == QUEUED
+
+    assert store.start(first)
+    assert not store.start(first)
+    assert not store.progress(first, "Read files", [])
+    assert store.get(first).status == RUNNING and store.get(first).stage == "Read files"
+
+    store.finish(first, DONE, metrics={"total_input_listings": 3}, errors=["warning"])
+    job = store.get(first)
+    assert job.finished and job.stage is None
+    assert job.metrics == {"total_input_listings": 3} and job.errors == ["warning"]
+    assert job_frame(store.list())["Status"].tolist() == [QUEUED, DONE]
+
+
+def test_cancelled_queued_job_never_starts(store):
+    job_id = store.create(["a.xlsx"], DEFAULT_OPTIONS)
+    store.request_cancel(job_id)
+    assert store.get(job_id).status == CANCELLED
+    assert not store.start(job_id)
+
+
+def test_cancel_request_reaches_a_running_job(store):
+    job_id = store.create(["a.xlsx"], DEFAULT_OPTIONS)
+    store.start(job_id)
+    store.request_cancel(job_id)
+    assert store.get(job_id).status == RUNNING
+    assert store.progress(job_id, "Read files", [])
+
+
+def test_orphaned_jobs_fail(store):
+    orphan = store.create(["a.xlsx"], DEFAULT_OPTIONS)
+    alive = store.create(["b.xlsx"], DEFAULT_OPTIONS, runner_pid=os.getpid())
+    assert store.interrupt_orphans() == 1
+    assert store.get(orphan).status == FAILED
+    assert store.get(alive).status == QUEUED
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_run_job_writes_its_result(tmp_path, store, legend, vendor_files, stream):
+    options = {**DEFAULT_OPTIONS, "stream": stream}
+    job_id = store.create(vendor_files, options)
+    run_job(store.path, job_id, vendor_files, str(tmp_path), legend, blocked(), options)
+
+    job = store.get(job_id)
+    assert job.status == DONE, job.errors
+    assert job.metrics["total_input_listings"] == 600
+    assert os.path.exists(job.result_path) and os.path.exists(job.removed_path)
+    assert any(record.name == "Read files" for record in job.stages)
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_run_job_stops_on_cancel(tmp_path, store, legend, vendor_files, monkeypatch, stream):
+    start = JobStore.start
+
+    def start_then_cancel(self, job_id):
+        started = start(self, job_id)
+        self.request_cancel(job_id)
+        return started
+
+    monkeypatch.setattr(JobStore, "start", start_then_cancel)
+    options = {**DEFAULT_OPTIONS, "stream": stream}
+    job_id = store.create(vendor_files, options)
+    run_job(store.path, job_id, vendor_files, str(tmp_path), legend, blocked(), options)
+
+    job = store.get(job_id)
+    assert job.status == CANCELLED
+    assert job.result_path is None
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".xlsx")]
+
+
+def wait_for(store, job_id):
+    deadline = time.monotonic() + JOB_TIMEOUT
+    while not store.get(job_id).finished:
+        assert time.monotonic() < deadline, "job did not finish"
+        time.sleep(0.1)
+    return store.get(job_id)
+
+
+def test_runner_converts_in_the_pool(tmp_path, legend, vendor_files):
+    runner = JobRunner(str(tmp_path / "jobs.sqlite3"), str(tmp_path / "jobs"), max_workers=1)
+    try:
+        job_id = runner.submit(vendor_files, legend, blocked(), {"export_format": "csv"})
+        job = wait_for(runner.store, job_id)
+        assert job.status == DONE, job.errors
+        assert job.files == [os.path.basename(path) for path in vendor_files]
+        assert read_result(job.result_path).startswith(b"TITLE,")
+
+        assert runner.remove(job_id)
+        assert runner.store.get(job_id) is None
+        assert not os.path.exists(runner.job_dir(job_id))
+    finally:
+        runner.shutdown()
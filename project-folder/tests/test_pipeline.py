@@ -0,0 +1,84 @@
+import numpy as np
+
+from convertor.columns import with_constant_columns
+from convertor.pipeline import process, run_pipeline
+
+from conftest import supplier_frame
+
+OUTPUT_COLUMNS = [
+    "TITLE", "BRAND", "SKU", "UPC/ISBN", "COST_PRICE", "HANDLING COST", "QUANTITY", "ITEM LOCATION",
+    "ITEM WEIGHT (pounds)", "SHIPPING COST", "RETAIL PRICE", "MIN PRICE", "MAX PRICE",
+]
+
+
+def sample_rows():
+    return supplier_frame([
+        ["Paper Towels (W+)", "Dove", 55, None, 3],
+        ["Green Tea 8 oz (SP)", "Lipton", "1,234", "12345678905", "$4.00"],
+        ["Green Tea 8 oz (SP)", "Lipton", "1,234", "12345678905", "$4.00"],
+        ["Juice 10 fl oz 2 pack", "Stanley", "9", "036000291452", 2.5],
+        ["Olive Oil 16 oz (P)", "Kraft", 77.0, 36000291452.0, "$1,020.10"],
+    ])
+
+
+def test_process_converts_supplier_rows(legend):
+    result = process(sample_rows(), legend, ["  STANLEY "])
+    data = with_constant_columns(result.data)
+
+    assert list(data.columns) == OUTPUT_COLUMNS
+    # Rows without a weight go last; duplicates and blocked brands are gone
+    assert data["TITLE"].tolist() == ["Green Tea 8 oz", "Olive Oil 16 oz", "Paper Towels"]
+    assert data["SKU"].tolist() == ["1234", "77", "55"]
+    assert data["UPC/ISBN"].tolist() == ["012345678905", "036000291452", "000000000000"]
+    assert data["COST_PRICE"].tolist() == [4.0, 1020.1, 3.0]
+    assert data["ITEM WEIGHT (pounds)"].tolist()[:2] == [0.88, 1.38]
+    assert np.isnan(data["ITEM WEIGHT (pounds)"].iloc[2])
+    assert data["SHIPPING COST"].tolist()[:2] == [6.0, 7.0]
+    assert data["RETAIL PRICE"].tolist()[:2] == [round((4.0 + 6.0 + 0.75) * 1.35, 2), round((1020.1 + 7.0 + 0.75) * 1.35, 2)]
+    assert (data["MIN PRICE"].iloc[:2] == data["RETAIL PRICE"].iloc[:2]).all()
+    assert data["MAX PRICE"].iloc[0] == round(data["RETAIL PRICE"].iloc[0] * 1.35, 2)
+    assert data["QUANTITY"].eq(1).all() and data["ITEM LOCATION"].eq("WALMART").all()
+
+    assert result.removed_rows["BRAND"].tolist() == ["Stanley"]
+    assert result.metrics.total_input_listings == 5
+    assert result.metrics.total_output_listings == 3
+    assert result.metrics.duplicates_removed == 1
+    assert result.metrics.blocked_removed == 1
+    assert result.metrics.listings_no_weights == 1
+    assert result.errors == []
+
+
+def test_process_reports_missing_price_column(legend):
+    raw = sample_rows().drop(columns="Price")
+    result = process(raw, legend, [])
+    assert any("COST_PRICE" in error for error in result.errors)
+    assert "RETAIL PRICE" not in result.data.columns
+
+
+def test_process_strips_header_whitespace(legend):
+    raw = sample_rows().rename(columns={"Brand": " Brand ", "Price": "Price  "})
+    result = process(raw, legend, [])
+    assert {"BRAND", "COST_PRICE"} <= set(result.data.columns)
+
+
+def test_process_records_stages(legend):
+    result = process(sample_rows(), legend, [])
+    names = [stage.name for stage in result.stages]
+    assert names[0] == "Rename columns"
+    assert {"Extract weights", "Shipping lookup", "Remove duplicates", "Filter blocked brands"} <= set(names)
+
+
+def test_run_pipeline_reads_files(vendor_files, legend):
+    result = run_pipeline(vendor_files, legend.frame, ["Stanley"])
+    assert result.metrics.total_input_listings == 600
+    assert result.metrics.total_output_listings == len(result.data) > 0
+    assert not result.data["BRAND"].eq("Stanley").any()
+    assert result.errors == []
+
+
+def test_run_pipeline_reports_unreadable_files(tmp_path, legend):
+    bad = tmp_path / "broken.xlsx"
+    bad.write_bytes(b"not a workbook")
+    result = run_pipeline([str(bad)], legend, [])
+    assert result.data.empty
+    assert len(result.errors) == 1 and "broken.xlsx" in result.errors[0]
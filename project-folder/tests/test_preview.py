@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+from convertor.preview import (
+    MISSING_WEIGHT_STYLE,
+    column_stats,
+    get_page,
+    missing_weight_rows,
+    page_count,
+    style_page,
+)
+
+
+def weights_frame(n):
+    weights = np.where(np.arange(n) % 3 == 0, np.nan, np.arange(n) / 10)
+    return pd.DataFrame({"TITLE": [f"Item {i}" for i in range(n)], "ITEM WEIGHT (pounds)": weights})
+
+
+def test_page_count():
+    assert page_count(0, 50) == 1
+    assert page_count(50, 50) == 1
+    assert page_count(51, 50) == 2
+
+
+def test_get_page_clamps_out_of_range_pages():
+    df = weights_frame(120)
+    assert get_page(df, 1, 50)["TITLE"].iloc[0] == "Item 0"
+    assert len(get_page(df, 3, 50)) == 20
+    assert get_page(df, 99, 50).index[0] == 100
+    assert get_page(df, 0, 50).index[0] == 0
+
+
+def test_missing_weight_rows():
+    df = weights_frame(10)
+    assert list(missing_weight_rows(df).index) == [0, 3, 6, 9]
+    assert missing_weight_rows(df[["TITLE"]]).empty
+
+
+def test_style_page_highlights_only_missing_rows():
+    page = get_page(weights_frame(100), 2, 10)
+    styles = style_page(page)._compute().ctx
+    highlighted = {row for (row, _), css in styles.items() if ("background-color", "#FFCCCC") in css}
+    assert highlighted == {i for i, weight in enumerate(page["ITEM WEIGHT (pounds)"]) if np.isnan(weight)}
+    assert MISSING_WEIGHT_STYLE.startswith("background-color")
+
+
+def test_style_page_formats_numbers():
+    html = style_page(pd.DataFrame({"COST_PRICE": [1.5], "ITEM WEIGHT (pounds)": [0.875]})).to_html()
+    assert "1.50" in html and "0.88" in html
+
+
+def test_column_stats():
+    stats = column_stats(weights_frame(9))
+    assert stats.loc["ITEM WEIGHT (pounds)", "missing"] == 3
+    assert stats.loc["TITLE", "distinct"] == 9
+    assert stats.loc["ITEM WEIGHT (pounds)", "max"] == 0.8
+    assert pd.isna(stats.loc["TITLE", "min"])
@@ -0,0 +1,130 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from convertor.export import write_sheets
+from convertor.pipeline import process
+from convertor.profiles import (
+    OVERRIDES_SHEET,
+    PROFILES_SHEET,
+    PricingProfile,
+    load_profiles,
+    parse_profiles,
+    price_profiles,
+    profile_file_name,
+    profile_sheet_name,
+)
+
+from conftest import supplier_frame
+from test_cli import run_cli
+
+PRICE_COLUMNS = ["ITEM WEIGHT (pounds)", "SHIPPING COST", "RETAIL PRICE", "MIN PRICE", "MAX PRICE"]
+
+
+@pytest.fixture
+def converted(legend):
+    return process(supplier_frame([
+        ["Green Tea 8 oz", "Lipton", "1", "12345678905", 4.0],
+        ["Olive Oil 16 oz", "Kraft", "2", "036000291452", 10.0],
+        ["Body Wash 80 oz", "Dove", "3", "041000001234", 8.0],
+        ["Paper Towels", "Kraft", "4", "030000010204", 3.0],
+    ]), legend, []).data
+
+
+def test_default_profile_reproduces_the_standard_columns(converted, legend):
+    priced = price_profiles(converted, [PricingProfile("Walmart")], legend)["Walmart"]
+    pd.testing.assert_frame_equal(priced[PRICE_COLUMNS], converted[PRICE_COLUMNS], check_dtype=False)
+
+
+def test_overrides_by_brand_and_weight_tier_last_wins(converted, legend):
+    (profile,) = parse_profiles([{
+        "name": "Amazon",
+        "retail_markup": 1.5,
+        "overrides": [
+            {"brands": ["  kraft "], "retail_markup": 2.0},
+            {"min_weight": 4, "retail_markup": 3.0},
+            {"max_weight": 1, "max_price_factor": 2.0},
+        ],
+    }])
+    priced = price_profiles(converted, [profile], legend)["Amazon"].set_index("SKU")
+    base = converted.set_index("SKU")
+    # Cost plus shipping plus the 0.75 handling cost, times the markup that applies
+    expected_markup = {"1": 1.5, "2": 2.0, "3": 3.0, "4": 2.0}
+    for sku, markup in expected_markup.items():
+        total = float(base.loc[sku, "COST_PRICE"] + base.loc[sku, "SHIPPING COST"] + 0.75)
+        if np.isnan(total):
+            assert np.isnan(priced.loc[sku, "RETAIL PRICE"])
+        else:
+            assert priced.loc[sku, "RETAIL PRICE"] == round(total * markup, 2)
+    assert priced.loc["1", "MAX PRICE"] == round(float(priced.loc["1", "RETAIL PRICE"]) * 2.0, 2)
+    assert priced.loc["2", "MAX PRICE"] == round(float(priced.loc["2", "RETAIL PRICE"]) * 1.35, 2)
+
+
+def test_handling_cost_override_becomes_a_column(converted, legend):
+    (profile,) = parse_profiles([{"name": "eBay", "overrides": [{"brand": "Dove", "handling_cost": 2}]}])
+    assert "HANDLING COST" not in profile.constants()
+    priced = price_profiles(converted, [profile], legend)["eBay"]
+    assert priced.set_index("SKU")["HANDLING COST"].to_dict() == {"1": 0.75, "2": 0.75, "3": 2.0, "4": 0.75}
+
+
+def test_padding_changes_the_weights(converted, legend):
+    (profile,) = parse_profiles([{"name": "Heavy", "ounce_padding": 20}])
+    priced = price_profiles(converted, [profile], legend)["Heavy"]
+    weights = priced["ITEM WEIGHT (pounds)"].to_numpy()
+    standard = converted["ITEM WEIGHT (pounds)"].to_numpy()
+    assert (weights[:3] > standard[:3]).all()
+    assert np.isnan(weights[3])
+
+
+@pytest.mark.parametrize("data, message", [
+    ([{"retail_markup": 1.2}], "needs a name"),
+    ([{"name": "A", "markup": 1.2}], "unknown settings"),
+    ([{"name": "A"}, {"name": "a"}], "unique"),
+    ([{"name": "A", "retail_markup": "high"}], "must be a number"),
+    ([{"name": "A", "overrides": [{"brand": "Dove"}]}], "must set one of"),
+    ([{"name": "A", "overrides": [{"brand": "Dove", "color": "red", "retail_markup": 2}]}], "unknown override keys"),
+    ([], "non-empty list"),
+])
+def test_invalid_profiles(data, message):
+    with pytest.raises(ValueError, match=message):
+        parse_profiles(data)
+
+
+def test_load_json_and_xlsx(tmp_path):
+    json_path = tmp_path / "profiles.json"
+    json_path.write_text(json.dumps({"profiles": [{"name": "Amazon", "overrides": [{"brand": "Dove", "retail_markup": 2}]}]}))
+    xlsx_path = tmp_path / "profiles.xlsx"
+    write_sheets({
+        PROFILES_SHEET: pd.DataFrame({"name": ["Amazon"]}),
+        OVERRIDES_SHEET: pd.DataFrame({"profile": ["Amazon"], "brand": ["Dove"], "retail_markup": [2]}),
+    }, str(xlsx_path))
+
+    from_json, from_xlsx = load_profiles(str(json_path)), load_profiles(str(xlsx_path))
+    assert from_json == from_xlsx
+    assert from_json[0].overrides[0].brands == ["Dove"]
+
+
+def test_load_yaml(tmp_path):
+    pytest.importorskip("yaml")
+    path = tmp_path / "profiles.yaml"
+    path.write_text("profiles:\n  - name: Amazon\n    item_location: AMAZON\n")
+    assert load_profiles(str(path))[0].item_location == "AMAZON"
+
+
+def test_file_and_sheet_names():
+    assert profile_file_name("out/Data", "Amazon US/CA", "csv") == "out/Data_Amazon_US_CA.csv"
+    assert profile_sheet_name("A/B: " + "x" * 40) == ("A_B_ " + "x" * 40)[:31]
+
+
+def test_cli_names_profile_exports_after_the_format(tmp_path, vendor_files):
+    profiles = tmp_path / "profiles.json"
+    profiles.write_text(json.dumps({"profiles": [{"name": "Amazon"}]}))
+    code, _ = run_cli(
+        tmp_path, os.path.dirname(vendor_files[0]), "--pricing-profiles", str(profiles), "--format", "csv"
+    )
+    assert code == 0
+    assert os.path.exists(os.path.join(tmp_path, "out_Amazon.csv"))
+    assert not os.path.exists(os.path.join(tmp_path, "out_Amazon.xlsx"))
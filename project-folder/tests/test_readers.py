@@ -0,0 +1,72 @@
+from io import BytesIO
+
+import pandas as pd
+import pytest
+
+from benchmarks.readers import first_difference
+from convertor import readers
+from convertor.readers import CSV, PARQUET, XLS, XLSX, detect_format, excel_engine, read_frames
+
+from test_cli import run_cli
+
+
+@pytest.mark.parametrize("head, name, expected", [
+    (b"PK\x03\x04rest", "vendor.bin", XLSX),
+    (b"\xd0\xcf\x11\xe0rest", "vendor.xls", XLS),
+    (b"PAR1rest", None, PARQUET),
+    (b"a,b,c\n1,2,3\n", "vendor.txt", CSV),
+])
+def test_detect_format_from_content(head, name, expected):
+    assert detect_format(BytesIO(head), name) == expected
+
+
+def test_binary_extension_without_signature_is_invalid():
+    with pytest.raises(ValueError, match="not a valid xlsx file"):
+        detect_format(b"Brand,Price\n", "vendor.xlsx")
+
+
+def test_detect_format_leaves_the_position():
+    upload = BytesIO(b"PK\x03\x04rest")
+    upload.seek(2)
+    detect_format(upload)
+    assert upload.tell() == 2
+
+
+def test_excel_engine(monkeypatch):
+    assert excel_engine("openpyxl") == "openpyxl"
+    assert excel_engine("openpyxl", XLS) == "xlrd"
+    monkeypatch.setattr(readers, "HAS_CALAMINE", False)
+    assert excel_engine("auto") == "openpyxl"
+    with pytest.raises(ImportError, match="pip install python-calamine"):
+        excel_engine("calamine")
+
+
+def test_flat_formats_read_like_the_workbook(tmp_path, vendor_files):
+    pytest.importorskip("pyarrow")
+    sheet = pd.read_excel(vendor_files[0], dtype=str)
+    sheet.to_csv(tmp_path / "vendor.csv", index=False)
+    sheet.to_parquet(tmp_path / "vendor.parquet", index=False)
+
+    expected, from_csv, from_parquet = (
+        read_frames(str(path), engine="openpyxl")[0]
+        for path in (vendor_files[0], tmp_path / "vendor.csv", tmp_path / "vendor.parquet")
+    )
+    assert list(from_csv.columns) == list(expected.columns) == list(from_parquet.columns)
+    for col in ["Product ID", "UPC Code"]:
+        codes = [frame[col].fillna("").tolist() for frame in (expected, from_csv, from_parquet)]
+        assert codes[0] == codes[1] == codes[2]
+
+
+def test_first_difference():
+    expected = pd.DataFrame({"SKU": ["1", "2", None], "PRICE": [1.0, 2.0, 3.0]})
+    assert first_difference(expected.copy(), expected) is None
+    assert first_difference(expected.assign(SKU=["1", "02", None]), expected) == "SKU, row 1: '02' != '2'"
+    assert first_difference(expected.astype({"PRICE": "float32"}), expected) == "PRICE: dtype float32 != float64"
+    assert first_difference(expected.iloc[:2], expected) == "2 rows != 3"
+    assert first_difference(expected[["PRICE", "SKU"]], expected).startswith("columns")
+
+
+def test_cli_rejects_excel_engine_with_stream(tmp_path, vendor_files, capsys):
+    with pytest.raises(SystemExit):
+        run_cli(tmp_path, tmp_path, "--stream", "--excel-engine", "calamine")
+    assert "--excel-engine is not supported with --stream" in capsys.readouterr().err
@@ -0,0 +1,108 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from convertor.config import SHIPPING_LEGEND_PATH
+from convertor.pricing import max_price, retail_price
+from convertor.shipping import ShippingLegend
+
+
+def legend_frame(rows):
+    return pd.DataFrame(rows, columns=["Weight Range Min (lb)", "Weight Range Max (lb)", "SHIPPING COST"])
+
+
+def calculate_shipping_cost(weight, legend):
+    """
+    Per-row lookup of the original app: the first legend row containing the weight.
+    """
+    if pd.isnull(weight):
+        return None
+    for _, row in legend.iterrows():
+        if row["Weight Range Min (lb)"] <= weight <= row["Weight Range Max (lb)"]:
+            return row["SHIPPING COST"]
+    return None
+
+
+def reference_costs(weights, legend):
+    return pd.Series([calculate_shipping_cost(w, legend) for w in weights], dtype="float64")
+
+
+@pytest.fixture(scope="module")
+def default_legend():
+    return ShippingLegend.from_excel(SHIPPING_LEGEND_PATH)
+
+
+@pytest.mark.parametrize(
+    "weight, cost",
+    [
+        (0.01, 4.5),
+        (0.50, 4.5),  # max is inclusive
+        (0.505, np.nan),  # between the 0.50 and 0.51 tiers
+        (0.51, 6.0),
+        (2.00, 7.0),
+        (15.00, 19.0),
+        (15.01, np.nan),  # above the last tier
+        (0.0, np.nan),  # below the first tier
+        (np.nan, np.nan),
+    ],
+)
+def test_default_legend_boundaries(default_legend, weight, cost):
+    result = default_legend.lookup(pd.Series([weight]))[0]
+    if np.isnan(cost):
+        assert np.isnan(result)
+    else:
+        assert result == cost
+
+
+def test_default_legend_matches_reference(default_legend):
+    weights = pd.Series(np.round(np.arange(-0.5, 17, 0.005), 3).tolist() + [None, np.nan])
+    expected = reference_costs(weights, default_legend.frame)
+    pd.testing.assert_series_equal(default_legend.lookup(weights), expected, check_names=False)
+
+
+def test_unsorted_legend_and_blank_bounds():
+    legend = ShippingLegend(legend_frame([[2.01, 3, 8.0], [None, 1, 1.0], [0.01, 2, 7.0], [5, 4, 9.0]]))
+    weights = pd.Series([0.5, 2.0, 2.005, 3.0, 4.5])
+    pd.testing.assert_series_equal(
+        legend.lookup(weights), pd.Series([7.0, 7.0, np.nan, 8.0, np.nan]), check_names=False
+    )
+
+
+def test_overlapping_tiers_use_first_matching_row():
+    frame = legend_frame([[1, 5, 10.0], [0, 2, 3.0], [4, 8, 20.0], [0, 100, 99.0]])
+    with pytest.warns(UserWarning, match="overlapping"):
+        legend = ShippingLegend(frame)
+    weights = pd.Series([0.5, 1.5, 4.5, 6, 50, 101, np.nan])
+    pd.testing.assert_series_equal(legend.lookup(weights), reference_costs(weights, frame), check_names=False)
+
+
+def test_tiers_nested_in_a_wide_tier_overlap():
+    with pytest.warns(UserWarning):
+        ShippingLegend(legend_frame([[0, 10, 1.0], [2, 3, 2.0], [4, 5, 3.0]]))
+
+
+def test_adjacent_tiers_do_not_warn(default_legend):
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        ShippingLegend(default_legend.frame)
+    assert not default_legend.overlapping
+
+
+def test_missing_columns():
+    with pytest.raises(ValueError, match="missing required columns"):
+        ShippingLegend(pd.DataFrame({"Weight Range Min (lb)": [0]}))
+
+
+def test_prices_match_round():
+    cost = pd.Series([10.0, 3.335, None, 0.0, 19.99])
+    shipping = pd.Series([4.5, 6.0, 7.0, None, 19.0])
+    retail = retail_price(cost, shipping)
+    expected = [
+        round((c + s + 0.75) * 1.35, 2) if not (pd.isnull(c) or pd.isnull(s)) else None
+        for c, s in zip(cost, shipping)
+    ]
+    pd.testing.assert_series_equal(retail, pd.Series(expected, dtype="float64"))
+    expected_max = [round(r * 1.35, 2) if not pd.isnull(r) else None for r in retail]
+    pd.testing.assert_series_equal(max_price(retail), pd.Series(expected_max, dtype="float64"))
@@ -0,0 +1,101 @@
+import os
+
+import pandas as pd
+import pytest
+
+from convertor.dedup import KEEP_FIRST, KEEP_LOWEST_COST
+from convertor.export import CONSOLIDATED_SHEET, write_export
+from convertor.pipeline import run_pipeline
+from convertor.streaming import iter_source_chunks, stream_convert, stream_convert_bytes
+
+from conftest import SUPPLIER_HEADER
+
+CSV_HEADER = ["Row", "Product Details", "Category", "Seller", "Brand", "Color", "Product ID", "UPC Code", "Price"]
+
+
+def read_output(path):
+    return pd.read_excel(path, sheet_name=CONSOLIDATED_SHEET, dtype=str)
+
+
+def batch_output(tmp_path, sources, legend, blocked, keep=KEEP_FIRST):
+    result = run_pipeline(sources, legend, blocked, keep=keep)
+    path = tmp_path / f"batch_{keep}.xlsx"
+    write_export(result.data, path, shipping_legend=legend.frame)
+    return read_output(path), result.metrics
+
+
+def write_csv(path, rows, bad_row_at=None):
+    lines = [",".join(CSV_HEADER)]
+    for i, (title, brand, sku, upc, price) in enumerate(rows):
+        if i == bad_row_at:
+            lines.append("x," * 12 + "x")
+        lines.append(f"{i},{title},Grocery,Vendor,{brand},,{sku},{upc},{price}")
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+def csv_rows(n, offset=0):
+    return [(f"Item {i} {i % 30 + 1} oz", "Dove", 1000 + i, f"{10**11 + i}", f"{5 + i % 7}.25") for i in range(offset, offset + n)]
+
+
+@pytest.mark.parametrize("keep", [KEEP_FIRST, KEEP_LOWEST_COST])
+def test_matches_batch_conversion(tmp_path, vendor_files, legend, keep):
+    target = tmp_path / "stream.xlsx"
+    metrics, errors, dedup = stream_convert(vendor_files, target, legend, ["Stanley"], chunk_size=70, keep=keep)
+    expected, expected_metrics = batch_output(tmp_path, vendor_files, legend, ["Stanley"], keep)
+
+    assert errors == []
+    assert metrics == expected_metrics
+    assert dedup.removed == expected_metrics.duplicates_removed
+    by_key = lambda df: df.sort_values(list(df.columns)).reset_index(drop=True)
+    pd.testing.assert_frame_equal(by_key(read_output(target)), by_key(expected))
+
+
+def test_missing_weights_written_last(tmp_path, vendor_files, legend):
+    target = tmp_path / "stream.xlsx"
+    metrics, _, _ = stream_convert(vendor_files, target, legend, [], chunk_size=50)
+    weights = read_output(target)["ITEM WEIGHT (pounds)"]
+    assert metrics.listings_no_weights > 0
+    assert weights.tail(metrics.listings_no_weights).isna().all()
+    assert weights.head(len(weights) - metrics.listings_no_weights).notna().all()
+
+
+def test_file_failing_part_way_leaves_nothing_behind(tmp_path, legend):
+    # The bad file's first rows repeat the good file's keys; if they were kept, the good rows would be dropped
+    good_rows = csv_rows(30)
+    bad = write_csv(tmp_path / "a_bad.csv", good_rows, bad_row_at=25)
+    good = write_csv(tmp_path / "b_good.csv", good_rows)
+
+    target = tmp_path / "stream.xlsx"
+    metrics, errors, dedup = stream_convert([bad, good], target, legend, [], chunk_size=10)
+    assert len(errors) == 1 and errors[0].startswith("Error reading file a_bad.csv")
+    assert metrics.total_input_listings == 30
+    assert metrics.total_output_listings == 30
+    assert dedup.removed == 0 and dedup.by_source == {}
+
+    expected, _ = batch_output(tmp_path, [good], legend, [])
+    pd.testing.assert_frame_equal(read_output(target), expected)
+
+
+def test_failed_file_with_lowest_cost(tmp_path, legend):
+    bad = write_csv(tmp_path / "a_bad.csv", csv_rows(30), bad_row_at=25)
+    good = write_csv(tmp_path / "b_good.csv", csv_rows(20, offset=10))
+    metrics, errors, _ = stream_convert([bad, good], tmp_path / "s.xlsx", legend, [], chunk_size=10, keep=KEEP_LOWEST_COST)
+    assert len(errors) == 1
+    assert metrics.total_output_listings == 20
+
+
+def test_in_memory_result(vendor_files, legend):
+    result = stream_convert_bytes(vendor_files, legend, [])
+    assert result.output.startswith(b"PK")
+    assert result.metrics.total_input_listings == 600
+    assert result.metrics.invalid_codes > 0 and result.invalid_codes.startswith(b"PK")
+    assert {stage.name for stage in result.stages} >= {"Read files", "Write workbook"}
+
+
+def test_chunks_keep_supplier_columns(vendor_files):
+    chunks = list(iter_source_chunks(vendor_files[0], chunk_size=64))
+    assert all(len(chunk) <= 64 for chunk in chunks)
+    assert sum(len(chunk) for chunk in chunks) == 300
+    assert list(chunks[0].columns) == SUPPLIER_HEADER
+    assert os.path.exists(vendor_files[0])
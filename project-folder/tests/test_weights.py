@@ -0,0 +1,92 @@
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from convertor.weights import extract_weights
+
+
+def extract_weight_with_packs(title):
+    """
+    Extract the weight and account for pack size in the TITLE.
+
+    The per-row function of the original app, kept as the reference
+    extract_weights must match; only its st.error logging is left out.
+    """
+    try:
+        # Extract the weight (e.g., "8 oz", "10 fl oz", etc.)
+        match_weight = re.search(r"(\d+(\.\d+)?)\s*(?:oz|ounces|ounce|fl. oz.|fluid ounce|fl oz|fluid ounces)", title, re.IGNORECASE)
+        single_unit_weight = float(match_weight.group(1)) if match_weight else None
+
+        # Extract the pack size (e.g., "2 pack", "pack of 3", etc.)
+        match_pack = re.search(r"(?:\b(\d+)\s*pack\b|\bpack of\s*(\d+))", title, re.IGNORECASE)
+        pack_size = int(match_pack.group(1) or match_pack.group(2)) if match_pack else 1  # Default to 1 if no pack
+
+        if single_unit_weight is not None:
+            # Add 6 oz or 10 oz based on the unit type and calculate the total weight
+            if match_weight and "fl oz" in match_weight.group(0).lower():
+                single_unit_weight += 10  # Add 10 oz for "fl oz"
+            else:
+                single_unit_weight += 6  # Add 6 oz for "oz" or "ounces"
+
+            # Calculate total weight for the pack and convert to pounds
+            total_weight = (single_unit_weight * pack_size) / 16  # Convert oz to pounds
+            return round(total_weight, 2)
+
+    except Exception:
+        pass
+
+    # Return None if no weight or pack size is found
+    return None
+
+
+def reference_weights(titles):
+    return pd.Series(
+        [extract_weight_with_packs(x) if isinstance(x, str) else None for x in titles], dtype="float64"
+    )
+
+
+OUNCES = ["Peanut Butter 16 oz", "Tea 0.5 OZ", "Rice 12.75 ounces", "Flour 1 ounce", "Coffee 8oz Bag"]
+FLUID_OUNCES = ["Juice 10 fl oz", "Syrup 12.5 FL OZ", "Milk 64 fl. oz.", "Soda 7.5 fluid ounces", "Oil 33.8 Fl Oz"]
+PACKS = ["Chips 1 oz 6 pack", "Water 16.9 fl oz, pack of 24", "Gum 2 oz (3 Pack)", "Beans 15 oz Pack Of 12", "Soap 4 oz 2pack"]
+POUNDS = ["Dog Food 5 lb", "Sugar 2 lbs", "Potatoes 10 pound bag", "Apples 3 LB 2 pack"]
+NO_WEIGHT = ["Paper Towels", "Batteries 4 pack", "", "   ", "Pack of 3 socks"]
+MISSING = [None, np.nan, 12, 3.5]
+HUGE_PACKS = ["Tea 2 oz " + "9" * 400 + " pack", "Tea 2 oz pack of " + "9" * 400]
+
+
+@pytest.mark.parametrize(
+    "titles",
+    [OUNCES, FLUID_OUNCES, PACKS, POUNDS, NO_WEIGHT, MISSING, HUGE_PACKS],
+    ids=["oz", "fl-oz", "pack", "pound", "no-weight", "missing", "huge-pack"],
+)
+def test_matches_reference(titles):
+    result = extract_weights(pd.Series(titles, dtype=object))
+    pd.testing.assert_series_equal(result, reference_weights(titles), check_names=False)
+
+
+def test_repeated_titles_match_reference():
+    titles = pd.Series((OUNCES + FLUID_OUNCES + PACKS + POUNDS + NO_WEIGHT + MISSING) * 50, dtype=object)
+    result = extract_weights(titles)
+    pd.testing.assert_series_equal(result, reference_weights(titles), check_names=False)
+
+
+def test_half_cent_rounding_matches_round():
+    # Totals that end in half a cent must round like round(), not np.round
+    titles = [f"Item {ounces / 100:.2f} oz" for ounces in range(0, 5000, 7)]
+    pd.testing.assert_series_equal(extract_weights(titles), reference_weights(titles), check_names=False)
+
+
+def test_keeps_index():
+    titles = pd.Series(["Tea 2 oz", "Paper"], index=[10, 20])
+    result = extract_weights(titles)
+    assert list(result.index) == [10, 20]
+    assert result[10] == 0.5
+    assert np.isnan(result[20])
+
+
+def test_empty_column():
+    result = extract_weights(pd.Series([], dtype=object))
+    assert result.empty
+    assert result.dtype == "float64"